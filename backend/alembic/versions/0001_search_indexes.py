@@ -0,0 +1,83 @@
+"""后台搜索索引：pg_trgm GIN 索引 + 卡密 hash 索引
+
+表结构仍由应用启动时的 create_all 创建；本迁移在空库上执行时会先补建缺失的表，
+之后在线（CONCURRENTLY）创建索引，不阻塞业务写入。
+
+    alembic upgrade head
+
+Revision ID: 0001_search_indexes
+Revises:
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_search_indexes"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+## LIKE '%kw%' 模糊搜索字段（表, 列）
+TRGM_COLUMNS = [
+    ("orders", "trade_no"),
+    ("orders", "contact"),
+    ("cards", "secret"),
+    ("cards", "note"),
+    ("operation_logs", "email"),
+    ("operation_logs", "action"),
+    ("operation_logs", "ip"),
+    ("users", "username"),
+    ("users", "email"),
+    ("users", "phone"),
+    ("recharge_orders", "trade_no"),
+]
+
+## 等值查询字段（Text 类型或超长值，btree 不适用）
+HASH_COLUMNS = [
+    ("cards", "secret"),
+]
+
+
+def _is_postgresql() -> bool:
+    return op.get_context().dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    if not _is_postgresql():
+        return
+
+    # 空库（尚未启动过应用）时先补建表结构（离线生成 SQL 时跳过）
+    if not op.get_context().as_sql:
+        from app.database import Base
+        import app.models  # noqa: F401
+        Base.metadata.create_all(bind=op.get_bind(), checkfirst=True)
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    with op.get_context().autocommit_block():
+        for table, column in TRGM_COLUMNS:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_{table}_{column}_trgm "
+                f"ON {table} USING gin ({column} gin_trgm_ops)"
+            )
+        for table, column in HASH_COLUMNS:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_{table}_{column}_hash "
+                f"ON {table} USING hash ({column})"
+            )
+
+
+def downgrade() -> None:
+    if not _is_postgresql():
+        return
+
+    with op.get_context().autocommit_block():
+        for table, column in HASH_COLUMNS:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS idx_{table}_{column}_hash")
+        for table, column in TRGM_COLUMNS:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS idx_{table}_{column}_trgm")
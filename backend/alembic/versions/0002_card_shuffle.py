@@ -0,0 +1,94 @@
+"""随机发货序号：cards.shuffle 列 + 待售卡密部分索引
+
+随机发货模式原先使用 ORDER BY random()，每次发货都要对商品的全部待售卡密排序。
+新增 shuffle 列（入库时随机分配），发货时从随机起点沿索引取卡。
+
+本迁移为已有数据库补列、为待售卡密回填随机序号，并创建部分索引
+（PostgreSQL 上在线 CONCURRENTLY 创建，不阻塞业务写入）。
+
+    alembic upgrade head
+
+Revision ID: 0002_card_shuffle
+Revises: 0001_search_indexes
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_card_shuffle"
+down_revision: Union[str, None] = "0001_search_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+## 部分索引（索引名, 列）
+INDEXES = [
+    ("idx_cards_stock_shuffle", "commodity_id, shuffle"),
+    ("idx_cards_stock_race_shuffle", "commodity_id, race, shuffle"),
+]
+
+## 各数据库生成 [0, 2^31 - 1) 随机整数的表达式
+RANDOM_KEY_SQL = {
+    "postgresql": "floor(random() * 2147483647)::int",
+    "sqlite": "abs(random()) % 2147483647",
+    "mysql": "floor(rand() * 2147483647)",
+}
+
+
+def _has_column(table: str, column: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return False
+    return any(c["name"] == column for c in inspector.get_columns(table))
+
+
+def upgrade() -> None:
+    dialect = op.get_context().dialect.name
+    offline = op.get_context().as_sql
+
+    if offline or not _has_column("cards", "shuffle"):
+        if not offline and not sa.inspect(op.get_bind()).has_table("cards"):
+            # 空库：表结构由应用启动时的 create_all 创建（已包含该列和索引）
+            return
+        op.add_column(
+            "cards",
+            sa.Column("shuffle", sa.Integer(), nullable=False, server_default="0",
+                      comment="随机发货序号"),
+        )
+        # 已售卡密不参与随机发货，只回填待售的
+        random_key = RANDOM_KEY_SQL.get(dialect)
+        if random_key:
+            op.execute(f"UPDATE cards SET shuffle = {random_key} WHERE status = 0")
+
+    if dialect == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, columns in INDEXES:
+                op.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                    f"ON cards ({columns}) WHERE status = 0"
+                )
+    elif dialect == "sqlite":
+        for name, columns in INDEXES:
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON cards ({columns}) WHERE status = 0")
+    else:
+        # MySQL 不支持部分索引，退化为普通联合索引
+        existing = set() if offline else {i["name"] for i in sa.inspect(op.get_bind()).get_indexes("cards")}
+        for name, columns in INDEXES:
+            if name not in existing:
+                op.create_index(name, "cards", [c.strip() for c in columns.split(",")])
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, _ in INDEXES:
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    else:
+        for name, _ in INDEXES:
+            op.drop_index(name, table_name="cards")
+    op.drop_column("cards", "shuffle")
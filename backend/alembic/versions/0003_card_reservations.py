@@ -0,0 +1,94 @@
+"""卡密预占：cards.reserved_until、inventory_counters.reserved 及相关索引
+
+下单时为订单预占卡密（status=3），支付后按 cards.order_id 直接转为已售，
+过期预占按 reserved_until 批量释放。
+
+本迁移为已有数据库补列，并创建 order_id 索引和预占到期时间部分索引
+（PostgreSQL 上在线 CONCURRENTLY 创建，不阻塞业务写入）。
+
+    alembic upgrade head
+
+Revision ID: 0003_card_reservations
+Revises: 0002_card_shuffle
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_card_reservations"
+down_revision: Union[str, None] = "0002_card_shuffle"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+## 新增列（表, 列）
+COLUMNS = [
+    ("cards", sa.Column("reserved_until", sa.DateTime(), nullable=True, comment="预占到期时间")),
+    ("inventory_counters", sa.Column(
+        "reserved", sa.Integer(), nullable=False, server_default="0",
+        comment="已预占卡密数（待支付订单占用）",
+    )),
+]
+
+## 索引（索引名, 列, 部分索引条件）
+INDEXES = [
+    ("idx_cards_order_id", "order_id", None),
+    ("idx_cards_reserved_until", "reserved_until", "status = 3"),
+]
+
+
+def _has_column(table: str, column: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table(table):
+        return False
+    return any(c["name"] == column for c in inspector.get_columns(table))
+
+
+def upgrade() -> None:
+    dialect = op.get_context().dialect.name
+    offline = op.get_context().as_sql
+
+    if not offline and not sa.inspect(op.get_bind()).has_table("cards"):
+        # 空库：表结构由应用启动时的 create_all 创建（已包含这些列和索引）
+        return
+
+    for table, column in COLUMNS:
+        if offline or not _has_column(table, column.name):
+            op.add_column(table, column)
+
+    if dialect == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, column, where in INDEXES:
+                op.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON cards ({column})"
+                    + (f" WHERE {where}" if where else "")
+                )
+    elif dialect == "sqlite":
+        for name, column, where in INDEXES:
+            op.execute(
+                f"CREATE INDEX IF NOT EXISTS {name} ON cards ({column})"
+                + (f" WHERE {where}" if where else "")
+            )
+    else:
+        # MySQL 不支持部分索引，退化为普通索引
+        existing = set() if offline else {i["name"] for i in sa.inspect(op.get_bind()).get_indexes("cards")}
+        for name, column, _ in INDEXES:
+            if name not in existing:
+                op.create_index(name, "cards", [column])
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, _, _ in INDEXES:
+                op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    else:
+        for name, _, _ in INDEXES:
+            op.drop_index(name, table_name="cards")
+    for table, column in reversed(COLUMNS):
+        op.drop_column(table, column.name)
@@ -0,0 +1,57 @@
+"""库存计数器分片：inventory_counters.shard
+
+唯一约束由 (commodity_id, race) 改为 (commodity_id, race, shard)，
+同一商品的计数可以分散在多行上，并发发货不再争抢同一行锁。
+已有数据全部视为 0 号分片，无需迁移数据。
+
+SQLite 不支持修改约束，由 Alembic 批量模式重建表。
+
+    alembic upgrade head
+
+Revision ID: 0004_inventory_counter_shards
+Revises: 0003_card_reservations
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_inventory_counter_shards"
+down_revision: Union[str, None] = "0003_card_reservations"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+OLD_CONSTRAINT = "uq_inventory_counters_commodity_race"
+NEW_CONSTRAINT = "uq_inventory_counters_commodity_race_shard"
+
+
+def upgrade() -> None:
+    offline = op.get_context().as_sql
+    if not offline:
+        inspector = sa.inspect(op.get_bind())
+        if not inspector.has_table("inventory_counters"):
+            # 空库：表结构由应用启动时的 create_all 创建
+            return
+        if any(c["name"] == "shard" for c in inspector.get_columns("inventory_counters")):
+            return
+
+    with op.batch_alter_table("inventory_counters") as batch:
+        batch.add_column(
+            sa.Column("shard", sa.Integer(), nullable=False, server_default="0", comment="分片号")
+        )
+        batch.drop_constraint(OLD_CONSTRAINT, type_="unique")
+        batch.create_unique_constraint(NEW_CONSTRAINT, ["commodity_id", "race", "shard"])
+
+
+def downgrade() -> None:
+    # 计数可由卡密 / 订单重建：清空后恢复原约束，应用启动时 ensure_initialized() 自动全量重建
+    op.execute("DELETE FROM inventory_counters")
+    with op.batch_alter_table("inventory_counters") as batch:
+        batch.drop_constraint(NEW_CONSTRAINT, type_="unique")
+        batch.create_unique_constraint(OLD_CONSTRAINT, ["commodity_id", "race"])
+        batch.drop_column("shard")
@@ -0,0 +1,64 @@
+"""事件发件箱：outbox_events
+
+业务事件在业务事务内写入该表，提交后由后台分发器投递给钩子处理函数。
+新表，不影响已有数据。
+
+    alembic upgrade head
+
+Revision ID: 0005_outbox_events
+Revises: 0004_inventory_counter_shards
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_outbox_events"
+down_revision: Union[str, None] = "0004_inventory_counter_shards"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLE = "outbox_events"
+
+
+def upgrade() -> None:
+    offline = op.get_context().as_sql
+    if not offline:
+        inspector = sa.inspect(op.get_bind())
+        if not inspector.has_table("cards"):
+            # 空库：表结构由应用启动时的 create_all 创建
+            return
+        if inspector.has_table(TABLE):
+            return
+
+    op.create_table(
+        TABLE,
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("event", sa.String(64), nullable=False, comment="事件名称"),
+        sa.Column("aggregate", sa.String(64), nullable=True, comment="聚合标识"),
+        sa.Column("payload", sa.Text(), nullable=False, comment="事件数据JSON"),
+        sa.Column("status", sa.Integer(), nullable=False, comment="状态 0=待分发 2=已放弃"),
+        sa.Column("attempts", sa.Integer(), nullable=False, comment="已尝试次数"),
+        sa.Column("pending_handlers", sa.Text(), nullable=True,
+                  comment="待重试的处理函数JSON（为空表示全部）"),
+        sa.Column("last_error", sa.Text(), nullable=True, comment="最近一次错误"),
+        sa.Column("available_at", sa.DateTime(), nullable=False, comment="可分发时间"),
+        sa.Column("created_at", sa.DateTime(), nullable=False, comment="创建时间"),
+    )
+    # MySQL 不支持部分索引，退化为普通联合索引
+    op.create_index(
+        "idx_outbox_events_pending", TABLE, ["available_at", "id"],
+        postgresql_where=sa.text("status = 0"), sqlite_where=sa.text("status = 0"),
+    )
+    op.create_index("idx_outbox_events_aggregate", TABLE, ["aggregate", "status", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_outbox_events_aggregate", table_name=TABLE)
+    op.drop_index("idx_outbox_events_pending", table_name=TABLE)
+    op.drop_table(TABLE)
@@ -0,0 +1,52 @@
+"""订单支付详情：orders.pay_type、orders.pay_extra
+
+创建第三方支付时记录支付类型（qrcode / form 等）和附加数据，
+幂等键重放（Redis 中的结果已过期）时按订单重建完整的下单结果。
+可空新列，不影响已有数据。
+
+    alembic upgrade head
+
+Revision ID: 0006_order_pay_details
+Revises: 0005_outbox_events
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_order_pay_details"
+down_revision: Union[str, None] = "0005_outbox_events"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+## 新增列
+COLUMNS = [
+    sa.Column("pay_type", sa.String(16), nullable=True, comment="支付类型"),
+    sa.Column("pay_extra", sa.Text(), nullable=True, comment="支付附加数据JSON"),
+]
+
+
+def _has_column(column: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    return any(c["name"] == column for c in inspector.get_columns("orders"))
+
+
+def upgrade() -> None:
+    offline = op.get_context().as_sql
+    if not offline and not sa.inspect(op.get_bind()).has_table("orders"):
+        # 空库：表结构由应用启动时的 create_all 创建
+        return
+
+    for column in COLUMNS:
+        if offline or not _has_column(column.name):
+            op.add_column("orders", column)
+
+
+def downgrade() -> None:
+    for column in reversed(COLUMNS):
+        op.drop_column("orders", column.name)
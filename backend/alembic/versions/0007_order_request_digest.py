@@ -0,0 +1,49 @@
+"""订单幂等参数摘要：orders.request_digest
+
+记录 Idempotency-Key 请求的参数摘要（与 Redis 中的摘要相同），
+Redis 结果过期后按订单重放时比对完整的下单参数。
+可空新列，已有订单按原有字段比对。
+
+    alembic upgrade head
+
+Revision ID: 0007_order_request_digest
+Revises: 0006_order_pay_details
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007_order_request_digest"
+down_revision: Union[str, None] = "0006_order_pay_details"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMN = "request_digest"
+
+
+def _has_column(column: str) -> bool:
+    inspector = sa.inspect(op.get_bind())
+    return any(c["name"] == column for c in inspector.get_columns("orders"))
+
+
+def upgrade() -> None:
+    offline = op.get_context().as_sql
+    if not offline and not sa.inspect(op.get_bind()).has_table("orders"):
+        # 空库：表结构由应用启动时的 create_all 创建
+        return
+
+    if offline or not _has_column(COLUMN):
+        op.add_column(
+            "orders",
+            sa.Column(COLUMN, sa.String(64), nullable=True, comment="API请求参数摘要"),
+        )
+
+
+def downgrade() -> None:
+    op.drop_column("orders", COLUMN)
@@ -12,8 +12,9 @@ from .payments import router as payments_router
 from .admin import router as admin_router
 from .uploads import router as uploads_router
 from .install import router as install_router
+from ...core.responses import ORJSONRoute
 
-api_router = APIRouter()
+api_router = APIRouter(route_class=ORJSONRoute)
 
 # 安装向导
 api_router.include_router(install_router, prefix="/install", tags=["安装"])
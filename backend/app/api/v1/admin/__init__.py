@@ -20,8 +20,9 @@ from .bills import router as bills_router
 from .logs import router as logs_router
 from .upload import router as upload_router
 from .plugins import router as plugins_router
+from ....core.responses import ORJSONRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 router.include_router(dashboard_router, prefix="/dashboard")
 router.include_router(commodities_router, prefix="/commodities")
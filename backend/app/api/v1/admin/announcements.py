@@ -8,11 +8,14 @@ from pydantic import BaseModel, Field
 from sqlalchemy import select, func
 
 from ...deps import DbSession, CurrentAdmin
+from ....core import cache
+from ....core.cache import CacheTags
 from ....models.announcement import Announcement
 from ....core.exceptions import NotFoundError
+from ....core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # ============== Schemas ==============
@@ -92,6 +95,7 @@ async def create_announcement(
     )
     db.add(announcement)
     await db.flush()
+    await cache.invalidate(CacheTags.ANNOUNCEMENTS, db=db)
     
     return {"id": announcement.id, "message": "创建成功"}
 
@@ -118,6 +122,7 @@ async def update_announcement(
     announcement.is_top = data.is_top
     announcement.sort = data.sort
     announcement.status = data.status
+    await cache.invalidate(CacheTags.ANNOUNCEMENTS, db=db)
     
     return {"message": "更新成功"}
 
@@ -138,4 +143,5 @@ async def delete_announcement(
         raise NotFoundError("公告不存在")
     
     await db.delete(announcement)
+    await cache.invalidate(CacheTags.ANNOUNCEMENTS, db=db)
     return {"message": "删除成功"}
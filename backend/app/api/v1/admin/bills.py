@@ -10,9 +10,11 @@ from sqlalchemy import select, func
 from ...deps import DbSession, CurrentAdmin
 from ....models.bill import Bill
 from ....models.user import User
+from ....utils.pagination import paginate, TotalMode
+from ....core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # ============== APIs ==============
@@ -26,6 +28,8 @@ async def get_bills(
     currency: Optional[int] = Query(None, description="货币 0=余额 1=积分"),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor）"),
+    total: TotalMode = Query("exact", description="总数统计：exact 精确 / estimate 估算 / none 不统计"),
 ):
     """获取账单列表"""
     query = select(Bill)
@@ -37,17 +41,12 @@ async def get_bills(
     if currency is not None:
         query = query.where(Bill.currency == currency)
     
-    query = query.order_by(Bill.created_at.desc())
-    
-    # 总数
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-    
-    # 分页
-    query = query.offset((page - 1) * limit).limit(limit)
-    result = await db.execute(query)
-    bills = result.scalars().all()
+    # 分页（page/limit 或游标）
+    paged = await paginate(
+        db, query, (Bill.created_at.desc(), Bill.id.desc()),
+        page=page, limit=limit, cursor=cursor, total=total,
+    )
+    bills = paged.rows
     
     # 获取用户信息
     user_ids = list(set(b.user_id for b in bills))
@@ -59,9 +58,10 @@ async def get_bills(
         user_map = {r.id: {"username": r.username, "avatar": r.avatar} for r in users_result}
     
     return {
-        "total": total,
+        "total": paged.total,
         "page": page,
         "limit": limit,
+        "next_cursor": paged.next_cursor,
         "items": [
             {
                 "id": b.id,
@@ -10,9 +10,10 @@ from sqlalchemy import select
 from ...deps import DbSession, CurrentAdmin
 from ....models.business_level import BusinessLevel
 from ....core.exceptions import NotFoundError, ValidationError
+from ....core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # ============== Schemas ==============
@@ -7,16 +7,23 @@ from datetime import datetime
 from typing import Optional, List
 from fastapi import APIRouter, Query
 from pydantic import BaseModel, Field
-from sqlalchemy import select, func, or_
+from sqlalchemy import select, or_
 
 from ...deps import DbSession, CurrentAdmin
+from ....core import cache
+from ....core.cache import CacheTags
 from ....models.card import Card
 from ....models.commodity import Commodity
 from ....models.order import Order
 from ....core.exceptions import NotFoundError, ValidationError
+from ....utils.pagination import paginate, TotalMode
+from ....utils import search
+from ....services import InventoryService
+from ....services.reservation import CARD_RESERVED
+from ....core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # ============== Schemas ==============
@@ -64,6 +71,8 @@ async def get_cards(
     end_time: Optional[str] = Query(None, description="结束时间"),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor）"),
+    total: TotalMode = Query("exact", description="总数统计：exact 精确 / estimate 估算 / none 不统计"),
 ):
     """获取卡密列表"""
     query = select(Card)
@@ -75,11 +84,11 @@ async def get_cards(
     if race:
         query = query.where(Card.race == race)
     if secret:
-        query = query.where(Card.secret == secret)
+        query = query.where(search.exact(Card.secret, secret))
     if secret_fuzzy:
-        query = query.where(Card.secret.contains(secret_fuzzy))
+        query = query.where(search.fuzzy(Card.secret, secret_fuzzy))
     if note:
-        query = query.where(Card.note.contains(note))
+        query = query.where(search.fuzzy(Card.note, note))
     if owner_id is not None:
         query = query.where(Card.owner_id == owner_id)
     if start_time:
@@ -96,17 +105,12 @@ async def get_cards(
         except ValueError:
             pass
     
-    query = query.order_by(Card.id.desc())
-    
-    # 总数
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-    
-    # 分页
-    query = query.offset((page - 1) * limit).limit(limit)
-    result = await db.execute(query)
-    cards = result.scalars().all()
+    # 分页（page/limit 或游标）
+    paged = await paginate(
+        db, query, (Card.id.desc(),),
+        page=page, limit=limit, cursor=cursor, total=total,
+    )
+    cards = paged.rows
     
     # 获取商品信息
     commodity_ids = list(set(c.commodity_id for c in cards))
@@ -151,9 +155,10 @@ async def get_cards(
     ]
     
     return {
-        "total": total,
+        "total": paged.total,
         "page": page,
         "limit": limit,
+        "next_cursor": paged.next_cursor,
         "items": items,
     }
 
@@ -215,10 +220,14 @@ async def import_cards(
         created_count += 1
     
     await db.flush()
+    await InventoryService(db).cards_added(
+        request.commodity_id, request.race, created_count
+    )
     
-    # 钩子：卡密导入
-    from ....plugins.sdk.hooks import hooks, Events
-    await hooks.emit(Events.CARD_IMPORTED, {
+    # 钩子：卡密导入（事务提交后投递）
+    from ....plugins.sdk.hooks import Events
+    from ....services import outbox
+    await outbox.publish(db, Events.CARD_IMPORTED, {
         "commodity_id": request.commodity_id,
         "count": created_count,
     })
@@ -239,24 +248,36 @@ async def batch_update_cards_status(
     if request.status not in [0, 1, 2]:
         raise ValidationError("无效的状态值")
     
+    # 加行锁：计数器增量按锁定后的状态计算，不与发货、预占并发改写同一张卡
     result = await db.execute(
-        select(Card).where(Card.id.in_(request.ids))
+        select(Card).where(Card.id.in_(request.ids)).order_by(Card.id).with_for_update()
     )
     cards = result.scalars().all()
     
     updated_count = 0
+    changes = []
     for card in cards:
         # 已售出的卡密不能修改状态
         if card.status == 1 and request.status != 1:
             continue
+        # 已预占的卡密属于未支付订单，由支付发货或过期清理改变状态
+        if card.status == CARD_RESERVED:
+            continue
+        changes.append((card.commodity_id, card.race, card.status, request.status))
         card.status = request.status
         if request.status == 1:
             card.sold_at = datetime.now()
         updated_count += 1
     
     await db.flush()
+    await InventoryService(db).track_cards(changes)
+    await cache.invalidate(
+        CacheTags.COMMODITY_LIST,
+        *{CacheTags.commodity(c.commodity_id) for c in cards},
+        db=db,
+    )
     
-    status_text = {0: "未出售", 1: "已出售", 2: "已锁定"}
+    status_text = {0: "未出售", 1: "已出售", 2: "已锁定", CARD_RESERVED: "已预占"}
     return {
         "message": f"成功将 {updated_count} 条卡密状态更新为 {status_text.get(request.status)}",
         "count": updated_count,
@@ -303,7 +324,7 @@ async def update_card(
 ):
     """更新卡密"""
     result = await db.execute(
-        select(Card).where(Card.id == card_id)
+        select(Card).where(Card.id == card_id).with_for_update()
     )
     card = result.scalar_one_or_none()
     
@@ -312,6 +333,8 @@ async def update_card(
     
     if card.status == 1:
         raise ValidationError("已售出的卡密不能修改")
+    if card.status == CARD_RESERVED:
+        raise ValidationError("已预占的卡密不能修改")
     
     if request.secret is not None:
         card.secret = request.secret
@@ -319,7 +342,11 @@ async def update_card(
         card.draft = request.draft
     if request.draft_premium is not None:
         card.draft_premium = request.draft_premium
-    if request.race is not None:
+    if request.race is not None and request.race != card.race:
+        await InventoryService(db).track_cards([
+            (card.commodity_id, card.race, card.status, None),
+            (card.commodity_id, request.race, None, card.status),
+        ])
         card.race = request.race
     if request.note is not None:
         card.note = request.note
@@ -335,7 +362,7 @@ async def delete_card(
 ):
     """删除卡密"""
     result = await db.execute(
-        select(Card).where(Card.id == card_id)
+        select(Card).where(Card.id == card_id).with_for_update()
     )
     card = result.scalar_one_or_none()
     
@@ -344,8 +371,16 @@ async def delete_card(
     
     if card.status == 1:
         raise ValidationError("已售出的卡密不能删除")
+    if card.status == CARD_RESERVED:
+        raise ValidationError("已预占的卡密不能删除")
     
     await db.delete(card)
+    await InventoryService(db).track_cards(
+        [(card.commodity_id, card.race, card.status, None)]
+    )
+    await cache.invalidate(
+        CacheTags.COMMODITY_LIST, CacheTags.commodity(card.commodity_id), db=db
+    )
     return {"message": "删除成功"}
 
 
@@ -360,6 +395,8 @@ async def batch_delete_cards(
         select(Card)
         .where(Card.id.in_(ids))
         .where(Card.status == 0)
+        .order_by(Card.id)
+        .with_for_update()
     )
     cards = result.scalars().all()
     
@@ -367,6 +404,15 @@ async def batch_delete_cards(
     for card in cards:
         await db.delete(card)
         deleted_count += 1
+    await InventoryService(db).track_cards(
+        (c.commodity_id, c.race, 0, None) for c in cards
+    )
+    
+    await cache.invalidate(
+        CacheTags.COMMODITY_LIST,
+        *{CacheTags.commodity(c.commodity_id) for c in cards},
+        db=db,
+    )
     
     return {
         "message": f"成功删除 {deleted_count} 条卡密",
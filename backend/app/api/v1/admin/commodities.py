@@ -2,19 +2,25 @@
 管理后台 - 商品管理
 """
 
+from datetime import datetime
 from typing import Optional, List
 from fastapi import APIRouter, Query
 from pydantic import BaseModel, Field
 from sqlalchemy import select, func
 
 from ...deps import DbSession, CurrentAdmin
+from ....core import cache
+from ....core.cache import CacheTags
 from ....models.commodity import Commodity
 from ....models.category import Category
 from ....models.card import Card
 from ....core.exceptions import NotFoundError, ValidationError
+from ....services import InventoryService
+from ....services.seckill import seckill
+from ....core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # ============== Schemas ==============
@@ -72,6 +78,8 @@ class CreateCommodityRequest(BaseModel):
     hide: int = 0
     inventory_hidden: int = 0
     seckill_status: int = 0
+    seckill_start_time: Optional[datetime] = None
+    seckill_end_time: Optional[datetime] = None
     level_disable: int = 0
     level_price: Optional[str] = None
     wholesale_config: Optional[str] = None
@@ -108,6 +116,8 @@ class UpdateCommodityRequest(BaseModel):
     hide: Optional[int] = None
     inventory_hidden: Optional[int] = None
     seckill_status: Optional[int] = None
+    seckill_start_time: Optional[datetime] = None
+    seckill_end_time: Optional[datetime] = None
     level_disable: Optional[int] = None
     level_price: Optional[str] = None
     wholesale_config: Optional[str] = None
@@ -183,6 +193,7 @@ async def create_category(
     )
     db.add(category)
     await db.flush()
+    await cache.invalidate(CacheTags.CATEGORIES, db=db)
     
     return {"id": category.id, "message": "创建成功"}
 
@@ -215,6 +226,7 @@ async def update_category(
         category.status = request.status
     if request.level_config is not None:
         category.level_config = request.level_config
+    await cache.invalidate(CacheTags.CATEGORIES, db=db)
     
     return {"message": "更新成功"}
 
@@ -243,6 +255,7 @@ async def delete_category(
         raise ValidationError("该分类下还有商品，无法删除")
     
     await db.delete(category)
+    await cache.invalidate(CacheTags.CATEGORIES, db=db)
     return {"message": "删除成功"}
 
 
@@ -261,6 +274,8 @@ async def batch_update_categories(
     if not categories:
         raise NotFoundError("未找到指定分类")
     
+    await cache.invalidate(CacheTags.CATEGORIES, db=db)
+    
     if request.action == "enable":
         for c in categories:
             c.status = 1
@@ -273,12 +288,14 @@ async def batch_update_categories(
     
     elif request.action == "delete":
         # 检查是否有商品
+        count_result = await db.execute(
+            select(Commodity.category_id, func.count())
+            .where(Commodity.category_id.in_([c.id for c in categories]))
+            .group_by(Commodity.category_id)
+        )
+        count_map = {row[0]: row[1] for row in count_result.all()}
         for c in categories:
-            count_result = await db.execute(
-                select(func.count()).select_from(Commodity)
-                .where(Commodity.category_id == c.id)
-            )
-            if count_result.scalar() > 0:
+            if count_map.get(c.id, 0) > 0:
                 raise ValidationError(f"分类「{c.name}」下还有商品，无法删除")
         
         for c in categories:
@@ -327,15 +344,12 @@ async def get_commodities(
     cat_result = await db.execute(select(Category))
     cat_map = {c.id: c.name for c in cat_result.scalars().all()}
     
+    # 批量统计库存
+    stock_map = await InventoryService(db).get_stock_map([c.id for c in commodities])
+    
     items = []
     for c in commodities:
-        # 统计库存
-        stock_result = await db.execute(
-            select(func.count()).select_from(Card)
-            .where(Card.commodity_id == c.id)
-            .where(Card.status == 0)
-        )
-        stock = stock_result.scalar()
+        stock = stock_map.get(c.id, 0)
         
         items.append({
             "id": c.id,
@@ -402,6 +416,9 @@ async def get_commodity(
         "hide": commodity.hide,
         "inventory_hidden": commodity.inventory_hidden,
         "seckill_status": commodity.seckill_status,
+        "seckill_start_time": commodity.seckill_start_time.isoformat() if commodity.seckill_start_time else None,
+        "seckill_end_time": commodity.seckill_end_time.isoformat() if commodity.seckill_end_time else None,
+        "seckill_remaining": await seckill.remaining(commodity.id) if commodity.seckill_status == 1 else None,
         "level_disable": commodity.level_disable,
         "level_price": commodity.level_price,
         "wholesale_config": commodity.wholesale_config,
@@ -453,6 +470,8 @@ async def create_commodity(
         hide=request.hide,
         inventory_hidden=request.inventory_hidden,
         seckill_status=request.seckill_status,
+        seckill_start_time=request.seckill_start_time,
+        seckill_end_time=request.seckill_end_time,
         level_disable=request.level_disable,
         level_price=request.level_price,
         wholesale_config=request.wholesale_config,
@@ -466,8 +485,10 @@ async def create_commodity(
     await db.flush()
     
     # 钩子：商品创建
-    from ....plugins.sdk.hooks import hooks, Events
-    await hooks.emit(Events.COMMODITY_CREATED, {"commodity": commodity})
+    from ....plugins.sdk.hooks import Events
+    from ....services import outbox
+    await outbox.publish(db, Events.COMMODITY_CREATED, {"commodity": commodity})
+    await cache.invalidate(CacheTags.COMMODITY_LIST, db=db)
     
     return {"id": commodity.id, "message": "创建成功"}
 
@@ -491,10 +512,41 @@ async def update_commodity(
     # 更新字段
     for field, value in request.model_dump(exclude_unset=True).items():
         setattr(commodity, field, value)
+    await cache.invalidate(
+        CacheTags.COMMODITY_LIST, CacheTags.commodity(commodity_id), db=db
+    )
     
     return {"message": "更新成功"}
 
 
+@router.post("/{commodity_id}/seckill/preload", summary="重新预载秒杀名额")
+async def preload_seckill(
+    commodity_id: int,
+    admin: CurrentAdmin,
+    db: DbSession,
+):
+    """按当前可售数量覆盖 Redis 中的秒杀名额（补货或名额与库存不一致时使用）"""
+    result = await db.execute(
+        select(Commodity).where(Commodity.id == commodity_id)
+    )
+    commodity = result.scalar_one_or_none()
+    
+    if not commodity:
+        raise NotFoundError("商品不存在")
+    if commodity.seckill_status != 1:
+        raise ValidationError("该商品未开启秒杀")
+    
+    units = await seckill.sellable_units(db, commodity)
+    if units is None:
+        raise ValidationError("不限库存的商品无需预载秒杀名额")
+    units = max(0, units - await seckill.unpaid_units(db, commodity))
+    if not await seckill.preload(commodity, units, force=True):
+        raise ValidationError("Redis 不可用，无法预载秒杀名额")
+    await seckill.sync()
+    
+    return {"message": "预载成功", "units": units}
+
+
 @router.delete("/{commodity_id}", summary="删除商品")
 async def delete_commodity(
     commodity_id: int,
@@ -536,5 +588,14 @@ async def delete_commodity(
     if sold_count > 0:
         raise ValidationError(f"该商品有 {sold_count} 张已售出的卡密，无法删除")
     
+    # 清理库存计数器（SQLite 等未启用外键级联时也能保持一致）
+    from ....models.inventory import InventoryCounter
+    await db.execute(
+        delete(InventoryCounter).where(InventoryCounter.commodity_id == commodity_id)
+    )
+    
     await db.delete(commodity)
+    await cache.invalidate(
+        CacheTags.COMMODITY_LIST, CacheTags.commodity(commodity_id), db=db
+    )
     return {"message": "删除成功"}
@@ -15,9 +15,10 @@ from ....models.coupon import Coupon
 from ....models.commodity import Commodity
 from ....models.category import Category
 from ....core.exceptions import NotFoundError, ValidationError
+from ....core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # ============== Schemas ==============
@@ -9,16 +9,19 @@ from fastapi import APIRouter
 from sqlalchemy import select, func, text
 
 from ...deps import DbSession, CurrentAdmin
+from ....core import cache
+from ....core.cache import CacheTags
 from ....models.order import Order
 from ....models.user import User
 from ....models.commodity import Commodity
-from ....models.card import Card
 from ....models.withdrawal import Withdrawal
 from ....models.recharge import RechargeOrder
 from ....models.announcement import Announcement
+from ....services import InventoryService
+from ....core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 @router.get("", summary="获取仪表盘数据")
@@ -117,13 +120,9 @@ async def get_dashboard(
         select(func.count()).select_from(Commodity).where(Commodity.status == 1)
     )).scalar() or 0
     
-    card_stock = (await db.execute(
-        select(func.count()).select_from(Card).where(Card.status == 0)
-    )).scalar() or 0
-    
-    card_sold = (await db.execute(
-        select(func.count()).select_from(Card).where(Card.status == 1)
-    )).scalar() or 0
+    card_totals = await InventoryService(db).get_totals()
+    card_stock = card_totals["stock"]
+    card_sold = card_totals["sold"]
     
     # ======== 提现统计 ========
     pending_withdrawals = (await db.execute(
@@ -186,6 +185,11 @@ async def get_announcements(
     db: DbSession,
 ):
     """获取最新公告（前台和仪表盘使用）"""
+    key = cache.cache_key("announcements")
+    cached = await cache.get(key)
+    if cached is not None:
+        return cached
+    
     result = await db.execute(
         select(Announcement)
         .where(Announcement.status == 1)
@@ -194,7 +198,7 @@ async def get_announcements(
     )
     items = result.scalars().all()
     
-    return {
+    data = {
         "items": [
             {
                 "id": item.id,
@@ -207,6 +211,8 @@ async def get_announcements(
             for item in items
         ],
     }
+    await cache.put(key, data, CacheTags.ANNOUNCEMENTS)
+    return data
 
 
 @router.get("/chart", summary="获取图表数据")
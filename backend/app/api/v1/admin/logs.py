@@ -10,9 +10,12 @@ from sqlalchemy import select, func
 from ...deps import DbSession, CurrentAdmin
 from ....models.log import OperationLog
 from ....models.user import User
+from ....utils.pagination import paginate, TotalMode
+from ....utils import search
+from ....core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # ============== APIs ==============
@@ -28,6 +31,8 @@ async def get_logs(
     ip: Optional[str] = Query(None, description="IP地址"),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor）"),
+    total: TotalMode = Query("exact", description="总数统计：exact 精确 / estimate 估算 / none 不统计"),
 ):
     """获取操作日志列表"""
     query = select(OperationLog)
@@ -35,30 +40,26 @@ async def get_logs(
     if user_id:
         query = query.where(OperationLog.user_id == user_id)
     if email:
-        query = query.where(OperationLog.email.contains(email))
+        query = query.where(search.fuzzy(OperationLog.email, email))
     if risk_level is not None:
         query = query.where(OperationLog.risk_level == risk_level)
     if action:
-        query = query.where(OperationLog.action.contains(action))
+        query = query.where(search.fuzzy(OperationLog.action, action))
     if ip:
-        query = query.where(OperationLog.ip.contains(ip))
+        query = query.where(search.fuzzy(OperationLog.ip, ip))
     
-    query = query.order_by(OperationLog.created_at.desc())
-    
-    # 总数
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-    
-    # 分页
-    query = query.offset((page - 1) * limit).limit(limit)
-    result = await db.execute(query)
-    logs = result.scalars().all()
+    # 分页（page/limit 或游标）
+    paged = await paginate(
+        db, query, (OperationLog.created_at.desc(), OperationLog.id.desc()),
+        page=page, limit=limit, cursor=cursor, total=total,
+    )
+    logs = paged.rows
     
     return {
-        "total": total,
+        "total": paged.total,
         "page": page,
         "limit": limit,
+        "next_cursor": paged.next_cursor,
         "items": [
             {
                 "id": log.id,
@@ -5,16 +5,20 @@
 from typing import Optional
 from fastapi import APIRouter, Query
 from pydantic import BaseModel, Field
-from sqlalchemy import select, func
+from sqlalchemy import select
 
 from ...deps import DbSession, CurrentAdmin
 from ....models.order import Order
 from ....models.commodity import Commodity
 from ....models.payment import PaymentMethod
 from ....core.exceptions import NotFoundError, ValidationError
+from ....utils.pagination import paginate, TotalMode
+from ....utils import search
+from ....services import InventoryService
+from ....core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # ============== Schemas ==============
@@ -36,6 +40,8 @@ async def get_orders(
     contact: Optional[str] = Query(None, description="联系方式"),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor）"),
+    total: TotalMode = Query("exact", description="总数统计：exact 精确 / estimate 估算 / none 不统计"),
 ):
     """获取订单列表"""
     query = select(Order)
@@ -45,21 +51,16 @@ async def get_orders(
     if delivery_status is not None:
         query = query.where(Order.delivery_status == delivery_status)
     if trade_no:
-        query = query.where(Order.trade_no.contains(trade_no))
+        query = query.where(search.identifier(Order.trade_no, trade_no))
     if contact:
-        query = query.where(Order.contact.contains(contact))
+        query = query.where(search.fuzzy(Order.contact, contact))
     
-    query = query.order_by(Order.created_at.desc())
-    
-    # 总数
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-    
-    # 分页
-    query = query.offset((page - 1) * limit).limit(limit)
-    result = await db.execute(query)
-    orders = result.scalars().all()
+    # 分页（page/limit 或游标）
+    paged = await paginate(
+        db, query, (Order.created_at.desc(), Order.id.desc()),
+        page=page, limit=limit, cursor=cursor, total=total,
+    )
+    orders = paged.rows
     
     # 获取商品和支付方式名称
     commodity_ids = list(set(o.commodity_id for o in orders))
@@ -100,9 +101,10 @@ async def get_orders(
     ]
     
     return {
-        "total": total,
+        "total": paged.total,
         "page": page,
         "limit": limit,
+        "next_cursor": paged.next_cursor,
         "items": items,
     }
 
@@ -208,5 +210,6 @@ async def refund_order(
         raise ValidationError("只有已支付的订单可以退款")
     
     order.status = 3  # 已退款
+    await InventoryService(db).order_refunded(order)
     
     return {"message": "退款成功（请人工处理实际退款）"}
@@ -26,8 +26,9 @@ from ....plugins.license_client import (
     APP_VERSION,
 )
 from ....utils.request import get_base_url
+from ....core.responses import ORJSONRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 logger = logging.getLogger("plugins.install")
 
 ## 解压时需要忽略的文件/目录
@@ -11,9 +11,12 @@ from ....models.recharge import RechargeOrder
 from ....models.user import User
 from ....models.payment import PaymentMethod
 from ....core.exceptions import NotFoundError
+from ....utils.pagination import paginate, TotalMode
+from ....utils import search
+from ....core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # ============== APIs ==============
@@ -27,6 +30,8 @@ async def get_recharge_orders(
     trade_no: Optional[str] = Query(None, description="订单号"),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor）"),
+    total: TotalMode = Query("exact", description="总数统计：exact 精确 / estimate 估算 / none 不统计"),
 ):
     """获取充值订单列表"""
     query = select(RechargeOrder)
@@ -36,19 +41,14 @@ async def get_recharge_orders(
     if user_id:
         query = query.where(RechargeOrder.user_id == user_id)
     if trade_no:
-        query = query.where(RechargeOrder.trade_no.contains(trade_no))
+        query = query.where(search.identifier(RechargeOrder.trade_no, trade_no))
     
-    query = query.order_by(RechargeOrder.created_at.desc())
-    
-    # 总数
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-    
-    # 分页
-    query = query.offset((page - 1) * limit).limit(limit)
-    result = await db.execute(query)
-    orders = result.scalars().all()
+    # 分页（page/limit 或游标）
+    paged = await paginate(
+        db, query, (RechargeOrder.created_at.desc(), RechargeOrder.id.desc()),
+        page=page, limit=limit, cursor=cursor, total=total,
+    )
+    orders = paged.rows
     
     # 获取用户和支付方式信息
     user_ids = list(set(o.user_id for o in orders))
@@ -69,9 +69,10 @@ async def get_recharge_orders(
         payment_map = {r.id: r.name for r in payments_result}
     
     return {
-        "total": total,
+        "total": paged.total,
         "page": page,
         "limit": limit,
+        "next_cursor": paged.next_cursor,
         "items": [
             {
                 "id": o.id,
@@ -182,8 +183,9 @@ async def complete_recharge(
         db.add(bill)
         
         # 钩子：用户充值
-        from ....plugins.sdk.hooks import hooks, Events
-        await hooks.emit(Events.USER_RECHARGED, {
+        from ....plugins.sdk.hooks import Events
+        from ....services import outbox
+        await outbox.publish(db, Events.USER_RECHARGED, {
             "user": user,
             "recharge_order": order,
             "amount": float(order.actual_amount),
@@ -8,12 +8,15 @@ from pydantic import BaseModel
 from sqlalchemy import select
 
 from ...deps import DbSession, CurrentAdmin
+from ....core import cache
+from ....core.cache import CacheTags
 from ....models.config import SystemConfig
 from ....models.payment import PaymentMethod
 from ....core.exceptions import NotFoundError
+from ....core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # 默认配置项
@@ -242,6 +245,7 @@ async def create_payment_setting(
     )
     db.add(payment)
     await db.flush()
+    await cache.invalidate(CacheTags.PAYMENTS, db=db)
     
     return {"id": payment.id, "message": "创建成功"}
 
@@ -276,6 +280,7 @@ async def update_payment_setting(
     payment.equipment = request.equipment
     payment.sort = request.sort
     payment.status = request.status
+    await cache.invalidate(CacheTags.PAYMENTS, db=db)
     
     return {"message": "更新成功"}
 
@@ -296,6 +301,7 @@ async def delete_payment_setting(
         raise NotFoundError("支付配置不存在")
     
     await db.delete(payment)
+    await cache.invalidate(CacheTags.PAYMENTS, db=db)
     return {"message": "删除成功"}
 
 
@@ -10,9 +10,10 @@ from fastapi import APIRouter, UploadFile, File, Form, HTTPException
 from fastapi.responses import FileResponse
 
 from ...deps import DbSession, CurrentAdmin
+from ....core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 # 允许的文件类型
 ALLOWED_IMAGE_TYPES = {
@@ -10,9 +10,10 @@ from sqlalchemy import select, func
 from ...deps import DbSession, CurrentAdmin
 from ....models.user import UserGroup
 from ....core.exceptions import NotFoundError, ValidationError
+from ....core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # ============== Schemas ==============
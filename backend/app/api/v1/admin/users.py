@@ -10,10 +10,12 @@ from sqlalchemy import select, func
 from ...deps import DbSession, CurrentAdmin
 from ....models.user import User
 from ....core.exceptions import NotFoundError, ValidationError
-from ....core.security import get_password_hash
+from ....core.security import get_password_hash_async
+from ....utils import search
+from ....core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # ============== Schemas ==============
@@ -55,9 +57,7 @@ async def get_users(
         query = query.where(User.status == status)
     if keywords:
         query = query.where(
-            User.username.contains(keywords) |
-            User.email.contains(keywords) |
-            User.phone.contains(keywords)
+            search.fuzzy_any((User.username, User.email, User.phone), keywords)
         )
     
     query = query.order_by(User.id.desc())
@@ -178,7 +178,7 @@ async def reset_password(
     if not user:
         raise NotFoundError("用户不存在")
     
-    password_hash, salt = get_password_hash(request.password)
+    password_hash, salt = await get_password_hash_async(request.password)
     user.password_hash = password_hash
     user.salt = salt
     
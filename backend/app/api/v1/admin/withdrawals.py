@@ -13,9 +13,11 @@ from ....models.withdrawal import Withdrawal
 from ....models.user import User
 from ....models.bill import Bill
 from ....core.exceptions import NotFoundError, ValidationError
+from ....utils.pagination import paginate, TotalMode
+from ....core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # ============== Schemas ==============
@@ -41,6 +43,8 @@ async def get_withdrawals(
     user_id: Optional[int] = Query(None, description="用户ID"),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor）"),
+    total: TotalMode = Query("exact", description="总数统计：exact 精确 / estimate 估算 / none 不统计"),
 ):
     """获取提现列表"""
     query = select(Withdrawal)
@@ -50,17 +54,12 @@ async def get_withdrawals(
     if user_id:
         query = query.where(Withdrawal.user_id == user_id)
     
-    query = query.order_by(Withdrawal.created_at.desc())
-    
-    # 总数
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-    
-    # 分页
-    query = query.offset((page - 1) * limit).limit(limit)
-    result = await db.execute(query)
-    items = result.scalars().all()
+    # 分页（page/limit 或游标）
+    paged = await paginate(
+        db, query, (Withdrawal.created_at.desc(), Withdrawal.id.desc()),
+        page=page, limit=limit, cursor=cursor, total=total,
+    )
+    items = paged.rows
     
     # 获取用户信息
     user_ids = list(set(w.user_id for w in items))
@@ -72,9 +71,10 @@ async def get_withdrawals(
         user_map = {r.id: r.username for r in users_result}
     
     return {
-        "total": total,
+        "total": paged.total,
         "page": page,
         "limit": limit,
+        "next_cursor": paged.next_cursor,
         "items": [
             {
                 "id": w.id,
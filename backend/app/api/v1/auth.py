@@ -11,18 +11,20 @@ from sqlalchemy import select, or_
 from ..deps import DbSession, CurrentUser
 from ...models.user import User
 from ...core.security import (
-    get_password_hash, 
-    verify_password,
+    get_password_hash_async,
+    verify_password_async,
     needs_rehash,
     create_access_token,
     create_refresh_token,
     verify_token,
 )
 from ...core.exceptions import ValidationError, AuthenticationError
-from ...plugins.sdk.hooks import hooks, Events
+from ...plugins.sdk.hooks import Events
+from ...services import outbox
+from ...core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # ============== Schemas ==============
@@ -118,7 +120,7 @@ async def register(
             pass
     
     # 创建用户
-    password_hash, salt = get_password_hash(request.password)
+    password_hash, salt = await get_password_hash_async(request.password)
     user = User(
         username=request.username,
         email=request.email,
@@ -132,7 +134,7 @@ async def register(
     await db.flush()
     
     # 钩子：用户注册
-    await hooks.emit(Events.USER_REGISTERED, {"user": user, "ip": req.client.host if req.client else None})
+    await outbox.publish(db, Events.USER_REGISTERED, {"user": user, "ip": req.client.host if req.client else None})
     
     # 生成Token
     token_data = {"sub": str(user.id)}
@@ -169,12 +171,12 @@ async def login(
         raise AuthenticationError("用户名或密码错误")
     
     # 验证密码
-    if not verify_password(request.password, user.password_hash, user.salt):
+    if not await verify_password_async(request.password, user.password_hash, user.salt):
         raise AuthenticationError("用户名或密码错误")
     
-    ## 透明升级：旧 SHA256 密码自动迁移到 bcrypt（用户无感知）
+    ## 透明升级：旧 SHA256 密码或低工作因子的 bcrypt 自动重新哈希（用户无感知）
     if needs_rehash(user.password_hash):
-        new_hash, new_salt = get_password_hash(request.password)
+        new_hash, new_salt = await get_password_hash_async(request.password)
         user.password_hash = new_hash
         user.salt = new_salt
     
@@ -187,7 +189,7 @@ async def login(
     user.last_login_ip = req.client.host if req.client else None
     
     # 钩子：用户登录
-    await hooks.emit(Events.USER_LOGIN, {"user": user, "ip": req.client.host if req.client else None})
+    await outbox.publish(db, Events.USER_LOGIN, {"user": user, "ip": req.client.host if req.client else None})
     
     # 生成Token
     token_data = {"sub": str(user.id)}
@@ -13,10 +13,11 @@ from typing import Optional
 from ...database import get_db
 from ...models.user import User
 from ...models.config import SystemConfig
-from ...core.security import get_password_hash
+from ...core.security import get_password_hash_async
 from ...core.exceptions import ValidationError, AuthorizationError
+from ...core.responses import ORJSONRoute
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # ============== Schemas ==============
@@ -81,7 +82,7 @@ async def do_install(
         raise ValidationError("用户名已存在")
 
     # 创建管理员
-    password_hash, salt = get_password_hash(request.admin_password)
+    password_hash, salt = await get_password_hash_async(request.admin_password)
     admin = User(
         username=request.admin_username,
         email=request.admin_email,
@@ -13,9 +13,12 @@ from ...models.commodity import Commodity
 from ...models.payment import PaymentMethod
 from ...core.exceptions import NotFoundError, ValidationError
 from ...services.order import OrderService
+from ...services.idempotency import IdempotencyService
+from ...services.seckill import seckill
+from ...core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # ============== Schemas ==============
@@ -31,6 +34,7 @@ class CreateOrderRequest(BaseModel):
     card_id: Optional[int] = Field(None, description="预选卡密ID")
     coupon: Optional[str] = Field(None, description="优惠券码")
     widget: Optional[dict] = Field(None, description="自定义控件数据")
+    request_no: Optional[str] = Field(None, description="幂等键（Idempotency-Key 请求头优先）")
 
 
 class OrderResponse(BaseModel):
@@ -83,29 +87,45 @@ async def create_order(
     user: CurrentUserOptional,
     req: Request,
 ):
-    """创建订单 — 委托给 OrderService 统一处理"""
+    """
+    创建订单 — 委托给 OrderService 统一处理
+    
+    携带 Idempotency-Key 请求头（或 request_no）时，同一个键重试返回第一次的结果；
+    秒杀商品先在 Redis 上抢名额（见 services.seckill）。
+    """
     from ...utils.request import get_callback_base_url
     
     cb_base = get_callback_base_url(req)
-    
-    svc = OrderService(db)
-    result = await svc.create_order(
+    params = dict(
         commodity_id=request.commodity_id,
         quantity=request.quantity,
         payment_id=request.payment_id,
         contact=request.contact,
-        user=user,
         password=request.password,
         race=request.race,
         card_id=request.card_id,
         coupon_code=request.coupon,
         widget=request.widget,
-        client_ip=req.client.host if req.client else None,
-        callback_url=cb_base,
-        return_url=cb_base,
     )
     
-    return result
+    svc = OrderService(db)
+    
+    async def create(request_no: Optional[str] = None, request_digest: Optional[str] = None):
+        async with seckill.admit(request.commodity_id, request.quantity):
+            return await svc.create_order(
+                **params,
+                user=user,
+                client_ip=req.client.host if req.client else None,
+                callback_url=cb_base,
+                return_url=cb_base,
+                request_no=request_no,
+                request_digest=request_digest,
+            )
+    
+    idempotency_key = req.headers.get("Idempotency-Key") or request.request_no
+    if idempotency_key:
+        return await IdempotencyService(db).create_order(idempotency_key, user, params, create)
+    return await create()
 
 
 @router.get("/{trade_no}", response_model=OrderDetailResponse, summary="查询订单")
@@ -183,8 +203,8 @@ async def get_order_secret(
     if order.password:
         is_valid = False
         if order.password.startswith("$2b$"):
-            from ...core.security import verify_password
-            is_valid = verify_password(request.password, order.password, "")
+            from ...core.security import verify_password_async
+            is_valid = await verify_password_async(request.password, order.password, "")
         else:
             is_valid = (order.password == request.password)
             
@@ -22,14 +22,20 @@ from ...models.bill import Bill
 from ...payments import get_payment_handler as legacy_get_handler
 from ...plugins import plugin_manager, PAYMENT_HANDLERS
 from ...plugins.sdk.payment_base import PaymentPluginBase
-from ...plugins.sdk.hooks import hooks, Events
+from ...plugins.sdk.hooks import Events
+from ...services import outbox
+from ...core.responses import ORJSONRoute
+from ...core import metrics
+from ...core.tracing import tracer
 
 logger = logging.getLogger("payments.callback")
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
+@tracer.traced("payments.handle_callback")
 async def _handle_callback(handler: str, request: Request, db):
     """通用支付回调处理"""
+    tracer.current().set_attribute("handler", handler)
     
     # 1. 获取回调数据
     content_type = request.headers.get("content-type", "")
@@ -83,21 +89,27 @@ async def _handle_callback(handler: str, request: Request, db):
             return "invalid handler"
     
     # 3. 验证回调签名和数据
-    callback_result = await payment_instance.verify_callback(data)
+    with tracer.span("payment.verify_callback", handler=handler) as span:
+        callback_result = await metrics.track_payment(
+            handler, "verify_callback", payment_instance.verify_callback(data),
+        )
+        span.set_attributes(success=callback_result.success, trade_no=callback_result.trade_no)
     if not callback_result.success:
         logger.warning(f"Callback verify failed [{handler}]: {callback_result.error_msg}")
         return payment_instance.get_callback_response(False)
     
     # 4. 查找商品订单或充值订单
-    result = await db.execute(
-        select(Order).where(Order.trade_no == callback_result.trade_no).with_for_update()
-    )
-    order = result.scalar_one_or_none()
+    tracer.current().set_attribute("trade_no", callback_result.trade_no)
+    with tracer.span("payments.lock_order"):
+        result = await db.execute(
+            select(Order).where(Order.trade_no == callback_result.trade_no).with_for_update()
+        )
+        order = result.scalar_one_or_none()
 
-    recharge_result = await db.execute(
-        select(RechargeOrder).where(RechargeOrder.trade_no == callback_result.trade_no).with_for_update()
-    )
-    recharge_order = recharge_result.scalar_one_or_none()
+        recharge_result = await db.execute(
+            select(RechargeOrder).where(RechargeOrder.trade_no == callback_result.trade_no).with_for_update()
+        )
+        recharge_order = recharge_result.scalar_one_or_none()
 
     if not order and not recharge_order:
         logger.warning(f"Order not found: {callback_result.trade_no}")
@@ -140,7 +152,8 @@ async def _handle_callback(handler: str, request: Request, db):
         )
         db.add(bill)
 
-        await hooks.emit(
+        await outbox.publish(
+            db,
             Events.PAYMENT_CALLBACK,
             {
                 "recharge_order": recharge_order,
@@ -148,7 +161,8 @@ async def _handle_callback(handler: str, request: Request, db):
                 "callback_data": data,
             },
         )
-        await hooks.emit(
+        await outbox.publish(
+            db,
             Events.USER_RECHARGED,
             {
                 "user": user,
@@ -176,18 +190,20 @@ async def _handle_callback(handler: str, request: Request, db):
     order.status = 1
     order.paid_at = datetime.now()
     order.external_trade_no = callback_result.external_trade_no
+    from ...services.inventory import InventoryService
+    await InventoryService(db).order_paid(order)
     
-    # 8. 钩子：支付回调 + 支付成功
-    await hooks.emit(Events.PAYMENT_CALLBACK, {"order": order, "handler": handler, "callback_data": data})
-    await hooks.emit(Events.ORDER_PAID, {"order": order, "callback_data": data})
+    # 8. 钩子：支付回调 + 支付成功（事务提交后投递）
+    await outbox.publish(db, Events.PAYMENT_CALLBACK, {"order": order, "handler": handler, "callback_data": data})
+    await outbox.publish(db, Events.ORDER_PAID, {"order": order, "callback_data": data})
     
     # 9. 发货（委托 OrderService，带行锁防并发超卖）
     from ...services.order import OrderService
     svc = OrderService(db)
-    secret = await svc.deliver_order(order)
+    await svc.deliver_order(order)
     
-    # 10. 钩子：发货完成
-    await hooks.emit(Events.ORDER_DELIVERED, {"order": order, "secret": secret})
+    # 10. 钩子：发货完成（卡密在分发时从订单读取）
+    await outbox.publish(db, Events.ORDER_DELIVERED, {"order": order})
     
     # 11. 处理分销佣金（Decimal 精度）
     await svc._process_commission(order)
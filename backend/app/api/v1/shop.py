@@ -2,7 +2,6 @@
 鍟嗗煄鎺ュ彛
 """
 
-import json as json_lib
 from typing import Optional, List, Dict, Any
 from fastapi import APIRouter, Query, Request
 from pydantic import BaseModel, EmailStr, Field
@@ -15,11 +14,19 @@ from ...models.commodity import Commodity
 from ...models.card import Card
 from ...models.payment import PaymentMethod
 from ...models.order import Order
-from ...services import OrderService
+from ...services import OrderService, InventoryService, IdempotencyService
+from ...services.pricing import get_pricing_plan
+from ...services.catalog_search import catalog_search
+from ...services.seckill import seckill
+from ...core import cache
+from ...core.cache import CacheTags
+from ...core.conditional import conditional
 from ...core.exceptions import ValidationError, NotFoundError
+from ...utils.pagination import paginate, TotalMode
+from ...core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # ============== Schemas ==============
@@ -128,10 +135,19 @@ class PaymentMethodResponse(BaseModel):
 
 @router.get("/categories", response_model=List[CategoryResponse], summary="鑾峰彇鍒嗙被鍒楄〃")
 async def get_categories(
+    request: Request,
     db: DbSession,
     user: CurrentUserOptional,
 ):
     """鑾峰彇鍟嗗搧鍒嗙被鍒楄〃"""
+    cond = await conditional(request, "categories", CacheTags.CATEGORIES)
+    if cond.not_modified:
+        return cond.not_modified_response()
+    
+    key = cache.cache_key("categories")
+    cached = await cache.get(key)
+    if cached is not None:
+        return cond.response(cached)
     
     query = (
         select(Category)
@@ -143,11 +159,46 @@ async def get_categories(
     result = await db.execute(query)
     categories = result.scalars().all()
     
-    return categories
+    data = [CategoryResponse.model_validate(c).model_dump() for c in categories]
+    await cache.put(key, data, CacheTags.CATEGORIES)
+    return cond.response(data)
+
+
+async def _build_commodity_items(db, commodities, user) -> List[Dict[str, Any]]:
+    """构建商品列表项（库存、销量批量读取计数器）"""
+    inventory = InventoryService(db)
+    stock_map = await inventory.get_stock_map(
+        [c.id for c in commodities if not c.shared_id]
+    )
+    sold_map = await inventory.get_sold_map([c.id for c in commodities])
+    
+    items = []
+    for c in commodities:
+        if not c.shared_id:
+            # 有卡密时使用卡密数量，否则使用商品表的 stock 字段
+            card_stock = stock_map.get(c.id, 0)
+            stock = card_stock if card_stock > 0 else c.stock
+        else:
+            stock = c.stock
+        
+        items.append({
+            "id": c.id,
+            "name": c.name,
+            "cover": c.cover,
+            "price": float(c.price),
+            "user_price": float(c.user_price) if user else float(c.price),
+            "category_id": c.category_id,
+            "stock": stock,
+            "sold_count": sold_map.get(c.id, 0),
+            "delivery_way": c.delivery_way,
+            "recommend": c.recommend,
+        })
+    return items
 
 
 @router.get("/commodities", summary="鑾峰彇鍟嗗搧鍒楄〃")
 async def get_commodities(
+    request: Request,
     db: DbSession,
     user: CurrentUserOptional,
     category_id: Optional[int] = Query(None, description="鍒嗙被ID"),
@@ -155,8 +206,45 @@ async def get_commodities(
     recommend: Optional[int] = Query(None, description="鍙湅鎺ㄨ崘"),
     page: int = Query(1, ge=1, description="椤电爜"),
     limit: int = Query(20, ge=1, le=100, description="姣忛〉鏁伴噺"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor）"),
+    total: TotalMode = Query("exact", description="总数统计：exact 精确 / estimate 估算 / none 不统计"),
 ):
     """鑾峰彇鍟嗗搧鍒楄〃"""
+    # 关键词搜索走进程内索引（按相关度排序，不缓存）；相关度排序没有游标，
+    # 携带 cursor 的请求按下面的普通列表分页
+    if keywords and cursor is None and catalog_search.ready:
+        docs = catalog_search.search(keywords, category_id=category_id, recommend=recommend)
+        offset = (page - 1) * limit
+        # 索引中的库存等字段是建索引时的快照，当前页的商品从数据库读取
+        page_ids = [d.id for d in docs[offset:offset + limit]]
+        result = await db.execute(select(Commodity).where(Commodity.id.in_(page_ids)))
+        by_id = {c.id: c for c in result.scalars().all()}
+        commodities = [by_id[i] for i in page_ids if i in by_id]
+        cond = await conditional(request, "commodity_search", member=bool(user))
+        return cond.response({
+            "total": len(docs) if total != "none" else None,
+            "page": page,
+            "limit": limit,
+            "next_cursor": None,
+            "items": await _build_commodity_items(db, commodities, user),
+        })
+    
+    cond = await conditional(
+        request, "commodities", CacheTags.COMMODITY_LIST, member=bool(user),
+        category_id=category_id, keywords=keywords, recommend=recommend,
+        page=page, limit=limit, cursor=cursor, total=total,
+    )
+    if cond.not_modified:
+        return cond.not_modified_response()
+    
+    key = cache.cache_key(
+        "commodities", member=bool(user), category_id=category_id,
+        keywords=keywords, recommend=recommend, page=page, limit=limit,
+        cursor=cursor, total=total,
+    )
+    cached = await cache.get(key)
+    if cached is not None:
+        return cond.response(cached)
     
     query = (
         select(Commodity)
@@ -174,71 +262,54 @@ async def get_commodities(
     if recommend == 1:
         query = query.where(Commodity.recommend == 1)
     
-    # 鎺掑簭
-    query = query.order_by(Commodity.sort.asc(), Commodity.id.desc())
-    
-    # 缁熻鎬绘暟
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-    
-    # 鍒嗛〉
-    query = query.offset((page - 1) * limit).limit(limit)
-    
-    result = await db.execute(query)
-    commodities = result.scalars().all()
+    # 排序 + 分页（page/limit 或游标）
+    paged = await paginate(
+        db, query, (Commodity.sort.asc(), Commodity.id.desc()),
+        page=page, limit=limit, cursor=cursor, total=total,
+    )
+    commodities = paged.rows
     
-    # Build commodity list
-    items = []
-    for c in commodities:
-        stock = 0
-        
-        if not c.shared_id:
-            # 缁熻鍙敤鍗″瘑鏁伴噺锛堟棤璁哄彂璐ф柟寮忥級
-            card_count_result = await db.execute(
-                select(func.count())
-                .select_from(Card)
-                .where(Card.commodity_id == c.id)
-                .where(Card.status == 0)
-            )
-            card_stock = card_count_result.scalar() or 0
-            
-            # 濡傛灉鏈夊崱瀵嗭紝浣跨敤鍗″瘑鏁伴噺锛涘惁鍒欎娇鐢ㄥ晢鍝佽〃鐨?stock 瀛楁
-            stock = card_stock if card_stock > 0 else c.stock
-        else:
-            stock = c.stock
-        
-        # 缁熻閿€閲?(TODO: 浼樺寲鏌ヨ)
-        sold_count = 0
-        
-        items.append({
-            "id": c.id,
-            "name": c.name,
-            "cover": c.cover,
-            "price": float(c.price),
-            "user_price": float(c.user_price) if user else float(c.price),
-            "category_id": c.category_id,
-            "stock": stock,
-            "sold_count": sold_count,
-            "delivery_way": c.delivery_way,
-            "recommend": c.recommend,
-        })
+    items = await _build_commodity_items(db, commodities, user)
     
-    return {
-        "total": total,
+    data = {
+        "total": paged.total,
         "page": page,
         "limit": limit,
+        "next_cursor": paged.next_cursor,
         "items": items,
     }
+    await cache.put(key, data, CacheTags.COMMODITY_LIST)
+    return cond.response(data)
+
+
+@router.get("/search/suggest", summary="搜索联想")
+async def search_suggest(
+    q: str = Query(..., min_length=1, max_length=50, description="输入的关键词"),
+    limit: int = Query(8, ge=1, le=20),
+):
+    """根据输入返回相关商品名称（进程内索引，不查库）"""
+    return catalog_search.suggest(q, limit)
 
 
 @router.get("/commodities/{commodity_id}", response_model=CommodityDetailResponse, summary="鑾峰彇鍟嗗搧璇︽儏")
 async def get_commodity_detail(
     commodity_id: int,
+    request: Request,
     db: DbSession,
     user: CurrentUserOptional,
 ):
     """鑾峰彇鍟嗗搧璇︽儏"""
+    cond = await conditional(
+        request, "commodity", CacheTags.commodity(commodity_id),
+        member=bool(user), commodity_id=commodity_id,
+    )
+    if cond.not_modified:
+        return cond.not_modified_response()
+    
+    key = cache.cache_key(f"commodity:{commodity_id}", member=bool(user))
+    cached = await cache.get(key)
+    if cached is not None:
+        return cond.response(cached)
     
     result = await db.execute(
         select(Commodity)
@@ -254,134 +325,16 @@ async def get_commodity_detail(
     # 璁＄畻搴撳瓨锛氱粺璁″彲鐢ㄥ崱瀵嗘暟閲忥紝濡傛灉娌℃湁鍗″瘑鍒欎娇鐢ㄥ晢鍝佽〃鐨?stock 瀛楁
     stock = 0
     if not commodity.shared_id:
-        card_count_result = await db.execute(
-            select(func.count())
-            .select_from(Card)
-            .where(Card.commodity_id == commodity.id)
-            .where(Card.status == 0)
-        )
-        card_stock = card_count_result.scalar() or 0
+        card_stock = await InventoryService(db).get_stock(commodity.id)
         stock = card_stock if card_stock > 0 else commodity.stock
     else:
         stock = commodity.stock
     
-    # 瑙ｆ瀽鍟嗗搧閰嶇疆鍙傛暟锛堢绫汇€佹壒鍙戠瓑锛?
-    categories = []  # 鍟嗗搧绉嶇被 [category]
-    wholesale = []   # 鎵瑰彂瑙勫垯 [wholesale]
-    sku_config = []  # SKU瑙勬牸 [sku]
-    category_wholesale = {}  # 绉嶇被鎵瑰彂 [category_wholesale]
-    has_wholesale_from_json = False
-
-    # 优先读取新的 wholesale_config（JSON）
-    if commodity.wholesale_config:
-        try:
-            config_items = json_lib.loads(commodity.wholesale_config)
-            if isinstance(config_items, list):
-                for item in config_items:
-                    if not isinstance(item, dict):
-                        continue
-
-                    quantity = int(item.get("quantity", 0))
-                    if quantity <= 0:
-                        continue
-
-                    if item.get("type") == "percent" or item.get("discount_percent") is not None:
-                        wholesale.append({
-                            "quantity": quantity,
-                            "discount_percent": float(item.get("discount_percent")),
-                            "type": "percent"
-                        })
-                    elif item.get("price") is not None:
-                        wholesale.append({
-                            "quantity": quantity,
-                            "price": float(item.get("price")),
-                            "type": "fixed"
-                        })
-
-                has_wholesale_from_json = len(wholesale) > 0
-        except (TypeError, ValueError):
-            pass
-
-    if commodity.config:
-        config_text = commodity.config
-        current_section = None
-        for line in config_text.strip().split("\n"):
-            line = line.strip()
-            if not line or line.startswith("#"):  # 璺宠繃绌鸿鍜屾敞閲?
-                continue
-            if line.startswith("[") and line.endswith("]"):
-                current_section = line[1:-1].lower()
-            elif "=" in line and current_section:
-                key, value = line.split("=", 1)
-                key = key.strip()
-                value = value.strip()
-                try:
-                    if current_section == "category":
-                        # 绉嶇被=浠锋牸
-                        categories.append({
-                            "name": key,
-                            "price": float(value)
-                        })
-                    elif current_section == "wholesale":
-                        if has_wholesale_from_json:
-                            continue
-                        # 鍏ㄥ眬鎵瑰彂瑙勫垯锛堜粎褰撳晢鍝佹棤绉嶇被鏃朵娇鐢級
-                        # 鏀寔涓ょ鏍煎紡锛氭暟閲?浠锋牸 鎴?鏁伴噺=鐧惧垎姣?
-                        if value.endswith("%"):
-                            # 鐧惧垎姣旀姌鎵?
-                            wholesale.append({
-                                "quantity": int(key),
-                                "discount_percent": float(value[:-1]),
-                                "type": "percent"
-                            })
-                        else:
-                            # 鍥哄畾浠锋牸
-                            wholesale.append({
-                                "quantity": int(key),
-                                "price": float(value),
-                                "type": "fixed"
-                            })
-                    elif current_section == "sku":
-                        # 瑙勬牸缁?閫夐」=鍔犱环
-                        if "." in key:
-                            group, option = key.split(".", 1)
-                            sku_config.append({
-                                "group": group,
-                                "option": option,
-                                "extra_price": float(value)
-                            })
-                    elif current_section == "category_wholesale":
-                        # 绉嶇被鎵瑰彂瑙勫垯锛氱绫?鏁伴噺=浠锋牸 鎴?绉嶇被.鏁伴噺=鐧惧垎姣?
-                        if "." in key:
-                            cat_name, qty = key.split(".", 1)
-                            if cat_name not in category_wholesale:
-                                category_wholesale[cat_name] = []
-                            if value.endswith("%"):
-                                category_wholesale[cat_name].append({
-                                    "quantity": int(qty),
-                                    "discount_percent": float(value[:-1]),
-                                    "type": "percent"
-                                })
-                            else:
-                                category_wholesale[cat_name].append({
-                                    "quantity": int(qty),
-                                    "price": float(value),
-                                    "type": "fixed"
-                                })
-                except (ValueError, TypeError):
-                    pass
-    # Sort wholesale rules by quantity
-    wholesale.sort(key=lambda x: x["quantity"] )
-    for cat_name in category_wholesale:
-        category_wholesale[cat_name].sort(key=lambda x: x['quantity'])
+    # 商品配置参数（种类、批发等），与下单计价共用编译后的定价方案
+    pricing = get_pricing_plan(commodity).to_display()
+    
     # Count paid orders
-    sold_result = await db.execute(
-        select(func.count())
-        .select_from(Order)
-        .where(Order.commodity_id == commodity.id)
-        .where(Order.status == 1)
-    )
-    sold_count = sold_result.scalar() or 0
+    sold_count = await InventoryService(db).get_sold(commodity.id)
     
     result = {
         "id": commodity.id,
@@ -405,12 +358,10 @@ async def get_commodity_detail(
         "leave_message": commodity.leave_message,
         "wholesale_config": commodity.wholesale_config,
         # 瑙ｆ瀽鍚庣殑閰嶇疆鍙傛暟
-        "categories": categories if categories else None,
-        "wholesale": wholesale if wholesale else None,
-        "sku_config": sku_config if sku_config else None,
-        "category_wholesale": category_wholesale if category_wholesale else None,
+        **pricing,
     }
-    return result
+    await cache.put(key, result, CacheTags.commodity(commodity_id))
+    return cond.response(result)
 
 
 @router.get("/commodities/{commodity_id}/cards", summary="Get commodity draft cards")
@@ -471,10 +422,19 @@ async def get_commodity_cards(
 
 @router.get("/payments", response_model=List[PaymentMethodResponse], summary="鑾峰彇鏀粯鏂瑰紡")
 async def get_payments(
+    request: Request,
     db: DbSession,
     user: CurrentUserOptional,
 ):
     """Get available payment methods"""
+    cond = await conditional(request, "payments", CacheTags.PAYMENTS, member=bool(user))
+    if cond.not_modified:
+        return cond.not_modified_response()
+    
+    key = cache.cache_key("payments", member=bool(user))
+    cached = await cache.get(key)
+    if cached is not None:
+        return cond.response(cached)
     
     query = (
         select(PaymentMethod)
@@ -489,7 +449,9 @@ async def get_payments(
     result = await db.execute(query)
     payments = result.scalars().all()
     
-    return payments
+    data = [PaymentMethodResponse.model_validate(p).model_dump() for p in payments]
+    await cache.put(key, data, CacheTags.PAYMENTS)
+    return cond.response(data)
 
 
 # ============== 璁㈠崟鐩稿叧 ==============
@@ -505,6 +467,7 @@ class CreateOrderRequest(BaseModel):
     card_id: Optional[int] = None
     coupon_code: Optional[str] = None
     widget: Optional[Dict[str, Any]] = None
+    request_no: Optional[str] = Field(None, description="幂等键（Idempotency-Key 请求头优先）")
 
 
 class OrderResponse(BaseModel):
@@ -536,24 +499,37 @@ async def create_order(
     from ...utils.request import get_callback_base_url
     cb_base = get_callback_base_url(request)
     
-    result = await order_service.create_order(
+    params = dict(
         commodity_id=data.commodity_id,
         quantity=data.quantity,
         payment_id=data.payment_id,
         contact=data.contact,
-        user=user,
         password=data.password,
         race=data.race,
         card_id=data.card_id,
         coupon_code=data.coupon_code,
         widget=data.widget,
-        client_ip=client_ip,
-        callback_url=cb_base,
-        return_url=cb_base,
     )
     
-    # OrderService.create_order() 鍐呴儴宸?commit锛屾棤闇€閲嶅
-    return result
+    # OrderService.create_order() 内部已 commit，无需重复
+    # 秒杀商品先在 Redis 上抢名额，抢不到的不进入下单流程
+    async def create(request_no: Optional[str] = None, request_digest: Optional[str] = None):
+        async with seckill.admit(data.commodity_id, data.quantity):
+            return await order_service.create_order(
+                **params,
+                user=user,
+                client_ip=client_ip,
+                callback_url=cb_base,
+                return_url=cb_base,
+                request_no=request_no,
+                request_digest=request_digest,
+            )
+    
+    # 携带幂等键时，同一个键重试返回第一次的结果
+    idempotency_key = request.headers.get("Idempotency-Key") or data.request_no
+    if idempotency_key:
+        return await IdempotencyService(db).create_order(idempotency_key, user, params, create)
+    return await create()
 
 
 @router.get("/orders/{trade_no}", summary="鏌ヨ璁㈠崟")
@@ -597,16 +573,17 @@ async def get_order(
 # ============== 主题相关 ==============
 
 @router.get("/theme", summary="获取当前激活主题配置")
-async def get_active_theme():
+async def get_active_theme(request: Request):
     """
     获取当前激活的主题配置（公开接口，无需登录）。
     前端启动时调用此接口加载主题。如果没有激活的主题插件，返回 null（前端使用默认样式）。
     """
     from ...plugins import plugin_manager
 
+    cond = await conditional(request, "theme")
     theme_instance = plugin_manager.get_active_theme()
     if not theme_instance or not theme_instance.theme_config:
-        return {"theme": None}
+        return cond.response({"theme": None})
 
-    return {"theme": theme_instance.theme_config.to_dict()}
+    return cond.response({"theme": theme_instance.theme_config.to_dict()})
 
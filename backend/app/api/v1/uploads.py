@@ -5,9 +5,10 @@
 import os
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import FileResponse
+from ...core.responses import ORJSONRoute
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 def get_upload_dir() -> str:
@@ -3,7 +3,6 @@
 """
 
 import json as json_lib
-from datetime import datetime, timezone
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional, List
 from fastapi import APIRouter, Query, Request
@@ -18,12 +17,17 @@ from ...models.config import SystemConfig
 from ...models.payment import PaymentMethod
 from ...models.recharge import RechargeOrder
 from ...core.exceptions import NotFoundError, ValidationError
+from ...utils.pagination import paginate, TotalMode
+from ...utils import search
 from ...payments import get_payment_handler as legacy_get_handler
 from ...plugins import plugin_manager, PAYMENT_HANDLERS
 from ...plugins.sdk.payment_base import PaymentPluginBase
+from ...core.responses import ORJSONRoute
+from ...core import metrics
+from ...core.trade_no import generate_trade_no
 
 
-router = APIRouter()
+router = APIRouter(route_class=ORJSONRoute)
 
 
 # ============== Schemas ==============
@@ -135,15 +139,15 @@ async def change_password(
     db: DbSession,
 ):
     """修改密码"""
-    from ...core.security import verify_password, get_password_hash
+    from ...core.security import verify_password_async, get_password_hash_async
     
     # 验证旧密码
-    if not verify_password(request.old_password, user.password_hash, user.salt):
+    if not await verify_password_async(request.old_password, user.password_hash, user.salt):
         from ...core.exceptions import ValidationError
         raise ValidationError("旧密码错误")
     
     # 设置新密码
-    password_hash, salt = get_password_hash(request.new_password)
+    password_hash, salt = await get_password_hash_async(request.new_password)
     user.password_hash = password_hash
     user.salt = salt
     
@@ -158,6 +162,8 @@ async def get_my_orders(
     trade_no: Optional[str] = Query(None, description="订单号"),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor）"),
+    total: TotalMode = Query("exact", description="总数统计：exact 精确 / estimate 估算 / none 不统计"),
 ):
     """获取当前用户的订单列表"""
     from ...models.commodity import Commodity
@@ -170,23 +176,17 @@ async def get_my_orders(
             query = query.where(Order.status == status)
         
         if trade_no:
-            query = query.where(Order.trade_no.contains(trade_no))
+            query = query.where(search.identifier(Order.trade_no, trade_no))
         
-        query = query.order_by(Order.created_at.desc())
-        
-        # 统计总数
-        count_query = select(func.count()).select_from(query.subquery())
-        total_result = await db.execute(count_query)
-        total = total_result.scalar() or 0
-        
-        # 分页
-        query = query.offset((page - 1) * limit).limit(limit)
-        
-        result = await db.execute(query)
-        orders = result.scalars().all()
+        # 分页（page/limit 或游标）
+        paged = await paginate(
+            db, query, (Order.created_at.desc(), Order.id.desc()),
+            page=page, limit=limit, cursor=cursor, total=total,
+        )
+        orders = paged.rows
         
         if not orders:
-            return {"total": total, "page": page, "limit": limit, "items": []}
+            return {"total": paged.total, "page": page, "limit": limit, "next_cursor": None, "items": []}
         
         # 批量预加载商品信息（避免 N+1）
         from ...models.commodity import Commodity
@@ -253,9 +253,10 @@ async def get_my_orders(
             })
         
         return {
-            "total": total,
+            "total": paged.total,
             "page": page,
             "limit": limit,
+            "next_cursor": paged.next_cursor,
             "items": items,
         }
     except Exception as e:
@@ -273,6 +274,8 @@ async def get_my_bills(
     type: Optional[int] = Query(None, description="账单类型 0=支出 1=收入"),
     page: int = Query(1, ge=1),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor）"),
+    total: TotalMode = Query("exact", description="总数统计：exact 精确 / estimate 估算 / none 不统计"),
 ):
     """获取当前用户的账单列表"""
     
@@ -281,18 +284,12 @@ async def get_my_bills(
     if type is not None:
         query = query.where(Bill.type == type)
     
-    query = query.order_by(Bill.created_at.desc())
-    
-    # 统计总数
-    count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
-    
-    # 分页
-    query = query.offset((page - 1) * limit).limit(limit)
-    
-    result = await db.execute(query)
-    bills = result.scalars().all()
+    # 分页（page/limit 或游标）
+    paged = await paginate(
+        db, query, (Bill.created_at.desc(), Bill.id.desc()),
+        page=page, limit=limit, cursor=cursor, total=total,
+    )
+    bills = paged.rows
     
     items = [
         {
@@ -307,9 +304,10 @@ async def get_my_bills(
     ]
     
     return {
-        "total": total,
+        "total": paged.total,
         "page": page,
         "limit": limit,
+        "next_cursor": paged.next_cursor,
         "items": items,
     }
 
@@ -533,7 +531,6 @@ async def create_recharge(
     req: Request,
 ):
     """Create recharge order and initialize payment."""
-    import uuid
     from ...utils.request import get_callback_base_url
 
     amount = Decimal(str(request.amount)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
@@ -573,7 +570,7 @@ async def create_recharge(
     if actual_amount <= 0:
         raise ValidationError("Actual recharge amount must be greater than 0")
 
-    trade_no = f"R{datetime.now().strftime('%Y%m%d%H%M%S')}{uuid.uuid4().hex[:8].upper()}"
+    trade_no = generate_trade_no("R")
     recharge = RechargeOrder(
         trade_no=trade_no,
         user_id=user.id,
@@ -592,14 +589,16 @@ async def create_recharge(
 
     try:
         payment_instance = await _create_payment_instance(payment)
-        payment_create_result = await payment_instance.create_payment(
-            trade_no=trade_no,
-            amount=float(amount),
-            callback_url=notify_url,
-            return_url=sync_return,
-            channel=payment.code or "alipay",
-            client_ip=req.client.host if req.client else None,
-            product_name="Account Recharge",
+        payment_create_result = await metrics.track_payment(
+            payment.handler, "create_payment", payment_instance.create_payment(
+                trade_no=trade_no,
+                amount=float(amount),
+                callback_url=notify_url,
+                return_url=sync_return,
+                channel=payment.code or "alipay",
+                client_ip=req.client.host if req.client else None,
+                product_name="Account Recharge",
+            ),
         )
         if not payment_create_result.success:
             raise ValidationError(f"Failed to create recharge payment: {payment_create_result.error_msg}")
@@ -764,6 +763,7 @@ async def create_withdrawal(
     
     # 创建提现记录
     withdrawal = Withdrawal(
+        withdraw_no=generate_trade_no("W"),
         user_id=locked_user.id,
         amount=request.amount,
         fee=fee,
@@ -37,7 +37,91 @@ class Settings(BaseSettings):
     
     # Redis配置
     redis_url: str = "redis://localhost:6379/0"
-    
+
+    # 读缓存（商城目录接口，Redis 不可用时自动降级查库）
+    cache_enabled: bool = True
+    cache_ttl: int = 300
+
+    # 公开接口允许前置 nginx 微缓存的秒数（X-Accel-Expires，0 表示不缓存）
+    micro_cache_ttl: int = 5
+
+    # 商城搜索索引同步间隔（秒）
+    search_sync_interval: int = 10
+
+    # 响应压缩（按 Accept-Encoding 协商 br / gzip，小于阈值的响应不压缩）
+    compression_min_size: int = 1024
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4
+
+    # SQL 统计：调试模式下同一语句在单个请求内执行超过该次数时告警（疑似 N+1）
+    sql_repeat_threshold: int = 10
+
+    # 运行指标：各 worker 向 Redis 上报快照的间隔（秒）；
+    # 设置 metrics_token 后 /metrics 需要 Authorization: Bearer <token>
+    metrics_push_interval: int = 15
+    metrics_token: str = ""
+
+    # 链路追踪：none 关闭 / file 写入本地文件 / otlp 发送到 OTLP HTTP 收集器
+    tracing_exporter: str = "none"
+    tracing_file: str = "logs/traces.jsonl"
+    tracing_otlp_endpoint: str = "http://localhost:4318"
+    tracing_sample_rate: float = 1.0
+
+    # 密码哈希：bcrypt 在独立的线程池中执行，不阻塞事件循环；
+    # 排队任务已满时新请求最多等待 password_hash_wait_timeout 秒，超时返回 503
+    password_hash_workers: int = 4
+    password_hash_queue: int = 64
+    password_hash_wait_timeout: float = 5.0
+
+    # bcrypt 工作因子：账户密码 / 订单查询密码（查单密码只保护单笔订单，使用较低的因子）
+    bcrypt_rounds: int = 12
+    bcrypt_order_rounds: int = 8
+
+    # 库存计数器分片数：同一商品的计数分散到多行，并发发货不争抢同一行锁（1 表示不分片）
+    inventory_counter_shards: int = 8
+
+    # 卡密预占：下单时为订单保留卡密的时长（秒，0 表示关闭，支付后再取卡），
+    # 过期预占的清理间隔（秒）和每批释放数量
+    card_reservation_ttl: int = 900
+    card_reservation_sweep_interval: int = 30
+    card_reservation_sweep_batch: int = 1000
+
+    # 秒杀：开始前多少秒预载名额、窗口同步间隔（秒），
+    # 每个 worker 同时执行的秒杀下单数、排队上限和排队超时（秒），
+    # 不预占卡密的未支付订单（手动发货或关闭卡密预占）占用名额的时长（秒）
+    seckill_preload_ahead: int = 300
+    seckill_sync_interval: int = 5
+    seckill_admission_concurrency: int = 32
+    seckill_admission_queue: int = 256
+    seckill_admission_timeout: float = 3.0
+    seckill_unpaid_hold: int = 900
+
+    # 钩子处理函数：默认超时（秒，0 表示不限），连续失败多少次后熔断（0 表示不熔断）及熔断时长（秒）
+    hook_handler_timeout: float = 5.0
+    hook_breaker_threshold: int = 5
+    hook_breaker_cooldown: int = 60
+
+    # 插件进程隔离：逗号分隔的插件 ID，installed 表示所有从商店安装的插件（留空不隔离）；
+    # worker 进程数、每个插件同时执行的调用数（plugin.json 的 backend.concurrency 可覆盖）、单次调用超时（秒）
+    plugin_isolation: str = ""
+    plugin_workers: int = 2
+    plugin_worker_concurrency: int = 4
+    plugin_worker_call_timeout: float = 30.0
+
+    # 事件发件箱：每批领取数、空闲时的轮询间隔（秒）、最多尝试次数、同时投递的事件数
+    outbox_batch: int = 100
+    outbox_poll_interval: float = 1.0
+    outbox_max_attempts: int = 10
+    outbox_concurrency: int = 8
+
+    # 下单幂等：结果保留时间 / 处理锁有效期（也是重复请求等待首个请求的最长时间），单位秒
+    idempotency_ttl: int = 86400
+    idempotency_lock_ttl: int = 30
+
+    # 单号生成起始节点号（0-999）：本机的进程依次占用 起始、起始+1……，
+    # 多机部署时各机器的起始节点号至少间隔每台机器的进程数；-1 表示每个进程启动时在 Redis 中自动租用
+    trade_no_node_id: int = -1
+
     # JWT配置
     jwt_algorithm: str = "HS256"
     jwt_access_token_expire_minutes: int = 30
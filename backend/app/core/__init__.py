@@ -8,6 +8,8 @@ from .security import (
     verify_token,
     get_password_hash,
     verify_password,
+    get_password_hash_async,
+    verify_password_async,
 )
 from .exceptions import (
     AppException,
@@ -23,6 +25,8 @@ __all__ = [
     "verify_token",
     "get_password_hash",
     "verify_password",
+    "get_password_hash_async",
+    "verify_password_async",
     "AppException",
     "AuthenticationError",
     "AuthorizationError",
@@ -0,0 +1,246 @@
+"""
+读缓存
+基于 Redis 的接口级读缓存，服务于商城公开目录接口（分类、商品、支付方式、公告）。
+
+键按"标签"分组：写入缓存时把键登记到标签集合，失效时按标签批量删除。
+写操作先立即删除一次，事务提交后再删除一次（双删），避免并发读把
+未提交前的旧数据回填进缓存。
+
+同一批标签还维护"版本号"（每次失效 +1 并记录时间），供条件请求
+（ETag / Last-Modified）在查库前判断资源是否变化，见 core/conditional.py。
+
+Redis 不可用时自动降级为直接查库，并在一段时间内不再尝试连接。
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from typing import Any, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from ..config import settings
+from . import metrics
+
+logger = logging.getLogger("core.cache")
+
+KEY_PREFIX = "lecfaka:cache"
+
+## 资源版本号（Hash：标签 -> 版本，标签:at -> 最后修改时间戳，epoch -> 随机纪元）
+VERSION_KEY = "lecfaka:versions"
+
+## Redis 出错后暂停使用缓存的秒数
+_RETRY_AFTER = 30
+
+
+class CacheTags:
+    """缓存标签"""
+
+    CATEGORIES = "categories"
+    COMMODITY_LIST = "commodity_list"
+    PAYMENTS = "payments"
+    ANNOUNCEMENTS = "announcements"
+
+    @staticmethod
+    def commodity(commodity_id: int) -> str:
+        """单个商品详情"""
+        return f"commodity:{commodity_id}"
+
+
+_redis = None
+_disabled_until = 0.0
+_pending: Set[asyncio.Task] = set()
+
+
+def get_redis():
+    """获取 Redis 客户端（懒加载），缓存关闭或暂不可用时返回 None"""
+    global _redis
+    if not settings.cache_enabled or time.monotonic() < _disabled_until:
+        return None
+    if _redis is None:
+        from redis.asyncio import Redis
+        _redis = Redis.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            socket_timeout=1,
+            socket_connect_timeout=1,
+        )
+    return _redis
+
+
+def _mark_unavailable(e: Exception):
+    """Redis 出错：记录日志并暂停一段时间"""
+    global _disabled_until
+    _disabled_until = time.monotonic() + _RETRY_AFTER
+    logger.warning(f"Redis unavailable, cache bypassed for {_RETRY_AFTER}s: {e}")
+
+
+def cache_key(name: str, **params: Any) -> str:
+    """
+    构建缓存键。
+
+    参数统一序列化后取摘要，搜索关键词等任意字符不会污染键名。
+    """
+    if not params:
+        return f"{KEY_PREFIX}:{name}"
+    raw = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    digest = hashlib.md5(raw.encode("utf-8")).hexdigest()
+    return f"{KEY_PREFIX}:{name}:{digest}"
+
+
+def _tag_key(tag: str) -> str:
+    return f"{KEY_PREFIX}:tag:{tag}"
+
+
+async def get(key: str) -> Optional[Any]:
+    """读取缓存，未命中或出错返回 None"""
+    redis = get_redis()
+    if redis is None:
+        return None
+    try:
+        raw = await redis.get(key)
+    except Exception as e:
+        _mark_unavailable(e)
+        return None
+    name = key[len(KEY_PREFIX) + 1:].split(":", 1)[0]
+    if raw is None:
+        metrics.cache_requests.inc(name=name, result="miss")
+        return None
+    metrics.cache_requests.inc(name=name, result="hit")
+    return json.loads(raw)
+
+
+async def put(key: str, value: Any, *tags: str, ttl: Optional[int] = None) -> None:
+    """写入缓存并登记到标签集合"""
+    redis = get_redis()
+    if redis is None:
+        return
+    ttl = ttl or settings.cache_ttl
+    try:
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.set(key, json.dumps(value, ensure_ascii=False, default=str), ex=ttl)
+            for tag in tags:
+                pipe.sadd(_tag_key(tag), key)
+                pipe.expire(_tag_key(tag), ttl * 2)
+            await pipe.execute()
+    except Exception as e:
+        _mark_unavailable(e)
+
+
+async def _delete_tags(tags: Iterable[str]) -> None:
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        now = time.time()
+        for tag in tags:
+            members = await redis.smembers(_tag_key(tag))
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.delete(_tag_key(tag), *members)
+                pipe.hincrby(VERSION_KEY, tag, 1)
+                pipe.hset(VERSION_KEY, f"{tag}:at", now)
+                await pipe.execute()
+    except Exception as e:
+        _mark_unavailable(e)
+
+
+async def get_versions(tags: Iterable[str]) -> Optional[Tuple[str, List[int], float]]:
+    """
+    读取标签的当前版本。
+
+    Returns:
+        (纪元, 各标签版本号, 最后修改时间戳)；Redis 不可用时返回 None。
+        纪元在版本数据丢失（如 Redis 清空）后重新生成，保证旧 ETag 不会误命中。
+    """
+    redis = get_redis()
+    if redis is None:
+        return None
+    tags = list(tags)
+    fields = ["epoch"] + tags + [f"{tag}:at" for tag in tags]
+    try:
+        values = await redis.hmget(VERSION_KEY, fields)
+        epoch = values[0]
+        if epoch is None:
+            await redis.hsetnx(VERSION_KEY, "epoch", uuid.uuid4().hex)
+            epoch = await redis.hget(VERSION_KEY, "epoch")
+    except Exception as e:
+        _mark_unavailable(e)
+        return None
+    versions = [int(v or 0) for v in values[1:len(tags) + 1]]
+    modified = max((float(v or 0) for v in values[len(tags) + 1:]), default=0.0)
+    return epoch, versions, modified
+
+
+def _schedule(tags: tuple) -> None:
+    """在事件循环中异步执行失效（事务回调中无法 await）"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(_delete_tags(tags))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+def _on_commit(session: Session, tags: tuple) -> None:
+    """提交后再删除一次"""
+    @event.listens_for(session, "after_commit", once=True)
+    def _after_commit(_session):
+        _schedule(tags)
+
+
+async def invalidate(*tags: str, db: Optional[AsyncSession] = None) -> None:
+    """
+    按标签失效缓存。
+
+    Args:
+        tags: 缓存标签
+        db: 当前事务会话；传入时在事务提交后再失效一次
+    """
+    if not tags:
+        return
+    await _delete_tags(tags)
+    if db is not None:
+        _on_commit(db.sync_session, tags)
+
+
+async def _on_card_imported(ctx):
+    """卡密导入 -> 库存变化"""
+    commodity_id = ctx.data.get("commodity_id")
+    await invalidate(CacheTags.COMMODITY_LIST, CacheTags.commodity(commodity_id))
+
+
+async def _on_order_delivered(ctx):
+    """发货 -> 库存、销量变化"""
+    order = ctx.data.get("order")
+    if order is None:
+        return
+    tags = (CacheTags.COMMODITY_LIST, CacheTags.commodity(order.commodity_id))
+    await _delete_tags(tags)
+    session = object_session(order)
+    if session is not None:
+        _on_commit(session, tags)
+
+
+def register_hooks() -> None:
+    """注册缓存失效钩子（应用启动时调用）"""
+    from ..plugins.sdk.hooks import hooks, Events
+    hooks.off_by_owner("core.cache")
+    hooks.on(Events.CARD_IMPORTED, _on_card_imported, owner="core.cache")
+    hooks.on(Events.ORDER_DELIVERED, _on_order_delivered, owner="core.cache")
+
+
+async def close() -> None:
+    """关闭 Redis 连接"""
+    global _redis
+    if _redis is not None:
+        try:
+            await _redis.aclose()
+        except Exception:
+            pass
+        _redis = None
@@ -0,0 +1,216 @@
+"""
+响应压缩中间件
+
+按请求的 Accept-Encoding 协商压缩算法：优先 brotli（需安装 brotli 包），其次 gzip。
+以下响应原样返回：
+  - 小于 compression_min_size 的响应（压缩收益抵不过 CPU 开销）
+  - 已带 Content-Encoding 的响应、304 / 204 等无响应体的状态
+  - 图片、压缩包等非文本类型
+
+压缩后的 ETag 改为弱校验（W/"..."），conditional 的比较忽略 W/ 前缀，
+客户端带压缩版本的 ETag 回来仍可命中 304。
+"""
+
+import gzip
+import zlib
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli 为可选依赖
+    brotli = None
+
+
+## 可压缩的内容类型（前缀匹配）
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+)
+
+## 不带响应体的状态码
+_NO_BODY_STATUS = {204, 304}
+
+
+def _parse_accept_encoding(header: str) -> dict:
+    """解析 Accept-Encoding 为 {编码: q 值}"""
+    weights = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    return weights
+
+
+def negotiate_encoding(header: Optional[str]) -> Optional[str]:
+    """选择压缩算法，无可用算法时返回 None"""
+    if not header:
+        return None
+    weights = _parse_accept_encoding(header)
+    wildcard = weights.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in candidates:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Compressor:
+    """流式压缩器（gzip / br 统一接口）"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=settings.compression_brotli_quality)
+        else:
+            self._zlib = zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._brotli.finish()
+        return self._zlib.flush(zlib.Z_FINISH)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """一次性压缩完整响应体"""
+    if encoding == "br":
+        return brotli.compress(data, quality=settings.compression_brotli_quality)
+    return gzip.compress(data, compresslevel=settings.compression_gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """按 Accept-Encoding 压缩响应（纯 ASGI 实现，支持流式响应）"""
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        minimum_size = (
+            self.minimum_size if self.minimum_size is not None
+            else settings.compression_min_size
+        )
+        responder = _CompressionResponder(self.app, encoding, minimum_size)
+        await responder(scope, receive, send)
+
+
+class _CompressionResponder:
+
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+        self.compressor: Optional[_Compressor] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_with_compression)
+
+    def _should_skip(self, message: Message) -> bool:
+        headers = Headers(raw=message["headers"])
+        if message["status"] in _NO_BODY_STATUS or "content-encoding" in headers:
+            return True
+        content_type = headers.get("content-type", "")
+        return not content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _apply_headers(self, length: Optional[int]) -> None:
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(length)
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+
+    async def send_with_compression(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            # 响应头延后到拿到第一段响应体再发送
+            self.start_message = message
+            self.passthrough = self._should_skip(message)
+            return
+
+        if message_type != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            if self.start_message is not None:
+                await self.send(self.start_message)
+                self.start_message = None
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None and self.start_message is not None:
+            if not more_body:
+                # 完整响应体：一次性压缩
+                if len(body) < self.minimum_size:
+                    await self.send(self.start_message)
+                    self.start_message = None
+                    await self.send(message)
+                    return
+                compressed = compress(body, self.encoding)
+                self._apply_headers(len(compressed))
+                await self.send(self.start_message)
+                self.start_message = None
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+
+            # 流式响应：边收边压
+            self.compressor = _Compressor(self.encoding)
+            self._apply_headers(None)
+            await self.send(self.start_message)
+            self.start_message = None
+
+        chunks: List[bytes] = []
+        if body:
+            chunks.append(self.compressor.compress(body))
+        if not more_body:
+            chunks.append(self.compressor.finish())
+        await self.send({
+            "type": "http.response.body",
+            "body": b"".join(chunks),
+            "more_body": more_body,
+        })
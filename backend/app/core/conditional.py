@@ -0,0 +1,159 @@
+"""
+条件请求（ETag / Last-Modified）
+
+公开读接口的响应由"资源版本号"决定：写操作通过 cache.invalidate 让相关标签
+版本 +1，读接口先取版本号拼出 ETag，客户端 If-None-Match 命中时直接返回 304，
+不执行任何查询。Redis 不可用或资源没有版本标签时，退化为按响应体摘要生成 ETag
+（仍可省下传输流量）。
+
+缓存头：
+  - 游客响应：Cache-Control: public, no-cache（浏览器每次带 ETag 校验），
+    X-Accel-Expires 允许前置 nginx 微缓存若干秒
+  - 登录用户响应（会员价等）：Cache-Control: private, no-cache，nginx 不缓存
+
+用法：
+    cond = await conditional(request, "categories", CacheTags.CATEGORIES, member=bool(user))
+    if cond.not_modified:
+        return cond.not_modified_response()
+    ...
+    return cond.response(data)
+"""
+
+import hashlib
+import json
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from ..config import settings
+from . import cache, metrics
+from .responses import dumps
+
+
+def _digest(raw: bytes) -> str:
+    return hashlib.md5(raw).hexdigest()
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    """If-None-Match 比较（弱比较，忽略 W/ 前缀）"""
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    target = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == target
+        for candidate in header.split(",")
+    )
+
+
+class Conditional:
+    """单次请求的条件判断结果"""
+
+    def __init__(
+        self,
+        request: Request,
+        name: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[float] = None,
+        public: bool = True,
+    ):
+        self.request = request
+        self.name = name
+        self.etag = etag
+        self.last_modified = last_modified
+        self.public = public
+
+    @property
+    def not_modified(self) -> bool:
+        """客户端缓存是否仍然有效"""
+        if self.etag is None:
+            return False
+        return self._check(self.etag)
+
+    def _check(self, etag: str) -> bool:
+        if_none_match = self.request.headers.get("if-none-match")
+        if if_none_match is not None:
+            return _etag_matches(if_none_match, etag)
+        # 仅在没有 If-None-Match 时才看 If-Modified-Since
+        if_modified_since = self.request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.last_modified) <= since
+        return False
+
+    def headers(self, etag: Optional[str] = None) -> Dict[str, str]:
+        """条件请求和缓存相关的响应头"""
+        headers = {"Vary": "Authorization"}
+        etag = etag or self.etag
+        if etag:
+            headers["ETag"] = etag
+        if self.last_modified:
+            headers["Last-Modified"] = formatdate(self.last_modified, usegmt=True)
+        if self.public:
+            headers["Cache-Control"] = "public, no-cache"
+            if settings.micro_cache_ttl > 0:
+                headers["X-Accel-Expires"] = str(settings.micro_cache_ttl)
+        else:
+            headers["Cache-Control"] = "private, no-cache"
+        return headers
+
+    def not_modified_response(self, etag: Optional[str] = None) -> Response:
+        metrics.conditional_requests.inc(name=self.name, result="not_modified")
+        return Response(status_code=304, headers=self.headers(etag))
+
+    def response(self, data: Any) -> Response:
+        """返回带校验头的 JSON 响应；无版本号时按响应体生成 ETag"""
+        body = dumps(data)
+        if self.etag is not None:
+            metrics.conditional_requests.inc(name=self.name, result="full")
+            return Response(
+                content=body, media_type="application/json", headers=self.headers()
+            )
+
+        etag = f'"{_digest(body)}"'
+        if self._check(etag):
+            return self.not_modified_response(etag)
+        metrics.conditional_requests.inc(name=self.name, result="full")
+        return Response(
+            content=body, media_type="application/json", headers=self.headers(etag)
+        )
+
+
+async def conditional(
+    request: Request,
+    name: str,
+    *tags: str,
+    member: bool = False,
+    **params: Any,
+) -> Conditional:
+    """
+    根据资源版本构建条件判断。
+
+    Args:
+        request: 当前请求
+        name: 资源名称
+        tags: 决定资源内容的缓存标签（为空时按响应体生成 ETag）
+        member: 是否登录用户（登录用户响应不允许共享缓存）
+        params: 影响响应内容的其他参数（分页、筛选等）
+    """
+    public = not member
+    if not tags:
+        return Conditional(request, name, public=public)
+
+    state = await cache.get_versions(tags)
+    if state is None:
+        return Conditional(request, name, public=public)
+
+    epoch, versions, modified = state
+    raw = json.dumps(
+        [name, epoch, versions, member, params],
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    etag = f'"{_digest(raw.encode("utf-8"))}"'
+    return Conditional(request, name, etag=etag, last_modified=modified or None, public=public)
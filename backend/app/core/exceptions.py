@@ -74,3 +74,17 @@ class StockError(AppException):
     
     def __init__(self, message: str = "库存不足"):
         super().__init__(message=message, code=400)
+
+
+class ServiceBusyError(AppException):
+    """服务繁忙（排队已满）"""
+    
+    def __init__(self, message: str = "服务繁忙，请稍后重试"):
+        super().__init__(message=message, code=503)
+
+
+class ConflictError(AppException):
+    """请求冲突"""
+    
+    def __init__(self, message: str = "请求冲突"):
+        super().__init__(message=message, code=409)
@@ -0,0 +1,519 @@
+"""
+运行指标
+
+以 Prometheus 文本格式在 /metrics 暴露：
+  - HTTP：按路由模板统计请求数和延迟直方图
+  - 数据库连接池：已借出 / 溢出 / 空闲连接数，获取连接的等待时间
+  - 钩子：HookManager.emit 按事件的总耗时，按事件 + 处理方（插件 ID）+ 处理函数的耗时，
+    异常 / 超时数和熔断期间跳过的次数
+  - 插件 worker：按插件 + 操作的调用数（成功 / 失败 / 无可用 worker）和耗时，worker 重启次数
+  - 事件发件箱：按事件的投递成功 / 重试 / 放弃数，从写入到投递完成的延迟
+  - 支付：各支付方式 create_payment / verify_callback 的延迟和成功 / 失败 / 异常数
+  - 缓存：读缓存按资源的命中 / 未命中，条件请求的 304 命中
+  - 秒杀：准入 / 售罄 / 排队已满 / 未开始 / 已结束的请求数和归还的名额数
+  - 卡密预占：下单预占 / 发货转售出 / 过期释放 / 预占失效后重新取卡的张数
+  - 幂等下单：新建 / 重放 / 等待并发请求 / 冲突的次数
+  - 密码哈希：bcrypt 线程池的排队深度、等待时间、计算耗时和排队超时拒绝数
+
+多 worker 汇总：每个进程只在内存中累加自己的指标，后台任务每隔
+metrics_push_interval 秒把累计快照写入 Redis（带过期时间）；/metrics 被抓取时
+读取所有存活 worker 的快照，每个样本带 worker 标签分别输出，无论请求落到哪个 worker 结果都一致。
+不在服务端求和：worker 退出（快照过期）或重启后，求和结果会回落，被 Prometheus 当作计数器重置，
+rate() 出现尖峰；按 worker 分开输出时每个进程是独立的序列，查询时用 sum(rate(...)) 聚合，
+例如 sum by (route) (rate(lecfaka_http_requests_total[5m]))。
+Redis 不可用时只输出当前进程的指标。
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import settings
+
+logger = logging.getLogger("core.metrics")
+
+
+METRIC_PREFIX = "lecfaka"
+
+## Redis 键：存活 worker 集合、各 worker 的指标快照
+WORKERS_KEY = "lecfaka:metrics:workers"
+SNAPSHOT_KEY = "lecfaka:metrics:worker:{}"
+
+## 默认延迟分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+## 连接池等待分桶（秒），正常情况下应远小于 1ms
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+# ============== 指标类型 ==============
+
+class Metric:
+    """指标基类：按标签值元组保存样本"""
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = f"{METRIC_PREFIX}_{name}"
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._samples: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple([str(labels.get(name, "")) for name in self.labelnames])
+
+    def snapshot(self) -> Dict[str, Any]:
+        """{标签值 JSON: 样本}"""
+        with self._lock:
+            return {json.dumps(k, ensure_ascii=False): v for k, v in self._samples.items()}
+
+
+class Counter(Metric):
+    """只增计数器"""
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._samples[key] = self._samples.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """瞬时值"""
+    type = "gauge"
+
+    def set(self, value: float, **labels: Any):
+        with self._lock:
+            self._samples[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    """分桶直方图，样本为 [各桶计数..., 总和, 总数]（桶计数非累计）"""
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            sample = self._samples.get(key)
+            if sample is None:
+                sample = self._samples[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample[i] += 1
+                    break
+            else:
+                sample[len(self.buckets)] += 1
+            sample[-2] += value
+            sample[-1] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {json.dumps(k, ensure_ascii=False): list(v) for k, v in self._samples.items()}
+
+
+class Registry:
+    """指标注册表"""
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self._collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        """登记采集回调（生成快照前调用，用于刷新连接池等瞬时值）"""
+        self._collectors.append(collector)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception as e:
+                logger.debug(f"Metrics collector failed: {e}")
+        return {metric.name: metric.snapshot() for metric in self.metrics}
+
+    def render(
+        self,
+        snapshots: List[Dict[str, Dict[str, Any]]],
+        extra_labels: Optional[Sequence[Dict[str, str]]] = None,
+    ) -> str:
+        """
+        输出 Prometheus 文本格式。
+
+        Args:
+            snapshots: 指标快照
+            extra_labels: 各快照附加的标签（如 worker）；标签完全相同的样本求和
+        """
+        lines: List[str] = []
+        for metric in self.metrics:
+            merged: Dict[Tuple[Tuple[Tuple[str, str], ...], str], Any] = {}
+            for index, snapshot in enumerate(snapshots):
+                extra = tuple(extra_labels[index].items()) if extra_labels else ()
+                for label_values, value in snapshot.get(metric.name, {}).items():
+                    key = (extra, label_values)
+                    if key not in merged:
+                        merged[key] = list(value) if isinstance(value, list) else value
+                    elif isinstance(value, list):
+                        current = merged[key]
+                        if len(current) != len(value):
+                            continue  # 分桶配置不一致（滚动发布中），跳过
+                        merged[key] = [a + b for a, b in zip(current, value)]
+                    else:
+                        merged[key] += value
+
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for key in sorted(merged):
+                extra, label_values = key
+                labels = dict(zip(metric.labelnames, json.loads(label_values)))
+                labels.update(extra)
+                value = merged[key]
+                if isinstance(metric, Histogram):
+                    lines.extend(_render_histogram(metric, labels, value))
+                else:
+                    lines.append(f"{metric.name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _render_histogram(metric: Histogram, labels: Dict[str, str], value: List[float]) -> List[str]:
+    lines = []
+    cumulative = 0
+    for bound, count in zip(metric.buckets + (float("inf"),), value):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else _number(bound)
+        lines.append(f"{metric.name}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+    lines.append(f"{metric.name}_sum{_labels(labels)} {_number(value[-2])}")
+    lines.append(f"{metric.name}_count{_labels(labels)} {value[-1]}")
+    return lines
+
+
+registry = Registry()
+
+
+# ============== 指标定义 ==============
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "HTTP 请求数", ("method", "route", "status"),
+))
+http_duration = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP 请求耗时", ("method", "route"),
+))
+
+db_pool_checked_out = registry.register(Gauge(
+    "db_pool_checked_out", "已借出的数据库连接数",
+))
+db_pool_overflow = registry.register(Gauge(
+    "db_pool_overflow", "超出 pool_size 的溢出连接数",
+))
+db_pool_idle = registry.register(Gauge(
+    "db_pool_idle", "连接池中的空闲连接数",
+))
+db_pool_wait = registry.register(Histogram(
+    "db_pool_wait_seconds", "从连接池获取连接的耗时", buckets=POOL_WAIT_BUCKETS,
+))
+
+hook_emit_duration = registry.register(Histogram(
+    "hook_emit_duration_seconds", "HookManager.emit 总耗时", ("event",),
+))
+hook_handler_duration = registry.register(Histogram(
+    "hook_handler_duration_seconds", "单个钩子处理函数耗时", ("event", "owner", "handler"),
+))
+hook_handler_errors = registry.register(Counter(
+    "hook_handler_errors_total", "钩子处理函数失败数（reason=error/timeout）",
+    ("event", "owner", "reason"),
+))
+hook_handler_skipped = registry.register(Counter(
+    "hook_handler_skipped_total", "熔断期间跳过的钩子处理函数调用数", ("event", "owner"),
+))
+plugin_worker_calls = registry.register(Counter(
+    "plugin_worker_calls_total", "隔离插件调用数（result=ok/error/unavailable）", ("plugin", "op", "result"),
+))
+plugin_worker_duration = registry.register(Histogram(
+    "plugin_worker_call_duration_seconds", "隔离插件调用耗时（含进程间通信）", ("plugin", "op"),
+))
+plugin_worker_restarts = registry.register(Counter(
+    "plugin_worker_restarts_total", "插件 worker 进程退出后被重启的次数",
+))
+
+outbox_events = registry.register(Counter(
+    "outbox_events_total", "发件箱事件投递数（result=dispatched/retried/dead）", ("event", "result"),
+))
+outbox_lag = registry.register(Histogram(
+    "outbox_lag_seconds", "发件箱事件从写入到投递完成的延迟", ("event",),
+))
+
+payment_duration = registry.register(Histogram(
+    "payment_request_duration_seconds", "支付接口调用耗时", ("provider", "operation"),
+))
+payment_requests = registry.register(Counter(
+    "payment_requests_total", "支付接口调用数（result=success/failure/error）",
+    ("provider", "operation", "result"),
+))
+
+cache_requests = registry.register(Counter(
+    "cache_requests_total", "读缓存查询数（result=hit/miss）", ("name", "result"),
+))
+conditional_requests = registry.register(Counter(
+    "conditional_requests_total", "条件请求数（result=not_modified/full）", ("name", "result"),
+))
+
+seckill_requests = registry.register(Counter(
+    "seckill_requests_total",
+    "秒杀下单请求数（result=admitted/sold_out/busy/not_started/ended），restored 为归还的名额数",
+    ("result",),
+))
+
+card_reservations = registry.register(Counter(
+    "card_reservations_total",
+    "卡密预占张数（event=held/claimed/expired/released/fallback）", ("event",),
+))
+
+idempotent_requests = registry.register(Counter(
+    "idempotent_requests_total",
+    "带幂等键的下单请求数（result=new/replay/waited/conflict）", ("result",),
+))
+
+password_hash_in_flight = registry.register(Gauge(
+    "password_hash_in_flight", "排队或正在执行的密码哈希任务数",
+))
+password_hash_wait = registry.register(Histogram(
+    "password_hash_wait_seconds", "密码哈希任务从提交到开始执行的等待时间", buckets=POOL_WAIT_BUCKETS,
+))
+password_hash_duration = registry.register(Histogram(
+    "password_hash_duration_seconds", "bcrypt 计算耗时（operation=hash/verify）", ("operation",),
+))
+password_hash_rejected = registry.register(Counter(
+    "password_hash_rejected_total", "排队超时被拒绝的密码哈希任务数", ("operation",),
+))
+
+workers = registry.register(Gauge(
+    "metrics_workers", "本次输出的 worker 进程数",
+))
+
+
+# ============== 埋点辅助 ==============
+
+async def track_payment(provider: str, operation: str, call: Awaitable) -> Any:
+    """
+    记录一次支付接口调用的耗时和结果。
+
+    用法：
+        result = await metrics.track_payment(handler, "verify_callback", instance.verify_callback(data))
+    """
+    start = time.perf_counter()
+    try:
+        result = await call
+    except Exception:
+        payment_requests.inc(provider=provider, operation=operation, result="error")
+        raise
+    finally:
+        payment_duration.observe(time.perf_counter() - start, provider=provider, operation=operation)
+    outcome = "success" if getattr(result, "success", True) else "failure"
+    payment_requests.inc(provider=provider, operation=operation, result=outcome)
+    return result
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """记录获取连接等待时间的连接池"""
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            db_pool_wait.observe(time.perf_counter() - start)
+
+
+def watch_pool(engine) -> None:
+    """登记连接池状态采集（engine.dispose() 后连接池会重建，每次采集时重新读取）"""
+
+    def collect():
+        pool = engine.pool
+        db_pool_checked_out.set(pool.checkedout())
+        db_pool_overflow.set(max(pool.overflow(), 0))
+        db_pool_idle.set(pool.checkedin())
+
+    registry.add_collector(collect)
+
+
+def _route_label(scope: Scope) -> str:
+    """路由模板（/api/v1/shop/commodities/{commodity_id}），未匹配路由统一归为 unmatched"""
+    if "endpoint" not in scope:
+        return "unmatched"
+    path_params = scope.get("path_params") or {}
+    if not path_params:
+        return scope["path"]
+    values = {str(v): k for k, v in path_params.items()}
+    return "/".join(
+        f"{{{values[seg]}}}" if seg in values else seg
+        for seg in scope["path"].split("/")
+    )
+
+
+class MetricsMiddleware:
+    """按路由统计 HTTP 请求数和延迟"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = _route_label(scope)
+            method = scope["method"]
+            http_duration.observe(time.perf_counter() - start, method=method, route=route)
+            http_requests.inc(method=method, route=route, status=status)
+
+
+# ============== 多 worker 汇总 ==============
+
+class MetricsPublisher:
+    """定期把当前 worker 的指标快照写入 Redis，抓取时输出所有 worker 的指标（带 worker 标签）"""
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _redis():
+        from . import cache
+        return cache.get_redis()
+
+    async def publish(self, snapshot: Optional[Dict] = None) -> None:
+        """写入当前 worker 的快照"""
+        redis = self._redis()
+        if redis is None:
+            return
+        snapshot = snapshot if snapshot is not None else registry.snapshot()
+        ttl = max(settings.metrics_push_interval * 3, 30)
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.set(SNAPSHOT_KEY.format(self.worker_id), json.dumps(snapshot), ex=ttl)
+            pipe.sadd(WORKERS_KEY, self.worker_id)
+            await pipe.execute()
+
+    async def collect(self) -> List[Tuple[str, Dict]]:
+        """读取所有存活 worker 的 (worker_id, 快照)（包含当前 worker 的最新值）"""
+        local = registry.snapshot()
+        redis = self._redis()
+        if redis is None:
+            return [(self.worker_id, local)]
+        try:
+            await self.publish(local)
+            worker_ids = sorted(await redis.smembers(WORKERS_KEY))
+            others = [w for w in worker_ids if w != self.worker_id]
+            raws = await redis.mget([SNAPSHOT_KEY.format(w) for w in others]) if others else []
+        except Exception as e:
+            logger.warning(f"Metrics aggregation failed, local only: {e}")
+            return [(self.worker_id, local)]
+
+        snapshots = [(self.worker_id, local)]
+        expired = []
+        for worker_id, raw in zip(others, raws):
+            if raw is None:
+                expired.append(worker_id)
+            else:
+                snapshots.append((worker_id, json.loads(raw)))
+        if expired:
+            try:
+                await redis.srem(WORKERS_KEY, *expired)
+            except Exception:
+                pass
+        return snapshots
+
+    async def render(self) -> str:
+        """所有 worker 的 Prometheus 文本（每个样本带 worker 标签）"""
+        collected = await self.collect()
+        snapshots = []
+        extra_labels = []
+        for worker_id, snapshot in collected:
+            # worker 数只在抓取时计算，不带 worker 标签
+            snapshot[workers.name] = {}
+            snapshots.append(snapshot)
+            extra_labels.append({"worker": worker_id})
+        snapshots.append({workers.name: {json.dumps([]): len(collected)}})
+        extra_labels.append({})
+        return registry.render(snapshots, extra_labels)
+
+    async def _push_loop(self):
+        while True:
+            await asyncio.sleep(settings.metrics_push_interval)
+            try:
+                await self.publish()
+            except Exception as e:
+                logger.debug(f"Metrics publish failed: {e}")
+
+    async def start(self):
+        """启动定期上报（应用启动时调用）"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._push_loop())
+
+    async def stop(self):
+        """停止上报并移除当前 worker 的快照"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        redis = self._redis()
+        if redis is None:
+            return
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.delete(SNAPSHOT_KEY.format(self.worker_id))
+                pipe.srem(WORKERS_KEY, self.worker_id)
+                await pipe.execute()
+        except Exception:
+            pass
+
+
+# 全局单例
+publisher = MetricsPublisher()
@@ -0,0 +1,88 @@
+"""
+JSON 响应
+
+接口大多直接返回 dict，FastAPI 默认会先用 jsonable_encoder 逐个字段递归转换，
+再交给标准库 json 序列化，列表接口的大部分序列化时间花在这一步。这里改用 orjson：
+datetime / date / UUID / Enum 原生序列化，Decimal 等少数类型通过 default 回调处理，
+dict 不再经过 jsonable_encoder。
+
+  - ORJSONResponse：应用默认响应类
+  - ORJSONRoute：没有 response_model 的接口，返回值直接交给 ORJSONResponse
+    （有 response_model 的接口仍走 FastAPI 的 pydantic 校验和序列化）
+"""
+
+import functools
+import inspect
+from decimal import Decimal
+from typing import Any, Callable
+
+import orjson
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    """orjson 不支持的类型，与 jsonable_encoder 的转换结果保持一致"""
+    if isinstance(obj, Decimal):
+        # 整数值（如 Decimal("5")）输出 int，其余输出 float
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """序列化为 JSON 字节串"""
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """使用 orjson 序列化的 JSON 响应"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def _direct_json(endpoint: Callable, status_code: int) -> Callable:
+    """包装接口：返回值不是 Response 时直接构造 ORJSONResponse"""
+
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        content = await endpoint(*args, **kwargs)
+        if isinstance(content, Response):
+            return content
+        return ORJSONResponse(content, status_code=status_code)
+
+    wrapper.direct_json = True
+    return wrapper
+
+
+class ORJSONRoute(APIRoute):
+    """
+    跳过 jsonable_encoder 的路由。
+
+    仅包装未声明 response_model / 返回类型注解、未指定 response_class 的异步接口，
+    其余接口行为与 APIRoute 相同。
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        response_model = kwargs.get("response_model")
+        response_class = kwargs.get("response_class")
+        if (
+            not getattr(endpoint, "direct_json", False)
+            and (response_model is None or isinstance(response_model, DefaultPlaceholder))
+            and inspect.signature(endpoint).return_annotation is inspect.Signature.empty
+            and (response_class is None or isinstance(response_class, DefaultPlaceholder))
+            and inspect.iscoroutinefunction(endpoint)
+        ):
+            endpoint = _direct_json(endpoint, kwargs.get("status_code") or 200)
+        super().__init__(path, endpoint, **kwargs)
@@ -5,42 +5,57 @@ from datetime import timezone
 
 v2.0: 密码哈希从 SHA256 迁移到 bcrypt（兼容旧格式自动升级）
       直接使用 bcrypt 库，不再依赖已停止维护的 passlib
+v2.1: 请求处理中使用 get_password_hash_async / verify_password_async，
+      bcrypt 在独立的有界线程池中执行，不再阻塞事件循环
 """
 
+import asyncio
 import secrets
 import hashlib
 import time
-import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Any, Callable, Optional
 
 import bcrypt
 from jose import JWTError, jwt
 
 from ..config import settings
+from . import metrics
+from .exceptions import ServiceBusyError
+from .trade_no import generate_trade_no  # noqa: F401  兼容旧的导入路径
 
 ## bcrypt 哈希的特征前缀
 _BCRYPT_PREFIX = "$2b$"
 
+## 哈希用途：账户密码 / 订单查询密码（对应不同的 bcrypt 工作因子）
+PURPOSE_ACCOUNT = "account"
+PURPOSE_ORDER = "order"
+
 
 def generate_salt(length: int = 16) -> str:
     """生成随机盐值（仅供旧版 SHA256 兼容使用）"""
     return secrets.token_hex(length)
 
 
-def get_password_hash(password: str, salt: str = None) -> tuple[str, str]:
+def get_password_hash(
+    password: str, salt: str = None, purpose: str = PURPOSE_ACCOUNT
+) -> tuple[str, str]:
     """
     生成密码哈希（bcrypt）。
 
     bcrypt 内部自带盐值管理，返回的 salt 字段为 "bcrypt" 标记。
     bcrypt 限制密码最大 72 字节，超长自动截断。
+    工作因子写在哈希值中，校验时自动使用生成时的因子。
 
     @param password 明文密码
     @param salt 忽略（兼容旧接口）
+    @param purpose PURPOSE_ACCOUNT（bcrypt_rounds）或 PURPOSE_ORDER（bcrypt_order_rounds）
     @return (bcrypt_hash, "bcrypt")
     """
+    rounds = settings.bcrypt_order_rounds if purpose == PURPOSE_ORDER else settings.bcrypt_rounds
     pwd_bytes = password.encode("utf-8")[:72]  ## bcrypt 72字节限制
-    hashed = bcrypt.hashpw(pwd_bytes, bcrypt.gensalt())
+    hashed = bcrypt.hashpw(pwd_bytes, bcrypt.gensalt(rounds=rounds))
     return hashed.decode("utf-8"), "bcrypt"
 
 
@@ -65,14 +80,104 @@ def verify_password(plain_password: str, hashed_password: str, salt: str) -> boo
         return _verify_legacy_sha256(plain_password, hashed_password, salt)
 
 
+# ============== 异步哈希 ==============
+
+class PasswordHasher:
+    """
+    在独立的有界线程池中执行 bcrypt。
+
+    最多 password_hash_workers 个任务并行计算，另有 password_hash_queue 个排队名额；
+    名额用完时新任务最多等待 password_hash_wait_timeout 秒，超时抛出 ServiceBusyError，
+    避免登录或下单高峰时请求无限堆积。
+    """
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = 0
+
+    def _ensure_started(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.password_hash_workers, thread_name_prefix="bcrypt",
+            )
+            self._slots = asyncio.Semaphore(
+                settings.password_hash_workers + settings.password_hash_queue
+            )
+
+    @staticmethod
+    def _call(operation: str, func: Callable, args: tuple, submitted: float) -> Any:
+        started = time.perf_counter()
+        metrics.password_hash_wait.observe(started - submitted)
+        try:
+            return func(*args)
+        finally:
+            metrics.password_hash_duration.observe(time.perf_counter() - started, operation=operation)
+
+    async def run(self, operation: str, func: Callable, *args: Any) -> Any:
+        """在线程池中执行 func(*args)"""
+        self._ensure_started()
+        submitted = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), settings.password_hash_wait_timeout)
+        except asyncio.TimeoutError:
+            metrics.password_hash_rejected.inc(operation=operation)
+            raise ServiceBusyError()
+
+        self._in_flight += 1
+        metrics.password_hash_in_flight.set(self._in_flight)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, self._call, operation, func, args, submitted,
+            )
+        finally:
+            self._in_flight -= 1
+            metrics.password_hash_in_flight.set(self._in_flight)
+            self._slots.release()
+
+    def shutdown(self):
+        """关闭线程池（应用停止时调用，下次使用时重建）"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            self._slots = None
+
+
+# 全局单例
+password_hasher = PasswordHasher()
+
+
+async def get_password_hash_async(
+    password: str, purpose: str = PURPOSE_ACCOUNT
+) -> tuple[str, str]:
+    """get_password_hash 的异步版本（在 bcrypt 线程池中执行）"""
+    return await password_hasher.run("hash", get_password_hash, password, None, purpose)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str, salt: str) -> bool:
+    """verify_password 的异步版本（bcrypt 在线程池中执行，旧版 SHA256 直接计算）"""
+    if not hashed_password.startswith(_BCRYPT_PREFIX):
+        return _verify_legacy_sha256(plain_password, hashed_password, salt)
+    return await password_hasher.run(
+        "verify", verify_password, plain_password, hashed_password, salt,
+    )
+
+
 def needs_rehash(hashed_password: str) -> bool:
     """
-    检查密码是否需要重新哈希（旧 SHA256 格式需要升级到 bcrypt）。
+    检查密码是否需要重新哈希：旧 SHA256 格式需要升级到 bcrypt，
+    bcrypt 工作因子低于当前 bcrypt_rounds 时按新因子重新生成。
 
     @param hashed_password 当前存储的哈希值
     @return True 表示需要升级
     """
-    return not hashed_password.startswith(_BCRYPT_PREFIX)
+    if not hashed_password.startswith(_BCRYPT_PREFIX):
+        return True
+    try:
+        return int(hashed_password[4:6]) < settings.bcrypt_rounds
+    except ValueError:
+        return False
 
 
 def create_access_token(
@@ -135,18 +240,6 @@ def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
         return None
 
 
-def generate_trade_no() -> str:
-    """
-    生成24位订单号（高并发安全）。
-
-    格式: 14位微秒时间戳 + 10位随机十六进制 = 24位。
-    数据库 trade_no 列有 UNIQUE 约束作为最终兜底。
-    """
-    timestamp = int(time.time() * 1000000)  # 14位微秒时间戳
-    random_part = uuid.uuid4().hex[:10]     # 10位随机十六进制
-    return f"{timestamp}{random_part}"
-
-
 def generate_api_key() -> str:
     """生成API密钥"""
     return secrets.token_urlsafe(32)
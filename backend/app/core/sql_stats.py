@@ -0,0 +1,170 @@
+"""
+请求级 SQL 统计
+
+通过 SQLAlchemy 游标事件记录每个请求执行的语句数、数据库总耗时和最慢的一条语句：
+  - 响应头 Server-Timing：db（总耗时 + 语句数）、db-slowest（最慢语句耗时）、app（请求总耗时），
+    浏览器开发者工具的 Timing 面板可直接查看
+  - 日志 core.sql：每个请求一条，统计值放在 extra 字段中便于结构化采集
+  - 调试模式：同一条语句（参数化后的 SQL 文本）在单个请求内执行超过
+    sql_repeat_threshold 次时告警，用于发现循环查询（N+1）
+
+请求之外（启动任务、后台同步等）执行的语句不做统计。
+"""
+
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..config import settings
+
+logger = logging.getLogger("core.sql")
+
+
+## 日志中语句文本的最大长度
+_STATEMENT_PREVIEW = 300
+
+
+@dataclass
+class QueryStats:
+    """单个请求的 SQL 统计"""
+    count: int = 0
+    total: float = 0.0
+    slowest: float = 0.0
+    slowest_statement: Optional[str] = None
+    ## 调试模式下按语句计数 {SQL 文本: 次数}
+    shapes: Counter = field(default_factory=Counter)
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.total += duration
+        if duration > self.slowest:
+            self.slowest = duration
+            self.slowest_statement = statement
+        if settings.debug:
+            self.shapes[statement] += 1
+
+    def repeated(self, threshold: int):
+        """执行次数超过阈值的语句 [(SQL 文本, 次数)]"""
+        return [(s, n) for s, n in self.shapes.most_common() if n > threshold]
+
+    def server_timing(self, elapsed: float) -> str:
+        """Server-Timing 响应头"""
+        parts = [f'db;dur={self.total * 1000:.2f};desc="{self.count} queries"']
+        if self.count:
+            parts.append(f"db-slowest;dur={self.slowest * 1000:.2f}")
+        parts.append(f"app;dur={elapsed * 1000:.2f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("sql_stats", default=None)
+
+
+def current_stats() -> Optional[QueryStats]:
+    """当前请求的 SQL 统计（不在请求中时返回 None）"""
+    return _current.get()
+
+
+def _preview(statement: Optional[str]) -> Optional[str]:
+    if statement is None:
+        return None
+    statement = " ".join(statement.split())
+    if len(statement) > _STATEMENT_PREVIEW:
+        statement = statement[:_STATEMENT_PREVIEW] + "..."
+    return statement
+
+
+# ============== SQLAlchemy 事件 ==============
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._sql_stats_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or context is None:
+        return
+    start = getattr(context, "_sql_stats_start", None)
+    if start is not None:
+        stats.record(statement, time.perf_counter() - start)
+
+
+def instrument(engine: Engine):
+    """在引擎上注册统计事件（异步引擎传入 engine.sync_engine）"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ============== 中间件 ==============
+
+class SQLStatsMiddleware:
+    """为每个 HTTP 请求收集 SQL 统计，写入 Server-Timing 头和日志"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            self._report(scope, status, stats, time.perf_counter() - start)
+
+    @staticmethod
+    def _report(scope: Scope, status: int, stats: QueryStats, elapsed: float):
+        method, path = scope["method"], scope["path"]
+        if stats.count:
+            logger.info(
+                f"{method} {path} {status} {elapsed * 1000:.1f}ms "
+                f"db={stats.count}q/{stats.total * 1000:.1f}ms",
+                extra={
+                    "method": method,
+                    "path": path,
+                    "status": status,
+                    "duration_ms": round(elapsed * 1000, 2),
+                    "db_queries": stats.count,
+                    "db_time_ms": round(stats.total * 1000, 2),
+                    "db_slowest_ms": round(stats.slowest * 1000, 2),
+                    "db_slowest_statement": _preview(stats.slowest_statement),
+                },
+            )
+
+        if settings.debug:
+            for statement, times in stats.repeated(settings.sql_repeat_threshold):
+                logger.warning(
+                    f"Possible N+1 in {method} {path}: statement executed {times} times: "
+                    f"{_preview(statement)}",
+                    extra={
+                        "method": method,
+                        "path": path,
+                        "db_repeat_count": times,
+                        "db_statement": _preview(statement),
+                    },
+                )
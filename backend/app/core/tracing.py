@@ -0,0 +1,291 @@
+"""
+轻量链路追踪
+
+记录嵌套的耗时区间（span）和属性，用于定位下单、发货、支付回调等流程中
+哪一步占用了时间。导出格式为 OTLP/JSON：
+  - tracing_exporter = "file"：追加写入 tracing_file（每行一个批次，
+    可直接被 OpenTelemetry Collector 的 otlpjsonfile 接收器读取）
+  - tracing_exporter = "otlp"：POST 到 {tracing_otlp_endpoint}/v1/traces
+  - tracing_exporter = "none"（默认）：关闭，span() 返回空操作对象，几乎没有开销
+
+用法：
+    @tracer.traced("order.create_order")
+    async def create_order(...):
+        tracer.current().set_attributes(commodity_id=commodity_id, quantity=quantity)
+        with tracer.span("order.validate_stock"):
+            ...
+
+采样在根 span 上决定（tracing_sample_rate），子 span 跟随根 span。
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import random
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+from ..config import settings
+
+logger = logging.getLogger("core.tracing")
+
+
+## 缓冲区达到该数量时立即导出
+_BATCH_SIZE = 512
+
+## 后台导出间隔（秒）
+_FLUSH_INTERVAL = 2.0
+
+## 缓冲区上限，导出端不可用时丢弃最旧的 span
+_MAX_BUFFER = 10000
+
+
+class Span:
+    """一次耗时区间"""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id",
+        "start_ns", "end_ns", "attributes", "error",
+    )
+
+    recording = True
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def record_exception(self, exc: BaseException):
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # INTERNAL
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [
+                {"key": k, "value": _otlp_value(v)}
+                for k, v in self.attributes.items() if v is not None
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """关闭或未采样时使用的空 span"""
+
+    recording = False
+    trace_id = None
+    span_id = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_attributes(self, **attributes: Any):
+        pass
+
+    def record_exception(self, exc: BaseException):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _NoopScope:
+    """关闭时 span() 返回的上下文管理器"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SCOPE = _NoopScope()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+_current: ContextVar[Any] = ContextVar("trace_span", default=None)
+
+
+class _SpanScope:
+    """span 的上下文管理器：进入时成为当前 span，退出时记录结束时间并提交导出"""
+
+    __slots__ = ("tracer", "name", "attributes", "span", "token")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        parent = _current.get()
+        if parent is None:
+            if random.random() >= settings.tracing_sample_rate:
+                self.span = NOOP_SPAN
+            else:
+                self.span = Span(self.name, os.urandom(16).hex(), None, self.attributes)
+        elif parent.recording:
+            self.span = Span(self.name, parent.trace_id, parent.span_id, self.attributes)
+        else:
+            self.span = NOOP_SPAN
+        self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self.token)
+        span = self.span
+        if span.recording:
+            span.end_ns = time.time_ns()
+            if exc is not None:
+                span.record_exception(exc)
+            self.tracer._finish(span)
+        return False
+
+
+class Tracer:
+    """span 的创建与批量导出"""
+
+    def __init__(self):
+        self._buffer: List[Span] = []
+        self._task: Optional[asyncio.Task] = None
+        self._pending: set = set()
+        self._client = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.tracing_exporter in ("file", "otlp")
+
+    def span(self, name: str, **attributes: Any):
+        """创建 span（with 语句使用）"""
+        if not self.enabled:
+            return _NOOP_SCOPE
+        return _SpanScope(self, name, attributes)
+
+    def current(self):
+        """当前 span（没有时返回空 span，可放心调用 set_attributes）"""
+        return _current.get() or NOOP_SPAN
+
+    def traced(self, name: Optional[str] = None) -> Callable:
+        """异步函数装饰器：整个调用作为一个 span"""
+
+        def decorator(func: Callable) -> Callable:
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return await func(*args, **kwargs)
+                with _SpanScope(self, span_name, {}):
+                    return await func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    # ============== 导出 ==============
+
+    def _finish(self, span: Span):
+        self._buffer.append(span)
+        if len(self._buffer) > _MAX_BUFFER:
+            del self._buffer[:len(self._buffer) - _MAX_BUFFER]
+        if len(self._buffer) >= _BATCH_SIZE and self._task is not None:
+            task = asyncio.get_running_loop().create_task(self.flush())
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    def _payload(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": settings.app_name}},
+                    {"key": "process.pid", "value": {"intValue": str(os.getpid())}},
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "lecfaka"},
+                    "spans": [span.to_otlp() for span in spans],
+                }],
+            }],
+        }
+
+    def _write_file(self, line: str):
+        directory = os.path.dirname(settings.tracing_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(settings.tracing_file, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    async def flush(self):
+        """导出缓冲区中的 span"""
+        if not self._buffer:
+            return
+        spans, self._buffer = self._buffer, []
+        payload = self._payload(spans)
+        try:
+            if settings.tracing_exporter == "file":
+                line = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+                await asyncio.to_thread(self._write_file, line)
+            elif settings.tracing_exporter == "otlp":
+                if self._client is None:
+                    import httpx
+                    self._client = httpx.AsyncClient(timeout=5)
+                endpoint = settings.tracing_otlp_endpoint.rstrip("/") + "/v1/traces"
+                response = await self._client.post(endpoint, json=payload)
+                response.raise_for_status()
+        except Exception as e:
+            logger.warning(f"Trace export failed, {len(spans)} spans dropped: {e}")
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(_FLUSH_INTERVAL)
+            await self.flush()
+
+    async def start(self):
+        """启动后台导出（应用启动时调用）"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """停止后台导出并导出剩余 span"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# 全局单例
+tracer = Tracer()
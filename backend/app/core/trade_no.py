@@ -0,0 +1,230 @@
+"""
+单号生成（Snowflake 风格）
+
+24 位纯数字：17 位 UTC 毫秒时间（YYYYMMDDHHMMSSmmm）+ 3 位节点号 + 4 位毫秒内序号。
+
+唯一性：
+  - 同一进程内 (毫秒, 序号) 严格递增：时钟回拨时沿用上次的毫秒继续计数，
+    单毫秒内序号用完时逻辑时钟前进 1ms，都不会产生重复
+  - 不同进程的节点号不同（每个进程单独确定，同一台机器上的多个 worker 也不共用）：
+    - 配置了 trade_no_node_id：作为本机的起始节点号，本机的进程依次占用
+      起始、起始+1……（文件锁，进程退出自动释放）；多台机器的起始节点号之间
+      应至少间隔每台机器的进程数
+    - 未配置：在 Redis 中租用一个空闲节点号（SET NX + 定期续期）
+Redis 不可用且未配置节点号时退化为随机节点号，不再保证唯一（与其他进程撞号的概率约千分之一）：
+订单写入时撞号会回滚保存点换号重试，充值、提现由数据库 UNIQUE 约束拦截。
+
+订单、充值、提现共用同一个生成器，充值和提现单号带前缀（R / W）。
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from ..config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger("core.trade_no")
+
+
+## 节点号个数（3 位）
+MAX_NODES = 1000
+
+## 每毫秒序号个数（4 位）
+MAX_SEQUENCE = 10000
+
+## Redis 中节点号租约的键和有效期（秒）
+NODE_KEY = "lecfaka:trade_no:node:{}"
+NODE_TTL = 60
+
+## 配置节点号时本机节点号的锁文件
+NODE_LOCK_PATH = os.path.join(tempfile.gettempdir(), "lecfaka-trade-no-node-{}.lock")
+
+
+class TradeNoGenerator:
+    """单号生成器（进程内线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = 0
+        self._sequence = 0
+        self._prefix_ms = -1
+        self._prefix = ""
+        self._node_id: Optional[int] = None
+        self._node_str = ""
+        self._leased = False
+        self._lock_file = None
+        self._token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._task: Optional[asyncio.Task] = None
+
+    # ============== 节点号 ==============
+
+    @property
+    def node_id(self) -> int:
+        return self._ensure_node()
+
+    def _ensure_node(self) -> int:
+        if self._node_id is None:
+            if settings.trade_no_node_id >= 0:
+                self._claim_local(settings.trade_no_node_id)
+            else:
+                self._set_node(random.randrange(MAX_NODES))
+                logger.warning(
+                    f"Trade number node id not leased, using random node {self._node_id}; "
+                    f"trade numbers may collide with other processes until "
+                    f"TRADE_NO_NODE_ID is set or Redis is available"
+                )
+        return self._node_id
+
+    def _claim_local(self, base: int):
+        """从配置的起始节点号开始，占用本机第一个未被其他进程锁定的节点号"""
+        if fcntl is None:
+            self._set_node(base % MAX_NODES)
+            logger.warning(
+                f"File locks unavailable, using configured trade number node {self._node_id} "
+                f"as is; run a single process per node id"
+            )
+            return
+        for offset in range(MAX_NODES):
+            node_id = (base + offset) % MAX_NODES
+            lock_file = open(NODE_LOCK_PATH.format(node_id), "a")
+            try:
+                # lockf 是进程级的记录锁，fork 出的 worker 不会继承
+                fcntl.lockf(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                continue
+            self._lock_file = lock_file
+            self._set_node(node_id)
+            if offset:
+                logger.info(f"Trade number node {base} taken on this host, using node {node_id}")
+            return
+        raise RuntimeError("No free trade number node id on this host")
+
+    def _set_node(self, node_id: int):
+        with self._lock:
+            self._node_id = node_id
+            self._node_str = f"{node_id:03d}"
+
+    @staticmethod
+    def _redis():
+        from . import cache
+        return cache.get_redis()
+
+    async def _lease(self) -> bool:
+        """从随机位置开始租用第一个空闲的节点号"""
+        redis = self._redis()
+        if redis is None:
+            return False
+        start = random.randrange(MAX_NODES)
+        for offset in range(MAX_NODES):
+            node_id = (start + offset) % MAX_NODES
+            if await redis.set(NODE_KEY.format(node_id), self._token, nx=True, ex=NODE_TTL):
+                self._set_node(node_id)
+                self._leased = True
+                logger.info(f"Trade number node id leased: {node_id}")
+                return True
+        logger.error("No free trade number node id in Redis")
+        return False
+
+    async def _renew(self):
+        """续期租约，租约丢失（被其他进程占用或过期）时重新租用"""
+        redis = self._redis()
+        if redis is None:
+            return
+        key = NODE_KEY.format(self._node_id)
+        if await redis.get(key) == self._token:
+            await redis.expire(key, NODE_TTL)
+        else:
+            logger.warning(f"Trade number node lease {self._node_id} lost, leasing a new one")
+            self._leased = False
+            await self._lease()
+
+    async def _renew_loop(self):
+        while True:
+            await asyncio.sleep(NODE_TTL / 3)
+            try:
+                await self._renew()
+            except Exception as e:
+                logger.warning(f"Trade number node lease renewal failed: {e}")
+
+    async def start(self):
+        """确定本进程的节点号（应用启动时调用）：优先按配置在本机占用，否则在 Redis 中租用"""
+        if settings.trade_no_node_id >= 0:
+            if self._lock_file is None:
+                self._claim_local(settings.trade_no_node_id)
+            return
+        try:
+            if await self._lease():
+                self._task = asyncio.create_task(self._renew_loop())
+        except Exception as e:
+            logger.warning(f"Trade number node lease failed: {e}")
+
+    async def stop(self):
+        """停止续期并释放租约"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+            self._node_id = None
+        if not self._leased:
+            return
+        redis = self._redis()
+        if redis is None:
+            return
+        try:
+            key = NODE_KEY.format(self._node_id)
+            if await redis.get(key) == self._token:
+                await redis.delete(key)
+        except Exception:
+            pass
+        self._leased = False
+
+    # ============== 生成 ==============
+
+    def _time_prefix(self, ms: int) -> str:
+        if ms != self._prefix_ms:
+            moment = datetime.fromtimestamp(ms / 1000, tz=timezone.utc)
+            self._prefix = moment.strftime("%Y%m%d%H%M%S") + f"{ms % 1000:03d}"
+            self._prefix_ms = ms
+        return self._prefix
+
+    def next(self, prefix: str = "") -> str:
+        """生成下一个单号"""
+        if self._node_id is None:
+            self._ensure_node()
+        now = time.time_ns() // 1000000
+        with self._lock:
+            if now > self._last_ms:
+                self._last_ms = now
+                self._sequence = 0
+            else:
+                # 同一毫秒或时钟回拨：沿用上次的毫秒继续计数
+                self._sequence += 1
+                if self._sequence >= MAX_SEQUENCE:
+                    self._last_ms += 1
+                    self._sequence = 0
+            return f"{prefix}{self._time_prefix(self._last_ms)}{self._node_str}{self._sequence:04d}"
+
+
+# 全局单例
+generator = TradeNoGenerator()
+
+
+def generate_trade_no(prefix: str = "") -> str:
+    """生成订单号（充值、提现分别传入前缀 R / W）"""
+    return generator.next(prefix)
@@ -14,6 +14,7 @@ from sqlalchemy import MetaData
 from typing import AsyncGenerator
 
 from .config import settings
+from .core.metrics import InstrumentedQueuePool
 
 
 # 命名约定，用于自动生成约束名称
@@ -38,6 +39,7 @@ engine: AsyncEngine = create_async_engine(
     settings.database_url,
     echo=settings.debug,
     pool_pre_ping=True,
+    poolclass=InstrumentedQueuePool,
     pool_size=10,
     max_overflow=20,
 )
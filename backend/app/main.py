@@ -4,14 +4,25 @@ FastAPI 应用入口
 
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
 
 from .config import settings
-from .database import init_db, close_db, async_session_maker
+from .database import engine, init_db, close_db, async_session_maker
 from .core.exceptions import AppException
+from .core import cache
+from .core.compression import CompressionMiddleware
+from .core import sql_stats
+from .core import metrics
+from .core.tracing import tracer
+from .core import trade_no
+from .core.security import password_hasher
+from .core.responses import ORJSONResponse
+from .services.catalog_search import catalog_search
+from .services import outbox, reservation
+from .services.seckill import seckill
 from .api.v1 import api_router
-from .plugins import plugin_manager
+from .plugins import isolation, plugin_manager
 from .plugins.sdk.hooks import hooks, Events
 
 
@@ -28,6 +39,16 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"[WARN] Database init error: {e}")
     
+    # 库存计数器：升级后首次启动时从卡密/订单全量重建
+    try:
+        from .services.inventory import InventoryService
+        async with async_session_maker() as db:
+            if await InventoryService(db).ensure_initialized():
+                await db.commit()
+                print("[OK] Inventory counters rebuilt")
+    except Exception as e:
+        print(f"[WARN] Inventory counter init error: {e}")
+    
     # 从数据库加载（或首次生成）签名密钥
     try:
         import secrets as _sec
@@ -73,6 +94,30 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"[WARN] Plugin system load error: {e}")
     
+    # 注册缓存失效钩子
+    cache.register_hooks()
+
+    # 构建商城搜索索引并启动后台同步
+    await catalog_search.start()
+
+    # 定期上报运行指标（多 worker 汇总）
+    await metrics.publisher.start()
+
+    # 链路追踪导出
+    await tracer.start()
+
+    # 单号生成器节点号（配置或 Redis 租用）
+    await trade_no.generator.start()
+
+    # 定期释放过期的卡密预占
+    await reservation.sweeper.start()
+
+    # 秒杀窗口同步与名额预载
+    await seckill.start()
+
+    # 事件发件箱分发（插件和缓存钩子注册之后）
+    await outbox.dispatcher.start()
+
     # 触发应用启动事件
     await hooks.emit(Events.APP_STARTUP, {"app": app})
     
@@ -94,11 +139,22 @@ async def lifespan(app: FastAPI):
     
     # 取消后台任务
     license_task.cancel()
+    await catalog_search.stop()
+    await metrics.publisher.stop()
+    await tracer.stop()
+    await trade_no.generator.stop()
+    await reservation.sweeper.stop()
+    await seckill.stop()
+    await outbox.dispatcher.stop()
+    password_hasher.shutdown()
     
     # 触发关闭事件
     await hooks.emit(Events.APP_SHUTDOWN)
+    await hooks.drain()
+    await isolation.pool.stop()
     
     # 关闭时
+    await cache.close()
     await close_db()
     print(f"[Shutdown] {settings.app_name} complete")
 
@@ -114,6 +170,7 @@ def create_app() -> FastAPI:
         redoc_url="/redoc" if settings.debug else None,
         openapi_url="/openapi.json" if settings.debug else None,
         lifespan=lifespan,
+        default_response_class=ORJSONResponse,
     )
     
     # CORS配置
@@ -126,10 +183,21 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     
+    # 响应压缩（br / gzip 协商）
+    app.add_middleware(CompressionMiddleware)
+    
+    # 请求级 SQL 统计（Server-Timing 响应头 + 日志，调试模式检测 N+1）
+    sql_stats.instrument(engine.sync_engine)
+    app.add_middleware(sql_stats.SQLStatsMiddleware)
+    
+    # 运行指标（/metrics）
+    metrics.watch_pool(engine.sync_engine)
+    app.add_middleware(metrics.MetricsMiddleware)
+    
     # 全局异常处理
     @app.exception_handler(AppException)
     async def app_exception_handler(request: Request, exc: AppException):
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=exc.code,
             content=exc.to_dict()
         )
@@ -142,7 +210,7 @@ def create_app() -> FastAPI:
         tb = traceback.format_exc()
         print(f"[ERROR] {request.method} {request.url.path}: {error_detail}", file=sys.stderr, flush=True)
         print(tb, file=sys.stderr, flush=True)
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=500,
             content={
                 "code": 500,
@@ -160,6 +228,19 @@ def create_app() -> FastAPI:
     async def health_check():
         return {"status": "ok", "app": settings.app_name}
     
+    # 运行指标（Prometheus 文本格式，汇总所有 worker）
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics_endpoint(request: Request):
+        if settings.metrics_token:
+            import hmac
+            auth = request.headers.get("authorization", "")
+            if not hmac.compare_digest(auth, f"Bearer {settings.metrics_token}"):
+                return PlainTextResponse("unauthorized", status_code=401)
+        return PlainTextResponse(
+            await metrics.publisher.render(),
+            media_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+    
     return app
 
 
@@ -19,6 +19,8 @@ from .recharge import RechargeOrder
 from .withdrawal import Withdrawal
 from .log import OperationLog
 from .plugin import Plugin
+from .inventory import InventoryCounter
+from .outbox import OutboxEvent
 
 __all__ = [
     "User",
@@ -40,4 +42,6 @@ __all__ = [
     "Withdrawal",
     "OperationLog",
     "Plugin",
+    "InventoryCounter",
+    "OutboxEvent",
 ]
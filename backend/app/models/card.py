@@ -2,12 +2,13 @@
 卡密模型
 """
 
+import random
 from datetime import datetime
 from decimal import Decimal
 from typing import Optional, TYPE_CHECKING
 from sqlalchemy import (
     String, Integer, DateTime, ForeignKey, 
-    Numeric, Text, Index
+    Numeric, Text, Index, text
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -20,6 +21,15 @@ if TYPE_CHECKING:
     from .user import User
 
 
+## 随机发货序号的取值上限
+SHUFFLE_KEY_MAX = 2 ** 31 - 1
+
+
+def random_shuffle_key() -> int:
+    """随机发货序号（入库时分配，等价于把库存预先洗牌）"""
+    return random.randrange(SHUFFLE_KEY_MAX)
+
+
 class Card(Base):
     """卡密"""
     __tablename__ = "cards"
@@ -60,10 +70,21 @@ class Card(Base):
     # 备注
     note: Mapped[Optional[str]] = mapped_column(Text, nullable=True, comment="备注")
     
-    # 状态 0=待售 1=已售
-    status: Mapped[int] = mapped_column(Integer, default=0, comment="状态 0=待售 1=已售")
+    # 状态 0=待售 1=已售 2=锁定 3=预占（下单时为订单保留，见 services.reservation）
+    status: Mapped[int] = mapped_column(Integer, default=0, comment="状态 0=待售 1=已售 2=锁定 3=预占")
+    
+    # 随机发货序号：随机发货模式沿该序号从随机起点取卡，避免 ORDER BY random() 全量排序
+    shuffle: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=random_shuffle_key, server_default="0",
+        comment="随机发货序号",
+    )
+    
+    # 预占到期时间（status=3 时有效，过期后由后台任务释放回待售）
+    reserved_until: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, nullable=True, comment="预占到期时间"
+    )
     
-    # 售出订单
+    # 售出订单（预占时为占用的订单）
     order_id: Mapped[Optional[int]] = mapped_column(
         Integer, ForeignKey("orders.id"), nullable=True, comment="售出订单ID"
     )
@@ -103,6 +124,21 @@ class Card(Base):
         Index("idx_cards_variant_id", "variant_id"),
         Index("idx_cards_status", "status"),
         Index("idx_cards_race", "race"),
+        Index("idx_cards_order_id", "order_id"),
+        # 过期预占清理：只索引预占中的卡密
+        Index(
+            "idx_cards_reserved_until", "reserved_until",
+            postgresql_where=text("status = 3"), sqlite_where=text("status = 3"),
+        ),
+        # 随机发货：只索引待售卡密（部分索引），按种类过滤时使用第二个
+        Index(
+            "idx_cards_stock_shuffle", "commodity_id", "shuffle",
+            postgresql_where=text("status = 0"), sqlite_where=text("status = 0"),
+        ),
+        Index(
+            "idx_cards_stock_race_shuffle", "commodity_id", "race", "shuffle",
+            postgresql_where=text("status = 0"), sqlite_where=text("status = 0"),
+        ),
     )
     
     def __repr__(self) -> str:
@@ -0,0 +1,69 @@
+"""
+库存计数器模型
+
+按 (商品, 种类) 物化待售/锁定/预占/已售卡密数量和已支付订单数，
+替代在 cards / orders 上反复执行 COUNT(*)。
+由 InventoryService 在卡密和订单变更的同一事务内维护。
+
+每个 (商品, 种类) 最多有 inventory_counter_shards 行（分片），写入时每个事务随机
+选一个分片做增量，读取时求和；热门商品的并发发货因此不会串行在同一行锁上。
+"""
+
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import (
+    String, Integer, DateTime, ForeignKey, UniqueConstraint, Index
+)
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..database import Base
+
+
+class InventoryCounter(Base):
+    """库存计数器"""
+    __tablename__ = "inventory_counters"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+
+    # 所属商品
+    commodity_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("commodities.id", ondelete="CASCADE"),
+        nullable=False, comment="商品ID"
+    )
+
+    # 种类（"" 表示无种类，与 Card.race / Order.race 为空对应）
+    race: Mapped[str] = mapped_column(
+        String(100), nullable=False, default="", comment="商品种类"
+    )
+
+    # 分片号
+    shard: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0", comment="分片号"
+    )
+
+    # 卡密数量
+    stock: Mapped[int] = mapped_column(Integer, default=0, comment="待售卡密数")
+    locked: Mapped[int] = mapped_column(Integer, default=0, comment="已锁定卡密数")
+    reserved: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", comment="已预占卡密数（待支付订单占用）"
+    )
+    sold: Mapped[int] = mapped_column(Integer, default=0, comment="已售卡密数")
+
+    # 销量
+    sold_orders: Mapped[int] = mapped_column(Integer, default=0, comment="已支付订单数")
+
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, nullable=True, default=datetime.utcnow,
+        onupdate=datetime.utcnow, comment="更新时间"
+    )
+
+    # 索引
+    __table_args__ = (
+        UniqueConstraint(
+            "commodity_id", "race", "shard", name="uq_inventory_counters_commodity_race_shard"
+        ),
+        Index("idx_inventory_counters_commodity_id", "commodity_id"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<InventoryCounter {self.commodity_id}:{self.race}#{self.shard}>"
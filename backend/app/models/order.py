@@ -141,10 +141,21 @@ class Order(Base):
         String(500), nullable=True, comment="支付链接"
     )
     
+    # 支付类型及附加数据 (JSON)，幂等重放时原样返回
+    pay_type: Mapped[Optional[str]] = mapped_column(
+        String(16), nullable=True, comment="支付类型"
+    )
+    pay_extra: Mapped[Optional[str]] = mapped_column(
+        Text, nullable=True, comment="支付附加数据JSON"
+    )
+    
     # API请求号 (用于幂等)
     request_no: Mapped[Optional[str]] = mapped_column(
         String(64), nullable=True, unique=True, comment="API请求号"
     )
+    request_digest: Mapped[Optional[str]] = mapped_column(
+        String(64), nullable=True, comment="API请求参数摘要"
+    )
     
     # 客户端信息
     create_ip: Mapped[Optional[str]] = mapped_column(
@@ -0,0 +1,61 @@
+"""
+事件发件箱模型
+
+业务事务内写入待分发的钩子事件，提交后由后台分发器（services.outbox）投递给钩子处理函数。
+"""
+
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, Integer, DateTime, Text, Index, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..database import Base
+
+
+class OutboxEvent(Base):
+    """待分发事件"""
+    __tablename__ = "outbox_events"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+
+    # 事件名称（Events.*）
+    event: Mapped[str] = mapped_column(String(64), nullable=False, comment="事件名称")
+
+    # 聚合标识（如 orders:123），同一聚合的事件按写入顺序逐个分发；为空时不限顺序
+    aggregate: Mapped[Optional[str]] = mapped_column(
+        String(64), nullable=True, comment="聚合标识"
+    )
+
+    # 事件数据（JSON，ORM 对象以 {"__entity__": 类名, "id": 主键} 引用）
+    payload: Mapped[str] = mapped_column(Text, nullable=False, comment="事件数据JSON")
+
+    # 状态 0=待分发 2=失败次数超限（成功分发后直接删除）
+    status: Mapped[int] = mapped_column(Integer, default=0, comment="状态 0=待分发 2=已放弃")
+
+    # 重试
+    attempts: Mapped[int] = mapped_column(Integer, default=0, comment="已尝试次数")
+    pending_handlers: Mapped[Optional[str]] = mapped_column(
+        Text, nullable=True, comment="待重试的处理函数JSON（为空表示全部）"
+    )
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True, comment="最近一次错误")
+    available_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, comment="可分发时间"
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, comment="创建时间"
+    )
+
+    # 索引
+    __table_args__ = (
+        # 分发器取待分发事件
+        Index(
+            "idx_outbox_events_pending", "available_at", "id",
+            postgresql_where=text("status = 0"), sqlite_where=text("status = 0"),
+        ),
+        # 同一聚合是否有更早的待分发事件
+        Index("idx_outbox_events_aggregate", "aggregate", "status", "id"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<OutboxEvent {self.id} {self.event}>"
@@ -13,6 +13,7 @@ from typing import Dict, Optional, List, Type
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from . import isolation
 from .sdk.base import PluginBase, PluginMeta
 from .sdk.hooks import hooks
 from .sdk.payment_base import PaymentPluginBase
@@ -129,7 +130,7 @@ class PluginManager:
 
             try:
                 meta = self._load_meta(plugin_json)
-                plugin_class = self._load_class(item, meta)
+                plugin_class = self._resolve_class(item, meta, is_builtin)
 
                 pi = PluginInstance(
                     meta=meta,
@@ -138,7 +139,8 @@ class PluginManager:
                     is_builtin=is_builtin,
                 )
                 self._plugins[meta.id] = pi
-                logger.info(f"  Loaded: {meta.id} v{meta.version} ({meta.type})")
+                isolated = " [isolated]" if issubclass(plugin_class, isolation.IsolatedPlugin) else ""
+                logger.info(f"  Loaded: {meta.id} v{meta.version} ({meta.type}){isolated}")
             except Exception as e:
                 logger.error(f"Failed to load plugin from {item.name}: {e}")
 
@@ -166,6 +168,12 @@ class PluginManager:
             changelog=data.get("changelog", {}),
         )
 
+    def _resolve_class(self, plugin_dir: Path, meta: PluginMeta, is_builtin: bool) -> Type[PluginBase]:
+        """插件类：隔离运行的插件不在本进程导入，使用转发到 worker 进程的代理类"""
+        if isolation.is_isolated(meta, is_builtin):
+            return isolation.proxy_class(meta, plugin_dir)
+        return self._load_class(plugin_dir, meta)
+
     def _load_class(self, plugin_dir: Path, meta: PluginMeta) -> Type[PluginBase]:
         """动态加载插件类"""
         entry = meta.backend.get("entry", "__init__:Plugin")
@@ -270,22 +278,26 @@ class PluginManager:
             # 重新导入模块（处理更新场景）
             meta = self._load_meta(plugin_json)
 
-            # 强制重新导入模块
-            entry = meta.backend.get("entry", "__init__:Plugin")
-            module_name, class_name = entry.split(":")
-            module_path = f"app.plugins.installed.{plugin_id}.{module_name}"
-
-            import sys
-            # 清除旧的模块缓存以确保加载最新代码
-            for key in list(sys.modules.keys()):
-                if key.startswith(f"app.plugins.installed.{plugin_id}"):
-                    del sys.modules[key]
-
-            module = importlib.import_module(module_path)
-            plugin_class = getattr(module, class_name)
-
-            if not issubclass(plugin_class, PluginBase):
-                raise TypeError(f"{class_name} is not a subclass of PluginBase")
+            if isolation.is_isolated(meta, is_builtin=False):
+                # 隔离运行：worker 进程在启用时重新加载模块
+                plugin_class = isolation.proxy_class(meta, installed_dir)
+            else:
+                # 强制重新导入模块
+                entry = meta.backend.get("entry", "__init__:Plugin")
+                module_name, class_name = entry.split(":")
+                module_path = f"app.plugins.installed.{plugin_id}.{module_name}"
+
+                import sys
+                # 清除旧的模块缓存以确保加载最新代码
+                for key in list(sys.modules.keys()):
+                    if key.startswith(f"app.plugins.installed.{plugin_id}"):
+                        del sys.modules[key]
+
+                module = importlib.import_module(module_path)
+                plugin_class = getattr(module, class_name)
+
+                if not issubclass(plugin_class, PluginBase):
+                    raise TypeError(f"{class_name} is not a subclass of PluginBase")
 
             pi = PluginInstance(
                 meta=meta,
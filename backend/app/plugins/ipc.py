@@ -0,0 +1,85 @@
+"""
+插件进程间通信
+
+API 进程与插件 worker 进程之间通过管道交换帧：4 字节大端长度 + UTF-8 JSON。
+事件数据中的 ORM 实体以已加载列的快照传递，worker 中还原为支持属性访问的 Record。
+
+JSON 没有的类型按以下方式传递（对端收到的是转换后的值，不会还原）：
+  - Decimal（金额等）：数字，对端为 float
+  - datetime / date / time：ISO 8601 字符串（datetime.isoformat()）
+  - 其余无法表示的值：str()
+"""
+
+import json
+import struct
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict
+
+from sqlalchemy import inspect as sa_inspect
+
+## 帧头（消息体长度）
+_HEADER = struct.Struct(">I")
+
+## 单帧最大长度（字节）
+MAX_FRAME = 16 * 1024 * 1024
+
+## 实体快照标记
+_ENTITY = "__entity__"
+
+
+class Record(dict):
+    """实体快照（worker 进程中使用），支持 order.trade_no 形式的属性访问"""
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def _encode_value(value: Any) -> Any:
+    """JSON 无法直接表示的值（见模块说明）"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+def pack_frame(message: Dict[str, Any]) -> bytes:
+    """编码一帧"""
+    body = json.dumps(message, ensure_ascii=False, default=_encode_value).encode("utf-8")
+    if len(body) > MAX_FRAME:
+        raise ValueError(f"IPC frame too large: {len(body)} bytes")
+    return _HEADER.pack(len(body)) + body
+
+
+async def read_frame(reader) -> Dict[str, Any]:
+    """读取一帧（对端关闭时抛出 asyncio.IncompleteReadError）"""
+    (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    if size > MAX_FRAME:
+        raise ValueError(f"IPC frame too large: {size} bytes")
+    return json.loads(await reader.readexactly(size))
+
+
+def encode_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    """事件数据转为可序列化的形式：ORM 实体取已加载的列（不触发懒加载）"""
+    encoded = {}
+    for name, value in data.items():
+        if hasattr(value, "_sa_instance_state"):
+            state = sa_inspect(value)
+            columns = state.mapper.column_attrs.keys()
+            fields = {key: state.dict[key] for key in columns if key in state.dict}
+            encoded[name] = {_ENTITY: type(value).__name__, "fields": fields}
+        else:
+            encoded[name] = value
+    return encoded
+
+
+def decode_data(data: Dict[str, Any]) -> Dict[str, Any]:
+    """还原事件数据：实体快照转为 Record"""
+    return {
+        name: Record(value["fields"]) if isinstance(value, dict) and _ENTITY in value else value
+        for name, value in data.items()
+    }
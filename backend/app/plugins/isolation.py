@@ -0,0 +1,369 @@
+"""
+插件进程隔离
+
+选中的插件（settings.plugin_isolation 或 plugin.json 中 backend.isolated=true）不在 API 进程中导入，
+而是加载到一组 worker 进程（python -m app.plugins.worker）中：
+  - API 进程中的插件实例是代理（IsolatedPlugin），on_enable() 时在每个 worker 中加载插件，
+    并按插件在 worker 中注册的钩子（事件、优先级、执行方式、超时）注册转发处理函数
+  - 钩子处理函数、notify 插件的 send()、delivery 插件的 deliver() 通过本地管道（ipc）调用，
+    事件数据以 JSON 快照传递；worker 中的 ctx.cancel() 会回传给 API 进程
+  - 每个插件同时执行的调用数受 plugin_worker_concurrency（或 plugin.json 的 backend.concurrency）限制，
+    调用发给当前负载最低的 worker
+  - worker 退出（崩溃或被杀）时，其未完成的调用立即失败，监督任务按退避重启 worker 并重新加载插件
+插件代码阻塞或占满 CPU 只影响 worker 进程，API 的延迟不再依赖插件的质量。
+
+支付和主题插件需要在 API 进程中同步参与请求处理，不支持隔离。
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Type
+
+from ..config import settings
+from ..core import metrics
+from .ipc import encode_data, pack_frame, read_frame
+from .sdk.base import PluginBase, PluginMeta
+from .sdk.delivery_base import DeliveryPluginBase
+from .sdk.hooks import EventContext, hooks
+from .sdk.notify_base import NotifyPluginBase
+
+logger = logging.getLogger("plugins.isolation")
+
+
+## 可以隔离的插件类型
+ISOLATABLE_TYPES = ("extension", "notify", "delivery")
+
+## worker 重启退避（秒）：首次 / 上限；运行超过 STABLE_SECONDS 后重置
+RESTART_BACKOFF = 1.0
+MAX_RESTART_BACKOFF = 30.0
+STABLE_SECONDS = 60
+
+## 关闭时等待 worker 退出的时间（秒），超时后强制结束
+STOP_TIMEOUT = 5.0
+
+## backend 目录（worker 进程的工作目录）
+_BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+
+class PluginWorkerError(Exception):
+    """插件 worker 调用失败（插件抛出异常、超时或 worker 不可用）"""
+    pass
+
+
+def is_isolated(meta: PluginMeta, is_builtin: bool) -> bool:
+    """插件是否在 worker 进程中运行"""
+    if meta.type not in ISOLATABLE_TYPES:
+        return False
+    if meta.backend.get("isolated"):
+        return True
+    selected = {s.strip() for s in settings.plugin_isolation.split(",") if s.strip()}
+    return meta.id in selected or ("installed" in selected and not is_builtin)
+
+
+# ============== worker 进程 ==============
+
+class _Worker:
+    """单个 worker 进程及其未完成的请求"""
+
+    def __init__(self, slot: int):
+        self.slot = slot
+        self.pending: Dict[int, asyncio.Future] = {}
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._ids = itertools.count(1)
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.returncode is None
+
+    async def start(self):
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(_BACKEND_DIR), env.get("PYTHONPATH")]))
+        self._proc = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "app.plugins.worker",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            cwd=str(_BACKEND_DIR),
+            env=env,
+        )
+        self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def _read_loop(self):
+        try:
+            while True:
+                reply = await read_frame(self._proc.stdout)
+                future = self.pending.pop(reply.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(reply)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"Plugin worker {self.slot} sent an invalid frame: {e}")
+            self.kill()
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(PluginWorkerError(f"Plugin worker {self.slot} exited"))
+            self.pending.clear()
+
+    async def request(self, message: Dict[str, Any], timeout: float) -> Any:
+        if not self.alive:
+            raise PluginWorkerError(f"Plugin worker {self.slot} is not running")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        try:
+            self._proc.stdin.write(pack_frame({"id": request_id, **message}))
+            await self._proc.stdin.drain()
+            reply = await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise PluginWorkerError(f"Plugin call timed out after {timeout}s")
+        except ConnectionError as e:
+            raise PluginWorkerError(f"Plugin worker {self.slot} pipe closed: {e}")
+        finally:
+            self.pending.pop(request_id, None)
+        if not reply.get("ok"):
+            raise PluginWorkerError(reply.get("error") or "plugin call failed")
+        return reply.get("result")
+
+    async def wait(self) -> Optional[int]:
+        if self._proc is None:
+            return None
+        code = await self._proc.wait()
+        if self._reader_task is not None:
+            await self._reader_task
+        return code
+
+    def kill(self):
+        if self.alive:
+            self._proc.kill()
+
+    async def stop(self):
+        """关闭标准输入让 worker 卸载插件后退出，超时则强制结束"""
+        if not self.alive:
+            return
+        try:
+            self._proc.stdin.close()
+            await asyncio.wait_for(self._proc.wait(), STOP_TIMEOUT)
+        except (asyncio.TimeoutError, ConnectionError):
+            self.kill()
+            await self._proc.wait()
+
+
+# ============== 进程池 ==============
+
+class PluginWorkerPool:
+    """受监督的插件 worker 进程池（首次加载隔离插件时启动）"""
+
+    def __init__(self):
+        self._workers: List[_Worker] = []
+        self._supervisors: List[asyncio.Task] = []
+        self._plugins: Dict[str, Dict[str, Any]] = {}  # 已加载插件的加载请求（重启后重放）
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._start_lock: Optional[asyncio.Lock] = None
+        # 加载 / 卸载与重启后的重放互斥：否则重启中的 worker 可能既错过重放，又因仍是旧进程而被加载跳过
+        self._load_lock: Optional[asyncio.Lock] = None
+
+    @property
+    def started(self) -> bool:
+        return bool(self._supervisors)
+
+    def _loading(self) -> asyncio.Lock:
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        return self._load_lock
+
+    async def _ensure_started(self):
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self.started:
+                return
+            self._workers = [_Worker(slot) for slot in range(max(1, settings.plugin_workers))]
+            await asyncio.gather(*(worker.start() for worker in self._workers))
+            self._supervisors = [
+                asyncio.create_task(self._supervise(slot)) for slot in range(len(self._workers))
+            ]
+            logger.info(f"Started {len(self._workers)} plugin worker process(es)")
+
+    async def _supervise(self, slot: int):
+        """worker 退出后按退避重启，并重新加载所有隔离插件"""
+        backoff = RESTART_BACKOFF
+        while True:
+            worker = self._workers[slot]
+            started = time.monotonic()
+            code = await worker.wait()
+            metrics.plugin_worker_restarts.inc()
+            if time.monotonic() - started > STABLE_SECONDS:
+                backoff = RESTART_BACKOFF
+            logger.warning(f"Plugin worker {slot} exited with code {code}, restarting in {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, MAX_RESTART_BACKOFF)
+
+            worker = _Worker(slot)
+            async with self._loading():
+                try:
+                    await worker.start()
+                    for message in list(self._plugins.values()):
+                        await worker.request(message, settings.plugin_worker_call_timeout)
+                except Exception as e:
+                    # 未能加载全部插件的 worker 不接收调用，结束后再次重启
+                    logger.error(f"Failed to restart plugin worker {slot}: {e}")
+                    worker.kill()
+                self._workers[slot] = worker
+
+    async def load(self, meta: PluginMeta, path: str, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """在所有 worker 中加载插件，返回插件注册的钩子"""
+        await self._ensure_started()
+        message = {"op": "load", "plugin": meta.id, "path": path, "config": config}
+        async with self._loading():
+            workers = [w for w in self._workers if w.alive]
+            if not workers:
+                raise PluginWorkerError("No plugin worker is running")
+            try:
+                results = await asyncio.gather(*(
+                    w.request(message, settings.plugin_worker_call_timeout) for w in workers
+                ))
+            except Exception:
+                await self._unload(meta.id)
+                raise
+            self._plugins[meta.id] = message
+            self._slots[meta.id] = asyncio.Semaphore(
+                meta.backend.get("concurrency") or settings.plugin_worker_concurrency
+            )
+            return results[0]
+
+    async def unload(self, plugin_id: str):
+        """在所有 worker 中卸载插件"""
+        async with self._loading():
+            await self._unload(plugin_id)
+
+    async def _unload(self, plugin_id: str):
+        self._plugins.pop(plugin_id, None)
+        self._slots.pop(plugin_id, None)
+        message = {"op": "unload", "plugin": plugin_id}
+        await asyncio.gather(
+            *(w.request(message, STOP_TIMEOUT) for w in self._workers if w.alive),
+            return_exceptions=True,
+        )
+
+    async def invoke(self, plugin_id: str, op: str, **payload: Any) -> Any:
+        """调用插件（受插件并发数限制，发给负载最低的 worker）"""
+        slots = self._slots.get(plugin_id)
+        if slots is None:
+            raise PluginWorkerError(f"Plugin {plugin_id} is not loaded")
+        async with slots:
+            workers = [w for w in self._workers if w.alive]
+            if not workers:
+                metrics.plugin_worker_calls.inc(plugin=plugin_id, op=op, result="unavailable")
+                raise PluginWorkerError("No plugin worker is running")
+            worker = min(workers, key=lambda w: len(w.pending))
+            start = time.perf_counter()
+            try:
+                result = await worker.request(
+                    {"op": op, "plugin": plugin_id, **payload}, settings.plugin_worker_call_timeout,
+                )
+            except PluginWorkerError:
+                metrics.plugin_worker_calls.inc(plugin=plugin_id, op=op, result="error")
+                raise
+            finally:
+                metrics.plugin_worker_duration.observe(
+                    time.perf_counter() - start, plugin=plugin_id, op=op,
+                )
+            metrics.plugin_worker_calls.inc(plugin=plugin_id, op=op, result="ok")
+            return result
+
+    async def stop(self):
+        """停止监督并关闭所有 worker（应用关闭时调用）"""
+        for task in self._supervisors:
+            task.cancel()
+        self._supervisors = []
+        await asyncio.gather(*(w.stop() for w in self._workers), return_exceptions=True)
+        self._workers = []
+
+
+# 全局单例
+pool = PluginWorkerPool()
+
+
+# ============== API 进程中的代理 ==============
+
+class IsolatedPlugin(PluginBase):
+    """在 worker 进程中运行的插件在 API 进程中的代理"""
+
+    ## 插件目录（由 proxy_class 绑定）
+    plugin_path: str = ""
+
+    async def on_enable(self) -> None:
+        specs = await pool.load(self.meta, self.plugin_path, self.config)
+        for spec in specs:
+            hooks.on(
+                spec["event"], self._forward(spec), priority=spec["priority"],
+                owner=self.id, mode=spec["mode"], timeout=spec["timeout"],
+            )
+        await super().on_enable()
+
+    async def on_disable(self) -> None:
+        await pool.unload(self.id)
+        await super().on_disable()
+
+    def _forward(self, spec: Dict[str, Any]):
+        """转发到 worker 的钩子处理函数（限定名与插件中的处理函数一致，发件箱按它重试）"""
+        plugin_id = self.id
+
+        async def handler(ctx: EventContext):
+            reply = await pool.invoke(
+                plugin_id, "hook", event=ctx.event, handler=spec["key"], data=encode_data(ctx.data),
+            )
+            if reply.get("cancelled"):
+                ctx.cancel(reply.get("cancel_reason", ""))
+            return reply.get("result")
+
+        handler.__qualname__ = spec["name"]
+        handler.__name__ = spec["name"].rsplit(".", 1)[-1]
+        return handler
+
+
+class IsolatedNotifyPlugin(IsolatedPlugin, NotifyPluginBase):
+    """隔离运行的通知插件"""
+
+    async def send(self, title: str, content: str, to: Optional[str] = None, **kwargs) -> bool:
+        return await pool.invoke(
+            self.id, "call", method="send", args=[title, content, to], kwargs=kwargs,
+        )
+
+
+class IsolatedDeliveryPlugin(IsolatedPlugin, DeliveryPluginBase):
+    """隔离运行的发货插件"""
+
+    async def deliver(
+        self,
+        order_trade_no: str,
+        commodity_id: int,
+        quantity: int,
+        contact: str,
+        race: Optional[str] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        return await pool.invoke(
+            self.id, "call", method="deliver",
+            args=[order_trade_no, commodity_id, quantity, contact, race], kwargs=kwargs,
+        )
+
+
+_PROXY_BASES: Dict[str, Type[IsolatedPlugin]] = {
+    "extension": IsolatedPlugin,
+    "notify": IsolatedNotifyPlugin,
+    "delivery": IsolatedDeliveryPlugin,
+}
+
+
+def proxy_class(meta: PluginMeta, plugin_dir: Path) -> Type[IsolatedPlugin]:
+    """为插件生成代理类（替代在 API 进程中导入插件类）"""
+    base = _PROXY_BASES[meta.type]
+    return type(f"Isolated_{meta.id}", (base,), {"plugin_path": str(plugin_dir)})
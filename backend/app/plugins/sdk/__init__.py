@@ -4,7 +4,10 @@ LecFaka Plugin SDK
 """
 
 from .base import PluginBase, PluginMeta
-from .hooks import hooks, Events, EventContext, HookManager
+from .hooks import (
+    hooks, Events, EventContext, HookManager,
+    MODE_SEQUENTIAL, MODE_CONCURRENT, MODE_BACKGROUND,
+)
 from .payment_base import PaymentPluginBase, PaymentResult, CallbackResult, PaymentType
 from .notify_base import NotifyPluginBase
 from .delivery_base import DeliveryPluginBase
@@ -17,6 +20,9 @@ __all__ = [
     "Events",
     "EventContext",
     "HookManager",
+    "MODE_SEQUENTIAL",
+    "MODE_CONCURRENT",
+    "MODE_BACKGROUND",
     "PaymentPluginBase",
     "PaymentResult",
     "CallbackResult",
@@ -1,14 +1,28 @@
 """
 钩子/事件系统
 允许插件在业务流程的关键节点注入自定义逻辑
+
+可拦截的 *_CREATING 事件和应用生命周期事件由 emit() 同步执行；
+其余业务事件由业务代码写入事务发件箱（services.outbox），提交后由后台分发器调用 emit()，
+处理函数不再占用业务事务和行锁，至少投递一次（可能重复，处理函数应当幂等）。
 """
 
+import asyncio
+import contextlib
 import logging
-from typing import Callable, Any, Dict, List, Optional
+import time
+from typing import Callable, Any, Collection, Dict, List, Optional, Set
 from dataclasses import dataclass, field
 
+from ...config import settings
+from ...core import metrics
+from ...core.tracing import tracer
+
 logger = logging.getLogger("plugins.hooks")
 
+## 未启用追踪时处理函数不创建 span（每个处理函数省去 span 名称和属性的构造）
+_NO_SPAN = contextlib.nullcontext()
+
 
 class Events:
     """所有可用的钩子事件"""
@@ -41,6 +55,13 @@ class Events:
     NOTIFY_SEND = "notify.send"
 
 
+## 处理函数执行方式：顺序（可拦截）/ 并发 / 后台（不等待）
+MODE_SEQUENTIAL = "sequential"
+MODE_CONCURRENT = "concurrent"
+MODE_BACKGROUND = "background"
+HANDLER_MODES = (MODE_SEQUENTIAL, MODE_CONCURRENT, MODE_BACKGROUND)
+
+
 @dataclass
 class EventContext:
     """传递给钩子处理函数的上下文"""
@@ -49,6 +70,7 @@ class EventContext:
     cancelled: bool = False
     cancel_reason: str = ""
     results: List[Any] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)  # 抛出异常的处理函数（handler_key）
 
     def cancel(self, reason: str = ""):
         """取消当前操作（仅 creating 类事件有效）"""
@@ -60,20 +82,108 @@ class EventContext:
         self.results.append(result)
 
 
+def handler_key(handler: Callable, owner: Optional[str]) -> str:
+    """处理函数的稳定标识（所属插件 + 限定名），用于只重试失败的处理函数"""
+    return f"{owner or 'core'}:{getattr(handler, '__qualname__', repr(handler))}"
+
+
+@dataclass
+class HookHandler:
+    """已注册的处理函数及其熔断状态"""
+    handler: Callable
+    priority: int = 10
+    owner: Optional[str] = None
+    mode: str = MODE_SEQUENTIAL
+    timeout: Optional[float] = None  # None 使用 settings.hook_handler_timeout，0 表示不限
+    key: str = ""
+    name: str = ""
+    # 熔断：连续失败次数 / 熔断到期时间（time.monotonic，0 表示未熔断）
+    failures: int = 0
+    open_until: float = 0.0
+
+
+class _Deadline:
+    """
+    单次 emit 中顺序处理函数的超时。
+
+    整个 emit 共用一个定时器，切换处理函数时只更新截止时间，
+    不为每个处理函数创建 asyncio.timeout()（处理函数多、执行快时这部分开销占大头）。
+    时间取 time.perf_counter()，与处理函数耗时统计共用同一次读取。
+    """
+
+    __slots__ = ("_loop", "_task", "_cancelling", "_when", "_handle", "_at", "_expired")
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self._cancelling = self._task.cancelling()
+        self._when: Optional[float] = None  # 当前处理函数的截止时间
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._at = 0.0  # 定时器的触发时间
+        self._expired = False
+
+    def arm(self, start: float, timeout: float):
+        """开始执行一个处理函数（start 为 time.perf_counter()）"""
+        self._when = when = start + timeout
+        if self._handle is None or self._at > when:
+            self._schedule(when)
+
+    def _schedule(self, when: float):
+        if self._handle is not None:
+            self._handle.cancel()
+        self._at = when
+        self._handle = self._loop.call_later(max(0.0, when - time.perf_counter()), self._fire)
+
+    def disarm(self):
+        """处理函数结束；被截止时间取消的转为 TimeoutError"""
+        self._when = None
+        if self._expired:
+            self._expired = False
+            if self._task.uncancel() <= self._cancelling:
+                raise TimeoutError
+
+    def close(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    def _fire(self):
+        self._handle = None
+        if self._when is None:
+            return
+        if self._when > time.perf_counter():
+            # 定时器是为更早的处理函数设置的，顺延到当前处理函数的截止时间
+            self._schedule(self._when)
+            return
+        self._expired = True
+        self._task.cancel()
+
+
 class HookManager:
     """
     全局钩子管理器。
 
     注册钩子（插件中）:
         hooks.on(Events.ORDER_PAID, my_handler)
+        hooks.on(Events.ORDER_PAID, notify, mode=MODE_BACKGROUND, timeout=10)
 
     触发钩子（核心代码中）:
         ctx = await hooks.emit(Events.ORDER_PAID, {"order": order})
+
+    执行方式（mode）：
+      - sequential（默认）：按优先级逐个 await，可以 ctx.cancel() 拦截后续处理
+      - concurrent：优先级相邻的 concurrent 处理函数并发执行，全部完成后再继续
+      - background：不等待结果，在后台任务中执行（无法拦截，异常只记录日志）；
+        发件箱分发的事件（wait_background=True）按 concurrent 等待，失败的处理函数随事件重试
+    每个处理函数都有超时（hook_handler_timeout，可在注册时单独指定）；
+    连续失败（异常或超时）hook_breaker_threshold 次后熔断 hook_breaker_cooldown 秒，
+    期间跳过该处理函数，到期后放行一次试探，成功则恢复。
     """
 
     def __init__(self):
-        self._handlers: Dict[str, List[tuple]] = {}
+        self._handlers: Dict[str, List[HookHandler]] = {}
         self._handler_owners: Dict[str, List[str]] = {}  # event -> [plugin_id, ...]
+        self._background: Set[asyncio.Task] = set()
 
     def on(
         self,
@@ -81,6 +191,8 @@ class HookManager:
         handler: Callable,
         priority: int = 10,
         owner: Optional[str] = None,
+        mode: str = MODE_SEQUENTIAL,
+        timeout: Optional[float] = None,
     ):
         """
         注册事件处理函数。
@@ -90,74 +202,217 @@ class HookManager:
             handler: 异步处理函数 async def handler(ctx: EventContext)
             priority: 优先级，数字越小越先执行
             owner: 所属插件 ID（用于按插件移除）
+            mode: 执行方式 sequential / concurrent / background
+            timeout: 超时（秒），None 使用全局配置，0 表示不限
         """
+        if mode not in HANDLER_MODES:
+            raise ValueError(f"Unknown hook handler mode: {mode}")
         if event not in self._handlers:
             self._handlers[event] = []
-        self._handlers[event].append((priority, handler, owner))
-        self._handlers[event].sort(key=lambda x: x[0])
+        self._handlers[event].append(HookHandler(
+            handler=handler,
+            priority=priority,
+            owner=owner,
+            mode=mode,
+            timeout=timeout,
+            key=handler_key(handler, owner),
+            name=getattr(handler, "__qualname__", repr(handler)),
+        ))
+        self._handlers[event].sort(key=lambda x: x.priority)
 
         if owner:
             if event not in self._handler_owners:
                 self._handler_owners[event] = []
             self._handler_owners[event].append(owner)
 
-        logger.debug(f"Hook registered: {event} <- {handler.__name__} (owner={owner})")
+        logger.debug(f"Hook registered: {event} <- {handler.__name__} (owner={owner}, mode={mode})")
 
     def off(self, event: str, handler: Callable):
         """移除指定处理函数"""
         if event in self._handlers:
-            self._handlers[event] = [
-                (p, h, o) for p, h, o in self._handlers[event] if h != handler
-            ]
+            self._handlers[event] = [h for h in self._handlers[event] if h.handler != handler]
 
     def off_by_owner(self, owner: str):
         """移除指定插件的所有钩子"""
         for event in list(self._handlers.keys()):
-            self._handlers[event] = [
-                (p, h, o) for p, h, o in self._handlers[event] if o != owner
-            ]
+            self._handlers[event] = [h for h in self._handlers[event] if h.owner != owner]
         logger.debug(f"All hooks removed for plugin: {owner}")
 
-    async def emit(self, event: str, data: Dict[str, Any] = None) -> EventContext:
+    async def emit(
+        self,
+        event: str,
+        data: Dict[str, Any] = None,
+        only: Optional[Collection[str]] = None,
+        wait_background: bool = False,
+    ) -> EventContext:
         """
         触发事件。
 
         Args:
             event: 事件名称
             data: 事件数据
+            only: 只执行这些处理函数（handler_key），用于重试失败的处理函数
+            wait_background: background 处理函数也等待完成（按 concurrent 执行），
+                用于发件箱：事件在全部处理函数成功后才删除，数据所在的会话也在此之后关闭
 
         Returns:
-            EventContext（可检查 .cancelled 判断是否被拦截）
+            EventContext（可检查 .cancelled 判断是否被拦截，
+            .errors 为抛出异常、超时或被熔断跳过的处理函数，未等待的 background 处理函数不计入）
         """
         ctx = EventContext(event=event, data=data or {})
 
         handlers = self._handlers.get(event, [])
+        if only is not None:
+            handlers = [h for h in handlers if h.key in only]
         if not handlers:
             return ctx
 
         logger.debug(f"Emitting {event} to {len(handlers)} handler(s)")
 
-        for priority, handler, owner in handlers:
-            try:
-                result = await handler(ctx)
-                if result is not None:
-                    ctx.add_result(result)
-            except Exception as e:
-                logger.error(
-                    f"Hook error in {event} (handler={handler.__name__}, "
-                    f"plugin={owner}): {e}",
-                    exc_info=True,
-                )
-
-            if ctx.cancelled:
-                logger.info(
-                    f"Event {event} cancelled by {owner}: {ctx.cancel_reason}"
-                )
-                break
-
+        emit_start = time.perf_counter()
+        group: List[HookHandler] = []
+        deadline: Optional[_Deadline] = None
+        try:
+            for entry in handlers:
+                if entry.mode == MODE_BACKGROUND and not wait_background:
+                    self._spawn(ctx, entry)
+                    continue
+                if entry.mode != MODE_SEQUENTIAL:
+                    group.append(entry)
+                    continue
+                if group:
+                    await self._run_group(ctx, group)
+                    group = []
+                    if ctx.cancelled:
+                        break
+                if deadline is None:
+                    deadline = _Deadline()
+                await self._run(ctx, entry, deadline)
+                if ctx.cancelled:
+                    logger.info(
+                        f"Event {event} cancelled by {entry.owner}: {ctx.cancel_reason}"
+                    )
+                    break
+            else:
+                if group:
+                    await self._run_group(ctx, group)
+        finally:
+            if deadline is not None:
+                deadline.close()
+
+        metrics.hook_emit_duration.observe(time.perf_counter() - emit_start, event=event)
         return ctx
 
-    def get_handlers(self, event: str) -> List[tuple]:
+    async def _run_group(self, ctx: EventContext, group: List[HookHandler]):
+        """并发执行一组 concurrent 处理函数"""
+        if len(group) == 1:
+            await self._run(ctx, group[0])
+        else:
+            await asyncio.gather(*(self._run(ctx, entry) for entry in group))
+        if ctx.cancelled:
+            logger.info(f"Event {ctx.event} cancelled: {ctx.cancel_reason}")
+
+    def _spawn(self, ctx: EventContext, entry: HookHandler):
+        """在后台执行（任务集合持有引用，关闭时由 drain() 等待）"""
+        task = asyncio.create_task(self._run(ctx, entry))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _run(self, ctx: EventContext, entry: HookHandler, deadline: Optional[_Deadline] = None):
+        """执行单个处理函数：超时、熔断、耗时和异常统计（不向外抛出异常）"""
+        event = ctx.event
+        owner = entry.owner or "core"
+        if entry.open_until and not self._available(entry):
+            ctx.errors.append(entry.key)
+            metrics.hook_handler_skipped.inc(event=event, owner=owner)
+            return
+
+        timeout = entry.timeout if entry.timeout is not None else settings.hook_handler_timeout
+        handler_start = time.perf_counter()
+        try:
+            with (
+                tracer.span(f"hook.{event}", event=event, owner=owner, handler=entry.name, mode=entry.mode)
+                if tracer.enabled else _NO_SPAN
+            ):
+                if not timeout:
+                    result = await entry.handler(ctx)
+                elif deadline is not None:
+                    deadline.arm(handler_start, timeout)
+                    try:
+                        result = await entry.handler(ctx)
+                    finally:
+                        deadline.disarm()
+                else:
+                    async with asyncio.timeout(timeout):
+                        result = await entry.handler(ctx)
+            if result is not None:
+                ctx.add_result(result)
+        except asyncio.TimeoutError:
+            ctx.errors.append(entry.key)
+            metrics.hook_handler_errors.inc(event=event, owner=owner, reason="timeout")
+            logger.error(
+                f"Hook timeout in {event} (handler={entry.name}, plugin={entry.owner}): "
+                f"exceeded {timeout}s"
+            )
+            self._record(entry, ok=False)
+        except Exception as e:
+            ctx.errors.append(entry.key)
+            metrics.hook_handler_errors.inc(event=event, owner=owner, reason="error")
+            logger.error(
+                f"Hook error in {event} (handler={entry.name}, "
+                f"plugin={entry.owner}): {e}",
+                exc_info=True,
+            )
+            self._record(entry, ok=False)
+        else:
+            if entry.failures:
+                self._record(entry, ok=True)
+        finally:
+            metrics.hook_handler_duration.observe(
+                time.perf_counter() - handler_start, event=event, owner=owner, handler=entry.name,
+            )
+
+    # ============== 熔断 ==============
+
+    @staticmethod
+    def _available(entry: HookHandler) -> bool:
+        """熔断已到期：放行一次试探，试探期间的其他调用仍跳过"""
+        now = time.monotonic()
+        if now < entry.open_until:
+            return False
+        entry.open_until = now + settings.hook_breaker_cooldown
+        return True
+
+    @staticmethod
+    def _record(entry: HookHandler, ok: bool):
+        threshold = settings.hook_breaker_threshold
+        if ok:
+            if entry.open_until:
+                logger.info(f"Hook circuit closed: {entry.key}")
+            entry.failures = 0
+            entry.open_until = 0.0
+            return
+        entry.failures += 1
+        if threshold and entry.failures >= threshold:
+            if not entry.open_until:
+                logger.warning(
+                    f"Hook circuit opened: {entry.key} failed {entry.failures} times in a row, "
+                    f"skipped for {settings.hook_breaker_cooldown}s"
+                )
+            entry.open_until = time.monotonic() + settings.hook_breaker_cooldown
+
+    async def drain(self, timeout: float = 5.0):
+        """等待后台处理函数完成（应用关闭时调用），超时未完成的取消"""
+        if not self._background:
+            return
+        pending = set(self._background)
+        _, not_done = await asyncio.wait(pending, timeout=timeout)
+        for task in not_done:
+            task.cancel()
+        if not_done:
+            logger.warning(f"Cancelled {len(not_done)} background hook handler(s) on shutdown")
+
+    def get_handlers(self, event: str) -> List[HookHandler]:
         """获取某事件的所有处理函数（调试用）"""
         return self._handlers.get(event, [])
 
@@ -0,0 +1,173 @@
+"""
+插件 worker 进程
+
+由 isolation.PluginWorkerPool 启动：python -m app.plugins.worker
+标准输入 / 标准输出是与 API 进程通信的帧通道（见 ipc），插件的 print 输出改写到标准错误。
+
+请求：
+  - load：导入插件并调用 on_enable()，返回插件注册的钩子
+  - unload：调用 on_disable() 并移除钩子
+  - hook：执行指定的钩子处理函数
+  - call：调用插件方法（notify 插件的 send()、delivery 插件的 deliver()）
+每个请求在独立的任务中执行，阻塞或 CPU 密集的插件只拖慢本进程。
+"""
+
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from . import plugin_manager
+from .ipc import decode_data, pack_frame, read_frame
+from .sdk.base import PluginBase
+from .sdk.hooks import EventContext, HookHandler, handler_key, hooks
+
+logger = logging.getLogger("plugins.worker")
+
+
+## 允许远程调用的插件方法
+CALLABLE_METHODS = {"send", "deliver"}
+
+
+class PluginHost:
+    """worker 进程内的插件实例及其钩子"""
+
+    def __init__(self):
+        self._plugins: Dict[str, PluginBase] = {}
+        self._handlers: Dict[str, List[Tuple[str, HookHandler]]] = {}  # plugin_id -> [(event, 处理函数)]
+
+    async def load(self, plugin: str, path: str, config: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if plugin in self._plugins:
+            await self.unload(plugin)
+
+        plugin_dir = Path(path)
+        # 清除旧的模块缓存（插件更新后重新加载）
+        prefix = f"app.plugins.{plugin_dir.parent.name}.{plugin_dir.name}"
+        for key in list(sys.modules.keys()):
+            if key.startswith(prefix):
+                del sys.modules[key]
+
+        meta = plugin_manager._load_meta(plugin_dir / "plugin.json")
+        plugin_class = plugin_manager._load_class(plugin_dir, meta)
+        instance = plugin_class(meta, config)
+
+        before = self._registered()
+        await instance.on_enable()
+        # on_enable 中新注册的钩子（未指定 owner 的也计入该插件）
+        added = [(key[0], entry) for key, entry in self._registered().items() if key not in before]
+        self._plugins[plugin] = instance
+        self._handlers[plugin] = added
+
+        return [
+            {
+                "event": event,
+                "key": handler_key(entry.handler, plugin),
+                "name": entry.name,
+                "priority": entry.priority,
+                "mode": entry.mode,
+                "timeout": entry.timeout,
+            }
+            for event, entry in added
+        ]
+
+    @staticmethod
+    def _registered() -> Dict[tuple, HookHandler]:
+        return {
+            (event, id(entry)): entry
+            for event in hooks.get_all_events()
+            for entry in hooks.get_handlers(event)
+        }
+
+    async def unload(self, plugin: str):
+        instance = self._plugins.pop(plugin, None)
+        for event, entry in self._handlers.pop(plugin, []):
+            hooks.off(event, entry.handler)
+        hooks.off_by_owner(plugin)
+        if instance is not None:
+            await instance.on_disable()
+
+    async def hook(self, plugin: str, event: str, handler: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        for name, entry in self._handlers.get(plugin, []):
+            if name == event and handler_key(entry.handler, plugin) == handler:
+                break
+        else:
+            raise LookupError(f"Hook handler not found: {handler} ({event})")
+
+        ctx = EventContext(event=event, data=decode_data(data))
+        result = await entry.handler(ctx)
+        return {"cancelled": ctx.cancelled, "cancel_reason": ctx.cancel_reason, "result": result}
+
+    async def call(self, plugin: str, method: str, args: List[Any], kwargs: Dict[str, Any]) -> Any:
+        instance = self._plugins.get(plugin)
+        if instance is None:
+            raise LookupError(f"Plugin not loaded: {plugin}")
+        if method not in CALLABLE_METHODS or not hasattr(instance, method):
+            raise AttributeError(f"Plugin {plugin} has no callable method {method}")
+        return await getattr(instance, method)(*args, **kwargs)
+
+    async def shutdown(self):
+        for plugin in list(self._plugins):
+            try:
+                await self.unload(plugin)
+            except Exception as e:
+                logger.warning(f"Failed to unload plugin {plugin}: {e}")
+
+
+async def _handle(host: PluginHost, message: Dict[str, Any], writer: asyncio.StreamWriter):
+    op = message.pop("op")
+    request_id = message.pop("id")
+    try:
+        if op == "load":
+            result = await host.load(**message)
+        elif op == "unload":
+            result = await host.unload(**message)
+        elif op == "hook":
+            result = await host.hook(**message)
+        elif op == "call":
+            result = await host.call(**message)
+        else:
+            raise ValueError(f"Unknown op: {op}")
+        reply = {"id": request_id, "ok": True, "result": result}
+    except Exception as e:
+        logger.error(f"Plugin request {op} failed: {e}", exc_info=True)
+        reply = {"id": request_id, "ok": False, "error": f"{type(e).__name__}: {e}"}
+    writer.write(pack_frame(reply))
+
+
+async def main():
+    # 协议通道占用原标准输出，插件的 print 改写到标准错误
+    channel = os.fdopen(os.dup(sys.stdout.fileno()), "wb", buffering=0)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(loop=loop)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader, loop=loop), sys.stdin)
+    transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, channel)
+    writer = asyncio.StreamWriter(transport, protocol, None, loop)
+
+    host = PluginHost()
+    tasks = set()
+    logger.info(f"Plugin worker {os.getpid()} started")
+    try:
+        while True:
+            try:
+                message = await read_frame(reader)
+            except asyncio.IncompleteReadError:
+                # API 进程关闭了管道
+                break
+            task = asyncio.create_task(_handle(host, message, writer))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    finally:
+        await host.shutdown()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format=f"%(asctime)s [plugin-worker {os.getpid()}] %(levelname)s %(name)s: %(message)s",
+        stream=sys.stderr,
+    )
+    asyncio.run(main())
@@ -6,10 +6,14 @@ from .order import OrderService
 from .card import CardService
 from .user import UserService
 from .payment import PaymentService
+from .inventory import InventoryService
+from .idempotency import IdempotencyService
 
 __all__ = [
     "OrderService",
     "CardService",
     "UserService",
     "PaymentService",
+    "InventoryService",
+    "IdempotencyService",
 ]
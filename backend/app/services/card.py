@@ -9,6 +9,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models import Card, Commodity
 from ..core.exceptions import ValidationError, NotFoundError
+from .inventory import InventoryService
 
 
 class CardService:
@@ -81,6 +82,7 @@ class CardService:
             self.db.add(card)
         
         await self.db.flush()
+        await InventoryService(self.db).cards_added(commodity_id, race, len(new_cards))
         
         return {
             "count": len(new_cards),
@@ -92,19 +94,8 @@ class CardService:
         commodity_id: int,
         race: Optional[str] = None,
     ) -> int:
-        """获取库存数量"""
-        query = (
-            select(func.count())
-            .select_from(Card)
-            .where(Card.commodity_id == commodity_id)
-            .where(Card.status == 0)
-        )
-        
-        if race:
-            query = query.where(Card.race == race)
-        
-        result = await self.db.execute(query)
-        return result.scalar()
+        """获取库存数量（读取物化计数器）"""
+        return await InventoryService(self.db).get_stock(commodity_id, race)
     
     async def get_draft_cards(
         self,
@@ -175,7 +166,11 @@ class CardService:
             card.draft = draft
         if draft_premium is not None:
             card.draft_premium = draft_premium
-        if race is not None:
+        if race is not None and race != card.race:
+            await InventoryService(self.db).track_cards([
+                (card.commodity_id, card.race, card.status, None),
+                (card.commodity_id, race, None, card.status),
+            ])
             card.race = race
         if note is not None:
             card.note = note
@@ -191,8 +186,13 @@ class CardService:
             delete(Card)
             .where(Card.id.in_(card_ids))
             .where(Card.status == 0)
+            .returning(Card.commodity_id, Card.race)
         )
-        return result.rowcount
+        rows = result.all()
+        await InventoryService(self.db).track_cards(
+            (commodity_id, race, 0, None) for commodity_id, race in rows
+        )
+        return len(rows)
     
     async def clear_unsold(
         self,
@@ -209,5 +209,9 @@ class CardService:
         if race:
             query = query.where(Card.race == race)
         
-        result = await self.db.execute(query)
-        return result.rowcount
+        result = await self.db.execute(query.returning(Card.race))
+        races = result.scalars().all()
+        await InventoryService(self.db).track_cards(
+            (commodity_id, r, 0, None) for r in races
+        )
+        return len(races)
@@ -0,0 +1,280 @@
+"""
+商城商品搜索
+进程内倒排索引，覆盖主站在售商品（上架、未隐藏、非分站）的名称、分类名和描述。
+
+分词：文本统一做 NFKC 归一化并转小写，按空白和标点切分为片段；
+每个片段建立单字和相邻二字（bigram）索引，中文无需词典即可检索任意子串。
+
+查询：关键词片段的 bigram 求交得到候选，再逐个校验片段确实出现在某个字段中
+（排除 bigram 拼凑出的误匹配），按命中字段权重打分排序。搜索和联想均不访问数据库；
+索引只保存过滤和排序所需字段，商品列表的价格、库存等由调用方按 id 从数据库读取。
+
+同步：后台任务定期比对商品版本（updated_at、分类名、上下架状态），只重建
+发生变化的商品；多 worker 部署时各进程独立同步。
+"""
+
+import asyncio
+import logging
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Optional, Dict, List, Set, Tuple, Any
+
+from sqlalchemy import select
+
+from ..config import settings
+from ..database import async_session_maker
+from ..models import Commodity, Category
+
+logger = logging.getLogger("services.catalog_search")
+
+
+# 字段位与打分权重
+FIELD_NAME = 1
+FIELD_CATEGORY = 2
+FIELD_DESCRIPTION = 4
+FIELD_WEIGHTS = {FIELD_NAME: 10.0, FIELD_CATEGORY: 4.0, FIELD_DESCRIPTION: 1.0}
+
+## 每次从数据库加载的变更商品数
+_LOAD_CHUNK = 500
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPLIT_RE = re.compile(r"[\W_]+")
+
+
+def normalize(text: Optional[str]) -> str:
+    """归一化：全角转半角、转小写、合并空白"""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return " ".join(text.split())
+
+
+def segments(text: str) -> List[str]:
+    """按空白和标点切分为片段"""
+    return [s for s in _SPLIT_RE.split(normalize(text)) if s]
+
+
+def index_terms(segment: str) -> Set[str]:
+    """建索引用的词项：单字 + 相邻二字"""
+    terms = set(segment)
+    terms.update(segment[i:i + 2] for i in range(len(segment) - 1))
+    return terms
+
+
+def query_terms(segment: str) -> Set[str]:
+    """查询用的词项：单字片段查单字，否则查全部二字"""
+    if len(segment) == 1:
+        return {segment}
+    return {segment[i:i + 2] for i in range(len(segment) - 1)}
+
+
+@dataclass
+class CatalogDoc:
+    """索引中的商品（名称及过滤、排序所需字段）"""
+    id: int
+    name: str
+    category_id: int
+    recommend: int
+    sort: int
+    ## 归一化后的字段文本 {字段位: 文本}
+    texts: Dict[int, str] = field(default_factory=dict)
+
+    def score(self, segs: List[str], phrase: str) -> float:
+        """所有片段都命中时返回得分，否则返回 0"""
+        total = 0.0
+        for seg in segs:
+            best = max(
+                (FIELD_WEIGHTS[f] for f, text in self.texts.items() if seg in text),
+                default=0.0,
+            )
+            if not best:
+                return 0.0
+            total += best
+        name = self.texts.get(FIELD_NAME, "")
+        if name == phrase:
+            total += 20.0
+        elif name.startswith(phrase):
+            total += 8.0
+        elif phrase in name:
+            total += 4.0
+        return total
+
+
+class CatalogSearchIndex:
+    """商品搜索索引"""
+
+    def __init__(self):
+        self._docs: Dict[int, CatalogDoc] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}  # 词项 -> {商品ID: 字段位}
+        self._versions: Dict[int, Tuple[Any, ...]] = {}
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.ready = False
+
+    # ============== 查询 ==============
+
+    def search(
+        self,
+        keywords: str,
+        category_id: Optional[int] = None,
+        recommend: Optional[int] = None,
+    ) -> List[CatalogDoc]:
+        """按相关度排序返回命中的商品（同分按商品排序值、ID）"""
+        segs = segments(keywords)
+        if not segs:
+            return []
+
+        terms: Set[str] = set()
+        for seg in segs:
+            terms |= query_terms(seg)
+        postings = []
+        for term in terms:
+            posting = self._postings.get(term)
+            if not posting:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting.keys())
+            if not candidates:
+                return []
+
+        phrase = " ".join(segs)
+        scored = []
+        for doc_id in candidates:
+            doc = self._docs[doc_id]
+            if category_id and doc.category_id != category_id:
+                continue
+            if recommend == 1 and doc.recommend != 1:
+                continue
+            score = doc.score(segs, phrase)
+            if score:
+                scored.append((score, doc))
+
+        scored.sort(key=lambda x: (-x[0], x[1].sort, -x[1].id))
+        return [doc for _, doc in scored]
+
+    def suggest(self, keywords: str, limit: int = 8) -> List[Dict[str, Any]]:
+        """搜索联想：返回最相关的商品名称"""
+        return [
+            {"id": doc.id, "name": doc.name}
+            for doc in self.search(keywords)[:limit]
+        ]
+
+    # ============== 维护 ==============
+
+    def _add(self, doc: CatalogDoc):
+        self._docs[doc.id] = doc
+        for field_bit, text in doc.texts.items():
+            for seg in segments(text):
+                for term in index_terms(seg):
+                    posting = self._postings.setdefault(term, {})
+                    posting[doc.id] = posting.get(doc.id, 0) | field_bit
+
+    def _remove(self, doc_id: int):
+        doc = self._docs.pop(doc_id, None)
+        if doc is None:
+            return
+        for text in doc.texts.values():
+            for seg in segments(text):
+                for term in index_terms(seg):
+                    posting = self._postings.get(term)
+                    if posting is None:
+                        continue
+                    posting.pop(doc_id, None)
+                    if not posting:
+                        del self._postings[term]
+
+    @staticmethod
+    def _build_doc(commodity: Commodity, category_name: Optional[str]) -> CatalogDoc:
+        description = _TAG_RE.sub(" ", commodity.description or "")
+        texts = {
+            FIELD_NAME: normalize(commodity.name),
+            FIELD_CATEGORY: normalize(category_name),
+            FIELD_DESCRIPTION: normalize(description),
+        }
+        return CatalogDoc(
+            id=commodity.id,
+            name=commodity.name,
+            category_id=commodity.category_id,
+            recommend=commodity.recommend,
+            sort=commodity.sort,
+            texts={k: v for k, v in texts.items() if v},
+        )
+
+    async def sync(self) -> int:
+        """
+        与数据库同步：新增、下架、修改过的商品重建索引，其余不动。
+
+        Returns:
+            本次重建/移除的商品数
+        """
+        async with self._lock:
+            async with async_session_maker() as db:
+                categories = dict((await db.execute(
+                    select(Category.id, Category.name)
+                )).all())
+                rows = (await db.execute(
+                    select(Commodity.id, Commodity.category_id, Commodity.updated_at)
+                    .where(Commodity.status == 1)
+                    .where(Commodity.hide == 0)
+                    .where(Commodity.owner_id.is_(None))
+                )).all()
+
+                wanted = {
+                    r.id: (r.updated_at, r.category_id, categories.get(r.category_id))
+                    for r in rows
+                }
+                removed = set(self._versions) - set(wanted)
+                changed = [i for i, v in wanted.items() if self._versions.get(i) != v]
+
+                loaded: List[Commodity] = []
+                for start in range(0, len(changed), _LOAD_CHUNK):
+                    result = await db.execute(
+                        select(Commodity).where(
+                            Commodity.id.in_(changed[start:start + _LOAD_CHUNK])
+                        )
+                    )
+                    loaded.extend(result.scalars().all())
+
+            for doc_id in removed:
+                self._remove(doc_id)
+                self._versions.pop(doc_id, None)
+            for commodity in loaded:
+                self._remove(commodity.id)
+                self._add(self._build_doc(commodity, categories.get(commodity.category_id)))
+                self._versions[commodity.id] = wanted[commodity.id]
+
+            self.ready = True
+            return len(removed) + len(loaded)
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(settings.search_sync_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning(f"Catalog search sync failed: {e}")
+
+    async def start(self):
+        """构建索引并启动后台同步（应用启动时调用）"""
+        try:
+            count = await self.sync()
+            logger.info(f"Catalog search index built: {count} commodities")
+        except Exception as e:
+            logger.warning(f"Catalog search index build failed: {e}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self):
+        """停止后台同步"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+# 全局单例
+catalog_search = CatalogSearchIndex()
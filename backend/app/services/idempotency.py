@@ -0,0 +1,244 @@
+"""
+下单幂等
+
+客户端通过 Idempotency-Key 请求头（或请求体 request_no）为一次下单指定唯一键，
+超时重试时返回第一次的创建结果，而不是再创建一笔订单、再调用一次支付接口。
+
+流程：
+  1. Redis 中已有该键的结果：直接返回（不再计价、不触发钩子、不调用支付）
+  2. 否则抢占处理锁（SET NX）；抢不到说明同一请求正在处理，轮询等待其结果
+  3. 抢到锁后先查库（Redis 结果过期后的重试），没有再真正下单，
+     结果写入 Redis 并释放锁
+Redis 不可用时直接查库；并发的重复请求（包括处理超过锁有效期后的重试）
+由 orders.request_no 的 UNIQUE 约束拦截，落败的请求返回已存在订单的结果。
+
+键按用户隔离（游客共用一个命名空间），并记录请求参数摘要（Redis 结果和 orders.request_digest）：
+同一个键携带不同参数重放时返回 409。摘要以 secret_key 为密钥做 HMAC，
+Redis 中保存的摘要无法用来穷举订单查询密码等字段。
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..core import cache, metrics
+from ..core.exceptions import ConflictError, ValidationError
+from ..models import Order, User
+
+logger = logging.getLogger("services.idempotency")
+
+
+## 幂等键的最大长度（存入 orders.request_no 时会加上用户前缀）
+MAX_KEY_LENGTH = 48
+
+## 等待并发请求结果时的轮询间隔（秒）
+_POLL_INTERVAL = 0.05
+
+_RESULT_KEY = f"{cache.KEY_PREFIX}:idem:result:{{}}"
+_LOCK_KEY = f"{cache.KEY_PREFIX}:idem:lock:{{}}"
+
+## 参与参数摘要的下单字段
+_FINGERPRINT_FIELDS = (
+    "commodity_id", "quantity", "payment_id", "contact", "password",
+    "race", "card_id", "coupon_code", "widget",
+)
+
+
+def scoped_request_no(key: str, user: Optional[User]) -> str:
+    """校验幂等键并加上用户前缀（写入 orders.request_no）"""
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH or not key.isascii() or not key.isprintable():
+        raise ValidationError(f"Idempotency-Key 必须为 1-{MAX_KEY_LENGTH} 个可打印 ASCII 字符")
+    return f"{user.id if user else 'g'}:{key}"
+
+
+def fingerprint(params: Dict[str, Any]) -> str:
+    """下单参数摘要（HMAC-SHA256）"""
+    subset = {name: params.get(name) for name in _FINGERPRINT_FIELDS}
+    raw = json.dumps(subset, sort_keys=True, ensure_ascii=False, default=str)
+    return hmac.new(settings.secret_key.encode("utf-8"), raw.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def _order_result(order: Order, user: Optional[User]) -> Dict[str, Any]:
+    """由已存在的订单重建下单结果（与 OrderService.create_order 的返回结构一致）"""
+    return {
+        "trade_no": order.trade_no,
+        "amount": float(order.amount),
+        "status": order.status,
+        "payment_url": order.pay_url,
+        "payment_type": order.pay_type,
+        "extra": json.loads(order.pay_extra) if order.pay_extra else {},
+        "secret": order.secret if user and order.status == 1 else None,
+    }
+
+
+class IdempotencyService:
+    """按幂等键去重的下单"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_order(
+        self,
+        key: str,
+        user: Optional[User],
+        params: Dict[str, Any],
+        create: Callable[[str, str], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """
+        幂等地创建订单。
+
+        Args:
+            key: 客户端提供的幂等键
+            user: 当前用户（游客为 None）
+            params: 下单参数（用于参数摘要和结果比对）
+            create: 真正下单的回调，参数为写入订单的 request_no 和参数摘要
+        """
+        request_no = scoped_request_no(key, user)
+        digest = fingerprint(params)
+        redis = cache.get_redis()
+        if redis is None:
+            return await self._create_in_db(request_no, digest, user, params, create)
+
+        token = uuid.uuid4().hex
+        try:
+            replay = await self._cached(redis, request_no, digest)
+            if replay is not None:
+                metrics.idempotent_requests.inc(result="replay")
+                return replay
+
+            acquired = await redis.set(
+                _LOCK_KEY.format(request_no), token, nx=True, ex=settings.idempotency_lock_ttl,
+            )
+            if not acquired:
+                result = await self._wait(redis, request_no, digest, token)
+                if result is not None:
+                    metrics.idempotent_requests.inc(result="waited")
+                    return result
+        except (ConflictError, ValidationError):
+            raise
+        except Exception as e:
+            logger.warning(f"Idempotency store unavailable, falling back to database: {e}")
+            return await self._create_in_db(request_no, digest, user, params, create)
+
+        # 持有处理锁（首个请求处理超过锁有效期时，重试也可能走到这里，由 UNIQUE 约束兜底）
+        try:
+            result = await self._create_in_db(request_no, digest, user, params, create)
+            await self._store(redis, request_no, digest, result)
+            return result
+        finally:
+            await self._release(redis, request_no, token)
+
+    # ============== Redis ==============
+
+    @staticmethod
+    async def _cached(redis, request_no: str, digest: str) -> Optional[Dict[str, Any]]:
+        raw = await redis.get(_RESULT_KEY.format(request_no))
+        if raw is None:
+            return None
+        stored = json.loads(raw)
+        if stored["fingerprint"] != digest:
+            metrics.idempotent_requests.inc(result="conflict")
+            raise ConflictError("Idempotency-Key 已用于参数不同的请求")
+        return stored["result"]
+
+    async def _wait(self, redis, request_no: str, digest: str, token: str) -> Optional[Dict[str, Any]]:
+        """
+        等待正在处理的同一请求。
+
+        返回其结果；若对方失败（锁释放但没有结果），抢占锁后返回 None 由当前请求处理。
+        """
+        deadline = time.monotonic() + settings.idempotency_lock_ttl
+        while time.monotonic() < deadline:
+            await asyncio.sleep(_POLL_INTERVAL)
+            result = await self._cached(redis, request_no, digest)
+            if result is not None:
+                return result
+            if await redis.set(
+                _LOCK_KEY.format(request_no), token, nx=True, ex=settings.idempotency_lock_ttl,
+            ):
+                return None
+        metrics.idempotent_requests.inc(result="conflict")
+        raise ConflictError("相同的请求正在处理中，请稍后重试")
+
+    @staticmethod
+    async def _store(redis, request_no: str, digest: str, result: Dict[str, Any]):
+        try:
+            await redis.set(
+                _RESULT_KEY.format(request_no),
+                json.dumps({"fingerprint": digest, "result": result}, ensure_ascii=False, default=str),
+                ex=settings.idempotency_ttl,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to store idempotent result for {request_no}: {e}")
+
+    @staticmethod
+    async def _release(redis, request_no: str, token: str):
+        try:
+            key = _LOCK_KEY.format(request_no)
+            if await redis.get(key) == token:
+                await redis.delete(key)
+        except Exception:
+            pass
+
+    # ============== 数据库 ==============
+
+    async def _existing(
+        self, request_no: str, digest: str, user: Optional[User], params: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """按 request_no 查已创建的订单，参数不一致时返回 409"""
+        result = await self.db.execute(select(Order).where(Order.request_no == request_no))
+        order = result.scalar_one_or_none()
+        if order is None:
+            return None
+        if order.request_digest is not None:
+            changed = not hmac.compare_digest(order.request_digest, digest)
+        else:
+            # 没有记录摘要的旧订单只能比对订单上的明文字段
+            changed = (
+                order.commodity_id != params.get("commodity_id")
+                or order.quantity != params.get("quantity")
+                or order.payment_id != params.get("payment_id")
+                or order.contact != params.get("contact")
+            )
+        if changed:
+            metrics.idempotent_requests.inc(result="conflict")
+            raise ConflictError("Idempotency-Key 已用于参数不同的请求")
+        return _order_result(order, user)
+
+    async def _create_in_db(
+        self,
+        request_no: str,
+        digest: str,
+        user: Optional[User],
+        params: Dict[str, Any],
+        create: Callable[[str, str], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """由 request_no 的 UNIQUE 约束保证只创建一笔订单（没有 Redis 或处理锁已过期时）"""
+        existing = await self._existing(request_no, digest, user, params)
+        if existing is not None:
+            metrics.idempotent_requests.inc(result="replay")
+            return existing
+        try:
+            result = await create(request_no, digest)
+        except IntegrityError as e:
+            if "request_no" not in str(e.orig):
+                raise
+            # 并发的同一请求先写入了订单
+            existing = await self._existing(request_no, digest, user, params)
+            if existing is None:
+                raise
+            metrics.idempotent_requests.inc(result="waited")
+            return existing
+        metrics.idempotent_requests.inc(result="new")
+        return result
@@ -0,0 +1,254 @@
+"""
+库存计数服务
+维护 inventory_counters 表，并为所有库存/销量读取提供统一入口。
+
+计数器与卡密、订单的变更在同一事务内更新（原子 UPSERT 增量），
+读取时直接取物化值，不再对 cards / orders 做 COUNT(*)。
+每个 (商品, 种类) 的计数分散在多个分片行上（事务内固定一个分片），读取时求和。
+计数出现偏差时可用 rebuild() 或命令行重建：
+
+    python -m app.tools.rebuild_inventory [--commodity-id ID]
+"""
+
+import random
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+from sqlalchemy import select, func, delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..models import Card, Order, InventoryCounter
+
+
+# 卡密状态 -> 计数列
+CARD_STATUS_COLUMNS = {0: "stock", 1: "sold", 2: "locked", 3: "reserved"}
+
+# (commodity_id, race, 原状态, 新状态)；状态为 None 表示卡密不存在（新增/删除）
+CardChange = Tuple[int, Optional[str], Optional[int], Optional[int]]
+
+
+class InventoryService:
+    """库存计数服务"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    # ============== 写入 ==============
+
+    def _shard(self) -> int:
+        """
+        当前会话写入的计数分片。
+
+        同一会话（请求）内固定，一个事务只锁每个 (商品, 种类) 的一行，
+        加锁顺序与不分片时相同，不会因分片引入死锁。
+        """
+        shards = settings.inventory_counter_shards
+        if shards <= 1:
+            return 0
+        return self.db.info.setdefault("inventory_counter_shard", random.randrange(shards))
+
+    async def adjust(self, commodity_id: int, race: Optional[str] = None, **deltas: int):
+        """原子增减单个计数器行（不存在时创建）"""
+        deltas = {k: v for k, v in deltas.items() if v}
+        if not deltas:
+            return
+
+        dialect = self.db.bind.dialect.name
+        table = InventoryCounter.__table__
+        values = {"commodity_id": commodity_id, "race": race or "", "shard": self._shard(), **deltas}
+
+        if dialect == "mysql":
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+            stmt = mysql_insert(table).values(**values)
+            stmt = stmt.on_duplicate_key_update(
+                **{k: table.c[k] + stmt.inserted[k] for k in deltas},
+                updated_at=func.now(),
+            )
+        else:
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as upsert_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as upsert_insert
+            stmt = upsert_insert(table).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["commodity_id", "race", "shard"],
+                set_={
+                    **{k: table.c[k] + stmt.excluded[k] for k in deltas},
+                    "updated_at": func.now(),
+                },
+            )
+
+        await self.db.execute(stmt)
+
+    async def track_cards(self, changes: Iterable[CardChange]):
+        """
+        记录一批卡密变更（导入、售出、删除、锁定、解锁、预占、改种类）。
+
+        同一 (商品, 种类) 的变更先在内存合并，按键排序后逐行更新，
+        保证并发事务的加锁顺序一致。
+        """
+        merged: Dict[Tuple[int, str], Dict[str, int]] = {}
+        for commodity_id, race, old_status, new_status in changes:
+            row = merged.setdefault((commodity_id, race or ""), {})
+            if old_status in CARD_STATUS_COLUMNS:
+                col = CARD_STATUS_COLUMNS[old_status]
+                row[col] = row.get(col, 0) - 1
+            if new_status in CARD_STATUS_COLUMNS:
+                col = CARD_STATUS_COLUMNS[new_status]
+                row[col] = row.get(col, 0) + 1
+
+        for (commodity_id, race), deltas in sorted(merged.items()):
+            await self.adjust(commodity_id, race, **deltas)
+
+    async def cards_added(self, commodity_id: int, race: Optional[str], count: int):
+        """新导入待售卡密"""
+        await self.adjust(commodity_id, race, stock=count)
+
+    async def cards_sold(self, commodity_id: int, race: Optional[str], count: int):
+        """待售卡密售出"""
+        await self.adjust(commodity_id, race, stock=-count, sold=count)
+
+    async def order_paid(self, order: Order):
+        """订单支付成功，销量 +1"""
+        await self.adjust(order.commodity_id, order.race, sold_orders=1)
+
+    async def order_refunded(self, order: Order):
+        """已支付订单退款，销量 -1"""
+        await self.adjust(order.commodity_id, order.race, sold_orders=-1)
+
+    # ============== 读取 ==============
+
+    async def get_stock(self, commodity_id: int, race: Optional[str] = None) -> int:
+        """待售卡密数（指定种类时只统计该种类）"""
+        query = (
+            select(func.coalesce(func.sum(InventoryCounter.stock), 0))
+            .where(InventoryCounter.commodity_id == commodity_id)
+        )
+        if race:
+            query = query.where(InventoryCounter.race == race)
+        result = await self.db.execute(query)
+        return int(result.scalar() or 0)
+
+    async def get_sold(self, commodity_id: int) -> int:
+        """已支付订单数"""
+        result = await self.db.execute(
+            select(func.coalesce(func.sum(InventoryCounter.sold_orders), 0))
+            .where(InventoryCounter.commodity_id == commodity_id)
+        )
+        return int(result.scalar() or 0)
+
+    async def get_stock_map(self, commodity_ids: List[int]) -> Dict[int, int]:
+        """批量获取待售卡密数"""
+        return await self._sum_map(InventoryCounter.stock, commodity_ids)
+
+    async def get_sold_map(self, commodity_ids: List[int]) -> Dict[int, int]:
+        """批量获取已支付订单数"""
+        return await self._sum_map(InventoryCounter.sold_orders, commodity_ids)
+
+    async def _sum_map(self, column, commodity_ids: List[int]) -> Dict[int, int]:
+        if not commodity_ids:
+            return {}
+        result = await self.db.execute(
+            select(InventoryCounter.commodity_id, func.sum(column))
+            .where(InventoryCounter.commodity_id.in_(commodity_ids))
+            .group_by(InventoryCounter.commodity_id)
+        )
+        return {row[0]: int(row[1] or 0) for row in result.all()}
+
+    async def get_totals(self) -> Dict[str, int]:
+        """全站卡密汇总（仪表盘）"""
+        result = await self.db.execute(
+            select(
+                func.coalesce(func.sum(InventoryCounter.stock), 0),
+                func.coalesce(func.sum(InventoryCounter.sold), 0),
+                func.coalesce(func.sum(InventoryCounter.locked), 0),
+                func.coalesce(func.sum(InventoryCounter.reserved), 0),
+            )
+        )
+        stock, sold, locked, reserved = result.one()
+        return {
+            "stock": int(stock), "sold": int(sold),
+            "locked": int(locked), "reserved": int(reserved),
+        }
+
+    # ============== 重建 ==============
+
+    async def rebuild(self, commodity_id: Optional[int] = None) -> int:
+        """
+        从 cards / orders 全量重建计数器。
+
+        PostgreSQL 下先对计数表加 EXCLUSIVE 锁：并发的卡密/订单事务会在
+        更新计数器时等待本事务提交，之后再叠加各自的增量，结果保持一致。
+
+        Returns:
+            重建的计数器行数
+        """
+        if self.db.bind.dialect.name == "postgresql":
+            await self.db.execute(
+                text("LOCK TABLE inventory_counters IN EXCLUSIVE MODE")
+            )
+
+        clear = delete(InventoryCounter)
+        card_query = (
+            select(
+                Card.commodity_id,
+                func.coalesce(Card.race, ""),
+                Card.status,
+                func.count(),
+            )
+            .group_by(Card.commodity_id, func.coalesce(Card.race, ""), Card.status)
+        )
+        order_query = (
+            select(
+                Order.commodity_id,
+                func.coalesce(Order.race, ""),
+                func.count(),
+            )
+            .where(Order.status == 1)
+            .group_by(Order.commodity_id, func.coalesce(Order.race, ""))
+        )
+        if commodity_id is not None:
+            clear = clear.where(InventoryCounter.commodity_id == commodity_id)
+            card_query = card_query.where(Card.commodity_id == commodity_id)
+            order_query = order_query.where(Order.commodity_id == commodity_id)
+
+        rows: Dict[Tuple[int, str], Dict[str, Any]] = {}
+
+        def _row(cid: int, race: str) -> Dict[str, Any]:
+            return rows.setdefault((cid, race), {
+                "commodity_id": cid, "race": race,
+                "stock": 0, "locked": 0, "reserved": 0, "sold": 0, "sold_orders": 0,
+            })
+
+        for cid, race, status, count in (await self.db.execute(card_query)).all():
+            col = CARD_STATUS_COLUMNS.get(status)
+            if col:
+                _row(cid, race)[col] += count
+        for cid, race, count in (await self.db.execute(order_query)).all():
+            _row(cid, race)["sold_orders"] += count
+
+        await self.db.execute(clear)
+        if rows:
+            await self.db.execute(
+                InventoryCounter.__table__.insert(), list(rows.values())
+            )
+        return len(rows)
+
+    async def ensure_initialized(self) -> bool:
+        """
+        计数表为空但已有卡密/订单时（升级后首次启动），自动全量重建。
+
+        Returns:
+            是否执行了重建
+        """
+        has_counters = await self.db.execute(select(InventoryCounter.id).limit(1))
+        if has_counters.scalar_one_or_none():
+            return False
+        has_data = await self.db.execute(select(Card.id).limit(1))
+        if not has_data.scalar_one_or_none():
+            has_data = await self.db.execute(
+                select(Order.id).where(Order.status == 1).limit(1)
+            )
+            if not has_data.scalar_one_or_none():
+                return False
+        await self.rebuild()
+        return True
@@ -11,23 +11,35 @@ import logging
 from datetime import datetime
 from decimal import Decimal, ROUND_HALF_UP
 from typing import Optional, Dict, Any, List
-from sqlalchemy import select, func
+from sqlalchemy import select, func, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models import (
     Order, Commodity, Card, User, PaymentMethod,
     Coupon, Bill, UserGroup
 )
+from ..models.card import random_shuffle_key
 from ..core.exceptions import (
     ValidationError, NotFoundError, StockError,
     PaymentError, InsufficientBalanceError
 )
-from ..core.security import generate_trade_no
+from ..core.trade_no import generate_trade_no
+from ..core import metrics
+from ..core.tracing import tracer
 from ..plugins.sdk.hooks import hooks, Events
+from . import outbox
 from ..plugins.sdk.payment_base import PaymentPluginBase
+from .inventory import InventoryService
+from . import reservation
+from .reservation import ReservationService
+from .pricing import get_pricing_plan
 
 logger = logging.getLogger("services.order")
 
+## 订单号违反 UNIQUE 约束时的最多尝试次数
+TRADE_NO_ATTEMPTS = 3
+
 
 class OrderService:
     """订单服务"""
@@ -73,16 +85,8 @@ class OrderService:
             if discount > 0:
                 unit_price = unit_price * (Decimal("1") - discount)
         
-        # 解析商品配置中的种类定价和批发规则
-        if commodity.config and race:
-            unit_price = self._apply_config_pricing(
-                commodity.config, unit_price, race, quantity
-            )
-        else:
-            # 无种类维度时，应用全局批发规则（新字段优先，旧配置兼容）
-            unit_price = self._apply_global_wholesale_pricing(
-                commodity, unit_price, quantity
-            )
+        # 种类定价和批发规则（使用编译缓存的定价方案，不再逐次解析配置）
+        unit_price = get_pricing_plan(commodity).unit_price(unit_price, quantity, race)
         
         amount = unit_price * quantity
         draft_premium = Decimal("0")
@@ -116,142 +120,7 @@ class OrderService:
             "draft_premium": draft_premium,
         }
     
-    @staticmethod
-    def _apply_config_pricing(
-        config_text: str,
-        base_price: Decimal,
-        race: str,
-        quantity: int,
-    ) -> Decimal:
-        """
-        解析商品 config 中的种类定价和批发规则。
-        
-        格式：
-            [category]
-            种类A=10.00
-            
-            [category_wholesale]
-            种类A.10=9.00        # 买10件及以上，单价9.00
-            种类A.50=80%         # 买50件及以上，打八折
-        """
-        category_price = base_price
-        wholesale_rules = []
-        
-        current_section = None
-        for line in config_text.strip().split("\n"):
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            if line.startswith("[") and line.endswith("]"):
-                current_section = line[1:-1].lower()
-            elif "=" in line and current_section:
-                key, value = line.split("=", 1)
-                key, value = key.strip(), value.strip()
-                
-                if current_section == "category" and key == race:
-                    try:
-                        category_price = Decimal(value)
-                    except Exception:
-                        pass
-                        
-                elif current_section == "category_wholesale" and "." in key:
-                    cat_name, qty_str = key.split(".", 1)
-                    if cat_name == race:
-                        try:
-                            qty = int(qty_str)
-                            if value.endswith("%"):
-                                wholesale_rules.append(
-                                    (qty, "percent", Decimal(value[:-1]))
-                                )
-                            else:
-                                wholesale_rules.append(
-                                    (qty, "fixed", Decimal(value))
-                                )
-                        except (ValueError, Exception):
-                            pass
-        
-        # 应用批发规则（取最大匹配数量的规则）
-        unit_price = category_price
-        if wholesale_rules:
-            wholesale_rules.sort(key=lambda x: x[0])
-            for min_qty, rule_type, rule_val in wholesale_rules:
-                if quantity >= min_qty:
-                    if rule_type == "percent":
-                        unit_price = category_price * rule_val / Decimal("100")
-                    else:
-                        unit_price = rule_val
-        
-        return unit_price
-
-    @staticmethod
-    def _apply_global_wholesale_pricing(
-        commodity: Commodity,
-        base_price: Decimal,
-        quantity: int,
-    ) -> Decimal:
-        """应用全局批发规则（wholesale_config 优先，config[wholesale] 兜底）。"""
-        rules: List[tuple[int, str, Decimal]] = []
-
-        # 1) 新字段: wholesale_config(JSON)
-        if commodity.wholesale_config:
-            try:
-                config_items = json_lib.loads(commodity.wholesale_config)
-                if isinstance(config_items, list):
-                    for item in config_items:
-                        if not isinstance(item, dict):
-                            continue
-                        qty = int(item.get("quantity", 0))
-                        if qty <= 0:
-                            continue
-                        if item.get("type") == "percent" or item.get("discount_percent") is not None:
-                            discount_percent = item.get("discount_percent")
-                            if discount_percent is None:
-                                continue
-                            rules.append((qty, "percent", Decimal(str(discount_percent))))
-                        elif item.get("price") is not None:
-                            rules.append((qty, "fixed", Decimal(str(item.get("price")))))
-            except Exception:
-                rules = []
-
-        # 2) 兼容旧字段: config 中的 [wholesale]（仅在新字段无有效规则时）
-        if not rules and commodity.config:
-            current_section = None
-            for line in commodity.config.strip().split("\n"):
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
-                if line.startswith("[") and line.endswith("]"):
-                    current_section = line[1:-1].lower()
-                    continue
-                if current_section != "wholesale" or "=" not in line:
-                    continue
-
-                key, value = line.split("=", 1)
-                key = key.strip()
-                value = value.strip()
-                try:
-                    qty = int(key)
-                    if qty <= 0:
-                        continue
-                    if value.endswith("%"):
-                        rules.append((qty, "percent", Decimal(value[:-1])))
-                    else:
-                        rules.append((qty, "fixed", Decimal(value)))
-                except Exception:
-                    continue
-
-        unit_price = base_price
-        if rules:
-            rules.sort(key=lambda x: x[0])
-            for min_qty, rule_type, rule_val in rules:
-                if quantity >= min_qty:
-                    if rule_type == "percent":
-                        unit_price = base_price * rule_val / Decimal("100")
-                    else:
-                        unit_price = rule_val
-
-        return unit_price
-    
+    @tracer.traced("order.create_order")
     async def create_order(
         self,
         commodity_id: int,
@@ -268,10 +137,16 @@ class OrderService:
         device: int = 0,
         callback_url: str = "",
         return_url: str = "",
+        request_no: Optional[str] = None,
+        request_digest: Optional[str] = None,
     ) -> Dict[str, Any]:
         """
         创建订单（统一入口）。
         
+        request_no 为幂等键（见 services.idempotency），写入 orders.request_no，
+        由 UNIQUE 约束保证同一个键只创建一笔订单；request_digest 为请求参数摘要，
+        重放时据此判断参数是否一致。
+        
         Returns:
             {
                 "trade_no": 订单号,
@@ -283,30 +158,43 @@ class OrderService:
                 "secret": 卡密(余额支付时),
             }
         """
+        tracer.current().set_attributes(
+            commodity_id=commodity_id, quantity=quantity, payment_id=payment_id,
+            user_id=user.id if user else None, race=race,
+        )
+        
         # 1. 验证商品
-        commodity = await self._get_commodity(commodity_id)
+        with tracer.span("order.get_commodity"):
+            commodity = await self._get_commodity(commodity_id)
         
         # 2. 验证购买条件
-        await self._validate_purchase(commodity, quantity, user, card_id, race)
+        with tracer.span("order.validate_purchase"):
+            await self._validate_purchase(commodity, quantity, user, card_id, race)
         
         # 3. 验证库存
-        await self._validate_stock(commodity, quantity, race, card_id)
+        with tracer.span("order.validate_stock"):
+            await self._validate_stock(commodity, quantity, race, card_id)
         
         # 4. 验证支付方式
-        payment_method = await self._get_payment_method(payment_id, user)
+        with tracer.span("order.get_payment_method") as span:
+            payment_method = await self._get_payment_method(payment_id, user)
+            span.set_attribute("handler", payment_method.handler)
         
         # 5. 获取用户组
         user_group = None
         if user and user.group_id:
-            result = await self.db.execute(
-                select(UserGroup).where(UserGroup.id == user.group_id)
-            )
-            user_group = result.scalar_one_or_none()
+            with tracer.span("order.get_user_group", group_id=user.group_id):
+                result = await self.db.execute(
+                    select(UserGroup).where(UserGroup.id == user.group_id)
+                )
+                user_group = result.scalar_one_or_none()
         
         # 6. 计算金额
-        price_info = await self.calculate_amount(
-            commodity, quantity, user, user_group, race, card_id, coupon_code
-        )
+        with tracer.span("order.calculate_amount") as span:
+            price_info = await self.calculate_amount(
+                commodity, quantity, user, user_group, race, card_id, coupon_code
+            )
+            span.set_attribute("amount", float(price_info["amount"]))
         
         # 7. 钩子：订单创建前（插件可拦截）
         ctx = await hooks.emit(Events.ORDER_CREATING, {
@@ -320,25 +208,15 @@ class OrderService:
         if ctx.cancelled:
             raise ValidationError(ctx.cancel_reason or "订单创建被拦截")
         
-        # 8. 创建订单（trade_no 冲突时自动重试，数据库 UNIQUE 约束兜底）
-        for _retry in range(3):
-            trade_no = generate_trade_no()
-            exists = await self.db.execute(
-                select(Order.id).where(Order.trade_no == trade_no).limit(1)
-            )
-            if not exists.scalar_one_or_none():
-                break
-        else:
-            trade_no = generate_trade_no()  # 最后一搏
-        
+        # 8. 创建订单（单号由生成器保证唯一，不再预查；UNIQUE 冲突时换号重试）
         # 处理密码哈希
         hashed_password = password
         if password:
-            from ..core.security import get_password_hash
-            hashed_password, _ = get_password_hash(password)
+            from ..core.security import get_password_hash_async, PURPOSE_ORDER
+            hashed_password, _ = await get_password_hash_async(password, PURPOSE_ORDER)
             
         order = Order(
-            trade_no=trade_no,
+            trade_no=generate_trade_no(),
             user_id=user.id if user else None,
             commodity_id=commodity.id,
             payment_id=payment_method.id,
@@ -353,25 +231,33 @@ class OrderService:
             rent=Decimal(str(commodity.factory_price)) * quantity,
             create_ip=client_ip,
             create_device=device,
+            request_no=request_no,
+            request_digest=request_digest,
             status=0,
             delivery_status=0,
         )
         
+        # 处理推广关系
+        if user and user.parent_id:
+            order.from_user_id = user.parent_id
+        
+        with tracer.span("order.insert"):
+            await self._insert_order(order)
+        trade_no = order.trade_no
+        tracer.current().set_attribute("trade_no", trade_no)
+        
+        # 预占卡密（库存不足时整单回滚）
+        with tracer.span("order.reserve_cards"):
+            await self._reserve_cards(order, commodity)
+        
         # 处理优惠券
         if coupon_code:
             coupon = await self._use_coupon(coupon_code, trade_no)
             if coupon:
                 order.coupon_id = coupon.id
         
-        # 处理推广关系
-        if user and user.parent_id:
-            order.from_user_id = user.parent_id
-        
-        self.db.add(order)
-        await self.db.flush()
-        
-        # 钩子：订单创建后
-        await hooks.emit(Events.ORDER_CREATED, {
+        # 钩子：订单创建后（事务提交后投递）
+        await outbox.publish(self.db, Events.ORDER_CREATED, {
             "order": order,
             "commodity": commodity,
             "user": user,
@@ -392,18 +278,17 @@ class OrderService:
         if payment_method.handler == "#balance":
             if not user:
                 raise PaymentError("余额支付需要登录")
-            await self._pay_with_balance(order, user, commodity)
+            with tracer.span("order.pay_with_balance"):
+                await self._pay_with_balance(order, user, commodity)
             secret = await self.deliver_order(order)
             result["status"] = 1
             result["secret"] = secret
             
             # 钩子：支付成功 + 发货完成
-            await hooks.emit(Events.ORDER_PAID, {
+            await outbox.publish(self.db, Events.ORDER_PAID, {
                 "order": order, "user": user, "commodity": commodity,
             })
-            await hooks.emit(Events.ORDER_DELIVERED, {
-                "order": order, "secret": secret,
-            })
+            await outbox.publish(self.db, Events.ORDER_DELIVERED, {"order": order})
             
             # 佣金 + 累计消费
             await self._process_commission(order)
@@ -431,6 +316,8 @@ class OrderService:
                     extra = {"form_data": payment_result.form_data}
                 
                 order.pay_url = pay_url or payment_result.qrcode_url
+                order.pay_type = p_type
+                order.pay_extra = json_lib.dumps(extra, ensure_ascii=False, default=str) if extra else None
                 result["payment_url"] = pay_url
                 result["payment_type"] = p_type
                 result["extra"] = extra
@@ -489,7 +376,9 @@ class OrderService:
                 return "invalid handler"
         
         # 验证回调
-        callback_result = await payment_instance.verify_callback(data)
+        callback_result = await metrics.track_payment(
+            handler, "verify_callback", payment_instance.verify_callback(data),
+        )
         if not callback_result.success:
             return payment_instance.get_callback_response(False)
         
@@ -514,12 +403,13 @@ class OrderService:
         order.status = 1
         order.paid_at = datetime.now()
         order.external_trade_no = callback_result.external_trade_no
+        await InventoryService(self.db).order_paid(order)
         
-        # 钩子
-        await hooks.emit(Events.ORDER_PAID, {"order": order, "callback_data": data})
+        # 钩子（事务提交后投递）
+        await outbox.publish(self.db, Events.ORDER_PAID, {"order": order, "callback_data": data})
         
-        secret = await self.deliver_order(order)
-        await hooks.emit(Events.ORDER_DELIVERED, {"order": order, "secret": secret})
+        await self.deliver_order(order)
+        await outbox.publish(self.db, Events.ORDER_DELIVERED, {"order": order})
         
         # 佣金 + 累计消费（Decimal 精度）
         await self._process_commission(order)
@@ -528,11 +418,16 @@ class OrderService:
         await self.db.commit()
         return payment_instance.get_callback_response(True)
     
+    @tracer.traced("order.deliver_order")
     async def deliver_order(self, order: Order) -> str:
         """发货"""
-        # 获取商品（加行锁，防止并发超卖）
+        tracer.current().set_attributes(
+            order_id=order.id, trade_no=order.trade_no,
+            commodity_id=order.commodity_id, quantity=order.quantity,
+        )
+        # 不对商品行加锁：卡密由卡密行锁领取，手动发货库存用条件 UPDATE 扣减
         result = await self.db.execute(
-            select(Commodity).where(Commodity.id == order.commodity_id).with_for_update()
+            select(Commodity).where(Commodity.id == order.commodity_id)
         )
         commodity = result.scalar_one_or_none()
         
@@ -547,19 +442,78 @@ class OrderService:
             order.secret = secret
             order.delivery_status = 1
         else:
-            # 手动发货：检查库存是否足够
-            if commodity.stock > 0 and commodity.stock < order.quantity:
-                raise StockError("库存不足，请联系客服")
-            # 扣减手动发货库存（stock > 0 才扣减，为 0 表示不限库存）
+            # 手动发货：stock > 0 时用条件 UPDATE 原子扣减（为 0 表示不限库存），
+            # 不对商品行加 SELECT ... FOR UPDATE，行锁只在 UPDATE 到提交之间持有
             if commodity.stock > 0:
-                commodity.stock = commodity.stock - order.quantity
+                await self._deduct_manual_stock(commodity, order.quantity)
             order.secret = commodity.delivery_message or "正在发货中，请耐心等待"
             order.delivery_status = 0
         
         return order.secret
     
+    async def _deduct_manual_stock(self, commodity: Commodity, quantity: int):
+        """原子扣减手动发货库存，库存不足时不扣减并抛出 StockError"""
+        result = await self.db.execute(
+            update(Commodity)
+            .where(Commodity.id == commodity.id)
+            .where(Commodity.stock >= quantity)
+            .values(stock=Commodity.stock - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 0:
+            raise StockError("库存不足，请联系客服")
+    
+    async def _reserve_cards(self, order: Order, commodity: Commodity):
+        """下单时为订单预占卡密，发货时直接转为已售（见 services.reservation）"""
+        if commodity.delivery_way != 0 or not reservation.enabled():
+            return
+        cards = await self._lock_cards(order, commodity, order.quantity)
+        if len(cards) < order.quantity:
+            raise StockError("预选卡密已被售出" if order.card_id else "库存不足")
+        await ReservationService(self.db).hold(order, cards)
+    
+    @tracer.traced("order.pull_cards")
     async def _pull_cards(self, order: Order, commodity: Commodity) -> str:
-        """拉取卡密（带行锁防并发超卖）"""
+        """拉取卡密：优先取下单时预占的卡密，预占已过期释放时重新取卡（带行锁防并发超卖）"""
+        tracer.current().set_attributes(
+            commodity_id=commodity.id, quantity=order.quantity, race=order.race,
+            card_id=order.card_id, mode=commodity.delivery_auto_mode,
+        )
+        cards = await ReservationService(self.db).claim(order)
+        reserved = len(cards)
+        changes = [(card.commodity_id, card.race, reservation.CARD_RESERVED, 1) for card in cards]
+        tracer.current().set_attribute("reserved", reserved)
+        
+        missing = order.quantity - reserved
+        if missing > 0:
+            extra = await self._lock_cards(order, commodity, missing)
+            tracer.current().set_attribute("cards", len(extra))
+            if len(extra) < missing:
+                # 凑不齐整单：已取出的预占卡密放回待售，不随订单留在预占状态
+                if cards:
+                    await ReservationService(self.db).release(cards)
+                return "预选卡密已被售出" if order.card_id else "库存不足，请联系客服"
+            changes.extend((card.commodity_id, card.race, 0, 1) for card in extra)
+            cards.extend(extra)
+        
+        now = datetime.now()
+        secrets = []
+        for card in cards:
+            card.status = 1
+            card.order_id = order.id
+            card.reserved_until = None
+            card.sold_at = now
+            secrets.append(card.secret)
+        await InventoryService(self.db).track_cards(changes)
+        if reserved:
+            metrics.card_reservations.inc(reserved, event="claimed")
+        if missing > 0 and reservation.enabled():
+            metrics.card_reservations.inc(missing, event="fallback")
+        
+        return "\n".join(secrets)
+    
+    async def _lock_cards(self, order: Order, commodity: Commodity, quantity: int) -> List[Card]:
+        """按商品的发货方式锁定待售卡密（FOR UPDATE SKIP LOCKED: 已被其它事务锁定的行直接跳过）"""
         # 预选卡密
         if order.card_id:
             result = await self.db.execute(
@@ -568,23 +522,8 @@ class OrderService:
                 .where(Card.status == 0)
                 .with_for_update(skip_locked=True)
             )
-            card = result.scalar_one_or_none()
-            if card:
-                card.status = 1
-                card.order_id = order.id
-                card.sold_at = datetime.now()
-                return card.secret
-            return "预选卡密已被售出"
-        
-        # 确定排序方式
-        if commodity.delivery_auto_mode == 0:
-            order_by = Card.id.asc()
-        elif commodity.delivery_auto_mode == 1:
-            order_by = func.random()
-        else:
-            order_by = Card.id.desc()
+            return list(result.scalars().all())
         
-        # 查询卡密（FOR UPDATE SKIP LOCKED: 已被其它事务锁定的行直接跳过）
         query = (
             select(Card)
             .where(Card.commodity_id == order.commodity_id)
@@ -594,22 +533,38 @@ class OrderService:
         if order.race:
             query = query.where(Card.race == order.race)
         
-        query = query.order_by(order_by).limit(order.quantity).with_for_update(skip_locked=True)
+        if commodity.delivery_auto_mode == 1:
+            return await self._lock_random_cards(query, quantity)
         
+        order_by = Card.id.asc() if commodity.delivery_auto_mode == 0 else Card.id.desc()
+        query = query.order_by(order_by).limit(quantity).with_for_update(skip_locked=True)
         result = await self.db.execute(query)
-        cards = result.scalars().all()
-        
-        if len(cards) < order.quantity:
-            return "库存不足，请联系客服"
-        
-        secrets = []
-        for card in cards:
-            card.status = 1
-            card.order_id = order.id
-            card.sold_at = datetime.now()
-            secrets.append(card.secret)
+        return list(result.scalars().all())
+    
+    async def _lock_random_cards(self, query, quantity: int) -> List[Card]:
+        """
+        随机发货：从随机起点沿 shuffle 序号取卡，不足时从头部回绕。
         
-        return "\n".join(secrets)
+        shuffle 在入库时随机分配，待售卡密上有 (commodity_id[, race], shuffle) 部分索引，
+        每次只扫描 quantity 行左右，与库存量无关。
+        """
+        pivot = random_shuffle_key()
+        result = await self.db.execute(
+            query.where(Card.shuffle >= pivot)
+            .order_by(Card.shuffle.asc())
+            .limit(quantity)
+            .with_for_update(skip_locked=True)
+        )
+        cards = list(result.scalars().all())
+        if len(cards) < quantity:
+            result = await self.db.execute(
+                query.where(Card.shuffle < pivot)
+                .order_by(Card.shuffle.asc())
+                .limit(quantity - len(cards))
+                .with_for_update(skip_locked=True)
+            )
+            cards.extend(result.scalars().all())
+        return cards
     
     async def _get_commodity(self, commodity_id: int) -> Commodity:
         """获取商品"""
@@ -677,18 +632,7 @@ class OrderService:
         if commodity.delivery_way != 0:
             return  # 手动发货不检查
         
-        query = (
-            select(func.count())
-            .select_from(Card)
-            .where(Card.commodity_id == commodity.id)
-            .where(Card.status == 0)
-        )
-        
-        if race:
-            query = query.where(Card.race == race)
-        
-        result = await self.db.execute(query)
-        stock = result.scalar()
+        stock = await InventoryService(self.db).get_stock(commodity.id, race)
         
         if stock < quantity:
             raise StockError("库存不足")
@@ -742,6 +686,25 @@ class OrderService:
         
         return coupon
     
+    async def _insert_order(self, order: Order):
+        """
+        写入订单。
+
+        写入前不查重：节点号已确定时单号不会重复；退化为随机节点号（见 core.trade_no）
+        或节点号配置重复时可能撞号，trade_no 违反 UNIQUE 约束则回滚保存点并换号重试。
+        """
+        for attempt in range(TRADE_NO_ATTEMPTS):
+            try:
+                async with self.db.begin_nested():
+                    self.db.add(order)
+                    await self.db.flush()
+                return
+            except IntegrityError as e:
+                if "trade_no" not in str(e.orig) or attempt == TRADE_NO_ATTEMPTS - 1:
+                    raise
+                logger.warning(f"Trade number collision on {order.trade_no}, retrying")
+                order.trade_no = generate_trade_no()
+    
     async def _use_coupon(self, code: str, trade_no: str) -> Optional[Coupon]:
         """使用优惠券"""
         result = await self.db.execute(
@@ -798,7 +761,9 @@ class OrderService:
         # 更新订单状态
         order.status = 1
         order.paid_at = datetime.now()
+        await InventoryService(self.db).order_paid(order)
     
+    @tracer.traced("order.create_payment")
     async def _create_payment(
         self,
         order: Order,
@@ -815,6 +780,9 @@ class OrderService:
         from ..plugins import plugin_manager, PAYMENT_HANDLERS
         
         handler_id = payment_method.handler
+        tracer.current().set_attributes(
+            handler=handler_id, trade_no=order.trade_no, channel=payment_method.code,
+        )
         payment_instance = None
         
         # 1. 先查插件系统中已启用的实例
@@ -873,15 +841,20 @@ class OrderService:
             raise PaymentError(ctx.cancel_reason or "支付创建被拦截")
         
         # 6. 调用支付接口
-        return await payment_instance.create_payment(
-            trade_no=order.trade_no,
-            amount=float(order.amount),
-            callback_url=notify_url,
-            return_url=sync_return,
-            channel=payment_method.code or "alipay",
-            client_ip=client_ip,
-            product_name=product_name,
-        )
+        with tracer.span("payment.create_payment", handler=handler_id) as span:
+            payment_result = await metrics.track_payment(
+                handler_id, "create_payment", payment_instance.create_payment(
+                    trade_no=order.trade_no,
+                    amount=float(order.amount),
+                    callback_url=notify_url,
+                    return_url=sync_return,
+                    channel=payment_method.code or "alipay",
+                    client_ip=client_ip,
+                    product_name=product_name,
+                ),
+            )
+            span.set_attribute("success", payment_result.success)
+        return payment_result
     
     async def _process_commission(self, order: Order):
         """处理分销佣金（Decimal 精度）"""
@@ -0,0 +1,278 @@
+"""
+事件发件箱
+
+业务事件（订单支付 / 发货、用户充值等）不在业务事务内调用钩子处理函数，
+而是由 publish() 在同一事务中写入 outbox_events，事务提交后由后台分发器投递：
+支付回调等事务只包含状态变更本身，慢的插件处理函数不再持有行锁、拖慢回调应答；
+事务回滚时事件随之丢弃，提交成功的事件即使进程退出也会在重启后投递。
+
+分发：
+  - 每批领取 outbox_batch 条到期事件（FOR UPDATE SKIP LOCKED，多个 worker 互不重复），
+    领取时顺延 available_at 作为租约，进程中途退出的事件在租约到期后重新投递
+  - 同一聚合（如 orders:123）的事件按写入顺序逐个投递：存在更早的待分发事件时不领取
+  - 每个事件在独立的会话中加载实体并调用 hooks.emit()（background 处理函数同样等待完成），全部成功后删除；
+    有处理函数失败时只重试失败的处理函数，按指数退避，超过 outbox_max_attempts 次标记为放弃
+至少投递一次：处理函数可能被重复调用，应当幂等。
+
+可拦截的 *_CREATING 事件和应用生命周期事件仍由 hooks.emit() 同步执行。
+
+ORDER_DELIVERED 的卡密不写入 outbox_events（避免明文卡密落入事件表），
+分发时从重新加载的订单上填入 data["secret"]，处理函数看到的数据不变。
+"""
+
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, event, exists, inspect, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from ..config import settings
+from ..core import metrics
+from ..database import Base, async_session_maker
+from ..models import OutboxEvent
+from ..plugins.sdk.hooks import Events, hooks
+
+logger = logging.getLogger("services.outbox")
+
+
+## 事件状态：待分发 / 失败次数超限已放弃（成功分发后直接删除）
+STATUS_PENDING = 0
+STATUS_DEAD = 2
+
+## 领取后的租约（秒）：超过该时间仍未完成的事件会被重新领取
+LEASE_SECONDS = 60
+
+## 重试退避上限（秒）
+MAX_BACKOFF = 300
+
+## 事件数据中 ORM 实体的引用标记
+_ENTITY = "__entity__"
+
+
+# ============== 写入 ==============
+
+def _is_entity(value: Any) -> bool:
+    return isinstance(value, Base)
+
+
+async def _encode(db: AsyncSession, data: Dict[str, Any]) -> Dict[str, Any]:
+    """ORM 实体以（类名, 主键）引用，分发时重新加载最新状态；其余值按 JSON 保存"""
+    encoded = {}
+    for name, value in data.items():
+        if _is_entity(value):
+            if inspect(value).identity is None:
+                await db.flush()
+            encoded[name] = {_ENTITY: type(value).__name__, "id": inspect(value).identity[0]}
+        else:
+            encoded[name] = value
+    return encoded
+
+
+def _aggregate(data: Dict[str, Any]) -> Optional[str]:
+    """默认聚合：事件数据中第一个实体（如 orders:123）"""
+    for value in data.values():
+        if _is_entity(value):
+            return f"{value.__tablename__}:{inspect(value).identity[0]}"
+    return None
+
+
+async def publish(
+    db: AsyncSession,
+    event_name: str,
+    data: Optional[Dict[str, Any]] = None,
+    aggregate: Optional[str] = None,
+) -> OutboxEvent:
+    """
+    在当前事务中写入待分发事件（事务提交后投递给钩子处理函数）。
+
+    Args:
+        db: 当前事务会话
+        event_name: 事件名称（Events.*）
+        data: 事件数据，与 hooks.emit() 相同；ORM 实体在分发时重新加载
+        aggregate: 聚合标识，同一聚合的事件按顺序投递；默认取数据中第一个实体
+    """
+    data = data or {}
+    payload = await _encode(db, data)
+    row = OutboxEvent(
+        event=event_name,
+        aggregate=aggregate or _aggregate(data),
+        payload=json.dumps(payload, ensure_ascii=False, default=str),
+        status=STATUS_PENDING,
+        attempts=0,
+        available_at=datetime.utcnow(),
+    )
+    db.add(row)
+    _wake_on_commit(db)
+    return row
+
+
+def _wake_on_commit(db: AsyncSession):
+    """事务提交后唤醒本进程的分发器（其他 worker 按轮询间隔领取）"""
+    session = db.sync_session
+    if session.info.get("outbox_wake"):
+        return
+    session.info["outbox_wake"] = True
+
+    @event.listens_for(session, "after_commit", once=True)
+    def _after_commit(_session):
+        _session.info.pop("outbox_wake", None)
+        dispatcher.wake()
+
+    @event.listens_for(session, "after_rollback", once=True)
+    def _after_rollback(_session):
+        _session.info.pop("outbox_wake", None)
+
+
+# ============== 分发 ==============
+
+class OutboxDispatcher:
+    """发件箱分发器（后台任务）"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._entities: Optional[Dict[str, type]] = None
+
+    def wake(self):
+        """有新事件提交，立即分发"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def dispatch(self) -> int:
+        """领取并投递一批到期事件，返回领取数量"""
+        events = await self._claim(settings.outbox_batch)
+        if not events:
+            return 0
+        slots = asyncio.Semaphore(settings.outbox_concurrency)
+
+        async def _deliver(row: OutboxEvent):
+            async with slots:
+                try:
+                    await self._deliver(row)
+                except Exception as e:
+                    # 租约到期后重新投递
+                    logger.warning(f"Outbox event {row.id} ({row.event}) delivery failed: {e}")
+
+        await asyncio.gather(*(_deliver(row) for row in events))
+        return len(events)
+
+    async def _claim(self, limit: int) -> List[OutboxEvent]:
+        now = datetime.utcnow()
+        earlier = aliased(OutboxEvent)
+        blocked = (
+            exists()
+            .where(earlier.aggregate == OutboxEvent.aggregate)
+            .where(earlier.status == STATUS_PENDING)
+            .where(earlier.id < OutboxEvent.id)
+        )
+        async with async_session_maker() as db:
+            result = await db.execute(
+                select(OutboxEvent)
+                .where(OutboxEvent.status == STATUS_PENDING)
+                .where(OutboxEvent.available_at <= now)
+                .where(~blocked)
+                .order_by(OutboxEvent.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True, of=OutboxEvent)
+            )
+            events = list(result.scalars().all())
+            if events:
+                await db.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id.in_([row.id for row in events]))
+                    .values(available_at=now + timedelta(seconds=LEASE_SECONDS))
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+            return events
+
+    def _entity_class(self, name: str) -> Optional[type]:
+        if self._entities is None:
+            self._entities = {m.class_.__name__: m.class_ for m in Base.registry.mappers}
+        return self._entities.get(name)
+
+    async def _decode(self, db: AsyncSession, payload: Dict[str, Any]) -> Dict[str, Any]:
+        data = {}
+        for name, value in payload.items():
+            if isinstance(value, dict) and _ENTITY in value:
+                cls = self._entity_class(value[_ENTITY])
+                value = await db.get(cls, value["id"]) if cls is not None else None
+            data[name] = value
+        return data
+
+    async def _deliver(self, row: OutboxEvent):
+        """投递单个事件：处理函数与事件状态更新在同一事务中提交"""
+        only = json.loads(row.pending_handlers) if row.pending_handlers else None
+        async with async_session_maker() as db:
+            data = await self._decode(db, json.loads(row.payload))
+            if row.event == Events.ORDER_DELIVERED and data.get("order") is not None:
+                data["secret"] = data["order"].secret
+            ctx = await hooks.emit(row.event, data, only=only, wait_background=True)
+
+            if not ctx.errors:
+                await db.execute(delete(OutboxEvent).where(OutboxEvent.id == row.id))
+                await db.commit()
+                metrics.outbox_events.inc(event=row.event, result="dispatched")
+                metrics.outbox_lag.observe(
+                    (datetime.utcnow() - row.created_at).total_seconds(), event=row.event,
+                )
+                return
+
+            attempts = row.attempts + 1
+            values = {
+                "attempts": attempts,
+                "pending_handlers": json.dumps(ctx.errors),
+                "last_error": f"handlers failed: {', '.join(ctx.errors)}",
+            }
+            if attempts >= settings.outbox_max_attempts:
+                values["status"] = STATUS_DEAD
+                result = "dead"
+                logger.error(
+                    f"Outbox event {row.id} ({row.event}) gave up after {attempts} attempts: "
+                    f"{', '.join(ctx.errors)}"
+                )
+            else:
+                backoff = min(2 ** attempts, MAX_BACKOFF)
+                values["available_at"] = datetime.utcnow() + timedelta(seconds=backoff)
+                result = "retried"
+            await db.execute(
+                update(OutboxEvent).where(OutboxEvent.id == row.id).values(**values)
+            )
+            await db.commit()
+            metrics.outbox_events.inc(event=row.event, result=result)
+
+    async def _dispatch_loop(self):
+        while True:
+            self._wake.clear()
+            try:
+                claimed = await self.dispatch()
+            except Exception as e:
+                logger.warning(f"Outbox dispatch failed: {e}")
+                claimed = 0
+            # 有进展就继续领取：可能还有积压，或同一聚合的后续事件刚解除阻塞
+            if claimed:
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.outbox_poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start(self):
+        """启动分发（应用启动时调用）"""
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._dispatch_loop())
+
+    async def stop(self):
+        """停止分发（未投递的事件保留在表中，下次启动后继续）"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+# 全局单例
+dispatcher = OutboxDispatcher()
@@ -0,0 +1,231 @@
+"""
+商品定价方案
+把 Commodity.config（INI 风格）与 wholesale_config（JSON）编译为 PricingPlan，
+商城详情接口和 OrderService.calculate_amount 共用同一份解析结果。
+
+编译结果按 (commodity_id, updated_at) 缓存在进程内：商品配置修改后
+updated_at 变化，自然失效；报价时只做二分查找，不再解析文本。
+（版本中同时带上 created_at，防止删除后重建的同 ID 商品命中旧方案。）
+
+config 格式：
+    [category]
+    种类A=10.00
+
+    [wholesale]
+    10=9.00              # 买10件及以上，单价9.00
+    50=80%               # 买50件及以上，打八折
+
+    [category_wholesale]
+    种类A.10=9.00
+    种类A.50=80%
+
+    [sku]
+    颜色.红色=2.00       # 规格组.选项=加价
+"""
+
+import json as json_lib
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Optional, Dict, Any, List, Tuple
+
+from ..models import Commodity
+
+
+HUNDRED = Decimal("100")
+
+## 进程内最多缓存的商品定价方案数
+_MAX_PLANS = 2048
+
+
+@dataclass
+class WholesaleTiers:
+    """
+    批发阶梯（按起购数量升序）
+
+    quantities[i] 起购数量，rules[i] 为 ("fixed", 单价) 或 ("percent", 折扣百分比)。
+    数量相同的规则保留配置中靠后的一条。
+    """
+    quantities: List[int] = field(default_factory=list)
+    rules: List[Tuple[str, Decimal]] = field(default_factory=list)
+
+    @classmethod
+    def build(cls, items: List[Tuple[int, str, Decimal]]) -> "WholesaleTiers":
+        items = sorted(items, key=lambda x: x[0])
+        return cls(
+            quantities=[qty for qty, _, _ in items],
+            rules=[(rule_type, value) for _, rule_type, value in items],
+        )
+
+    def __bool__(self) -> bool:
+        return bool(self.quantities)
+
+    def apply(self, base_price: Decimal, quantity: int) -> Decimal:
+        """取起购数量不超过 quantity 的最大一档，没有命中时返回原价"""
+        index = bisect_right(self.quantities, quantity) - 1
+        if index < 0:
+            return base_price
+        rule_type, value = self.rules[index]
+        if rule_type == "percent":
+            return base_price * value / HUNDRED
+        return value
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """转换为前端展示格式"""
+        items = []
+        for qty, (rule_type, value) in zip(self.quantities, self.rules):
+            if rule_type == "percent":
+                items.append({"quantity": qty, "discount_percent": float(value), "type": "percent"})
+            else:
+                items.append({"quantity": qty, "price": float(value), "type": "fixed"})
+        return items
+
+
+@dataclass
+class PricingPlan:
+    """商品定价方案（编译后的 config / wholesale_config）"""
+    has_config: bool = False
+    wholesale: WholesaleTiers = field(default_factory=WholesaleTiers)
+    race_prices: Dict[str, Decimal] = field(default_factory=dict)
+    race_wholesale: Dict[str, WholesaleTiers] = field(default_factory=dict)
+    sku: List[Tuple[str, str, Decimal]] = field(default_factory=list)
+    ## 展示用的种类列表（保留配置顺序）
+    categories: List[Tuple[str, Decimal]] = field(default_factory=list)
+
+    @classmethod
+    def compile(cls, config: Optional[str], wholesale_config: Optional[str]) -> "PricingPlan":
+        """解析商品配置文本"""
+        plan = cls(has_config=bool(config))
+        wholesale = _parse_wholesale_json(wholesale_config)
+        config_wholesale: List[Tuple[int, str, Decimal]] = []
+        race_wholesale: Dict[str, List[Tuple[int, str, Decimal]]] = {}
+
+        current_section = None
+        for line in (config or "").strip().split("\n"):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("[") and line.endswith("]"):
+                current_section = line[1:-1].lower()
+                continue
+            if "=" not in line or not current_section:
+                continue
+
+            key, value = line.split("=", 1)
+            key, value = key.strip(), value.strip()
+            try:
+                if current_section == "category":
+                    price = Decimal(value)
+                    plan.categories.append((key, price))
+                    plan.race_prices[key] = price
+                elif current_section == "wholesale":
+                    qty = int(key)
+                    if qty > 0:
+                        config_wholesale.append((qty, *_parse_rule(value)))
+                elif current_section == "category_wholesale" and "." in key:
+                    race, qty_str = key.split(".", 1)
+                    race_wholesale.setdefault(race, []).append(
+                        (int(qty_str), *_parse_rule(value))
+                    )
+                elif current_section == "sku" and "." in key:
+                    group, option = key.split(".", 1)
+                    plan.sku.append((group, option, Decimal(value)))
+            except Exception:
+                continue
+
+        # wholesale_config 有有效规则时优先，否则兼容旧的 [wholesale]
+        plan.wholesale = WholesaleTiers.build(wholesale or config_wholesale)
+        plan.race_wholesale = {
+            race: WholesaleTiers.build(items) for race, items in race_wholesale.items()
+        }
+        return plan
+
+    def unit_price(self, base_price: Decimal, quantity: int, race: Optional[str] = None) -> Decimal:
+        """
+        按种类定价和批发阶梯计算单价。
+
+        有 config 且指定种类时只使用种类价格和种类批发规则；
+        否则使用全局批发规则。
+        """
+        if self.has_config and race:
+            race_price = self.race_prices.get(race, base_price)
+            tiers = self.race_wholesale.get(race)
+            if tiers:
+                return tiers.apply(race_price, quantity)
+            return race_price
+        return self.wholesale.apply(base_price, quantity)
+
+    def to_display(self) -> Dict[str, Any]:
+        """商品详情接口使用的配置参数（空项为 None）"""
+        return {
+            "categories": [
+                {"name": name, "price": float(price)} for name, price in self.categories
+            ] or None,
+            "wholesale": self.wholesale.to_list() or None,
+            "sku_config": [
+                {"group": group, "option": option, "extra_price": float(extra)}
+                for group, option, extra in self.sku
+            ] or None,
+            "category_wholesale": {
+                race: tiers.to_list() for race, tiers in self.race_wholesale.items()
+            } or None,
+        }
+
+
+def _parse_rule(value: str) -> Tuple[str, Decimal]:
+    """解析单条批发规则值：9.00 或 80%"""
+    if value.endswith("%"):
+        return "percent", Decimal(value[:-1])
+    return "fixed", Decimal(value)
+
+
+def _parse_wholesale_json(text: Optional[str]) -> List[Tuple[int, str, Decimal]]:
+    """解析 wholesale_config（JSON 数组），格式错误时整体忽略"""
+    if not text:
+        return []
+    rules: List[Tuple[int, str, Decimal]] = []
+    try:
+        items = json_lib.loads(text)
+        if not isinstance(items, list):
+            return []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            qty = int(item.get("quantity", 0))
+            if qty <= 0:
+                continue
+            if item.get("type") == "percent" or item.get("discount_percent") is not None:
+                discount_percent = item.get("discount_percent")
+                if discount_percent is None:
+                    continue
+                rules.append((qty, "percent", Decimal(str(discount_percent))))
+            elif item.get("price") is not None:
+                rules.append((qty, "fixed", Decimal(str(item.get("price")))))
+    except Exception:
+        return []
+    return rules
+
+
+_plans: "OrderedDict[int, Tuple[Any, PricingPlan]]" = OrderedDict()
+
+
+def get_pricing_plan(commodity: Commodity) -> PricingPlan:
+    """获取商品的定价方案（按 commodity_id + updated_at 缓存）"""
+    version = (commodity.created_at, commodity.updated_at)
+    cached = _plans.get(commodity.id)
+    if cached is not None and cached[0] == version:
+        _plans.move_to_end(commodity.id)
+        return cached[1]
+
+    plan = PricingPlan.compile(commodity.config, commodity.wholesale_config)
+    _plans[commodity.id] = (version, plan)
+    _plans.move_to_end(commodity.id)
+    while len(_plans) > _MAX_PLANS:
+        _plans.popitem(last=False)
+    return plan
+
+
+def clear_pricing_plans() -> None:
+    """清空定价方案缓存"""
+    _plans.clear()
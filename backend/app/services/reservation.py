@@ -0,0 +1,176 @@
+"""
+卡密预占
+
+下单时为订单锁定 N 张待售卡密（status=3，order_id 指向订单，带到期时间），
+支付回调时按 order_id 直接取出预占的卡密转为已售，不再搜索库存；
+库存不足在下单时就失败，而不是支付后才发现发不出货。
+
+过期（未在 card_reservation_ttl 内支付）的预占由后台任务按到期时间批量释放回待售。
+多个 worker 同时清理时用 FOR UPDATE SKIP LOCKED 互不重复，也不会阻塞正在发货的事务。
+预占被释放后订单才支付的，发货时退化为重新取卡。
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import settings
+from ..core import cache, metrics
+from ..core.cache import CacheTags
+from ..database import async_session_maker
+from ..models import Card, Order
+from .inventory import InventoryService
+
+logger = logging.getLogger("services.reservation")
+
+
+## 卡密状态：预占
+CARD_RESERVED = 3
+
+
+def enabled() -> bool:
+    """是否开启下单预占"""
+    return settings.card_reservation_ttl > 0
+
+
+async def invalidate_stock(commodity_ids: Iterable[int], db: Optional[AsyncSession] = None):
+    """可售库存变化：失效商品列表和各商品详情缓存（一次失效多个商品）"""
+    tags = [CacheTags.commodity(commodity_id) for commodity_id in sorted(set(commodity_ids))]
+    if tags:
+        await cache.invalidate(CacheTags.COMMODITY_LIST, *tags, db=db)
+
+
+class ReservationService:
+    """卡密预占"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def hold(self, order: Order, cards: Sequence[Card]):
+        """将已加行锁的待售卡密预占给订单"""
+        until = datetime.now() + timedelta(seconds=settings.card_reservation_ttl)
+        for card in cards:
+            card.status = CARD_RESERVED
+            card.order_id = order.id
+            card.reserved_until = until
+        # 会话未开启 autoflush：同一事务内随后的 claim()（余额支付立即发货）需要看到预占
+        await self.db.flush()
+        await InventoryService(self.db).track_cards(
+            (card.commodity_id, card.race, 0, CARD_RESERVED) for card in cards
+        )
+        await invalidate_stock((card.commodity_id for card in cards), db=self.db)
+        metrics.card_reservations.inc(len(cards), event="held")
+
+    async def claim(self, order: Order) -> List[Card]:
+        """取出订单预占的卡密（加行锁，由调用方转为已售）"""
+        result = await self.db.execute(
+            select(Card)
+            .where(Card.order_id == order.id)
+            .where(Card.status == CARD_RESERVED)
+            .order_by(Card.id)
+            .with_for_update()
+        )
+        cards = list(result.scalars().all())
+        await invalidate_stock((card.commodity_id for card in cards), db=self.db)
+        return cards
+
+    async def release(self, cards: Sequence[Card]):
+        """将 claim() 取出但未能发货的卡密放回待售"""
+        for card in cards:
+            card.status = 0
+            card.order_id = None
+            card.reserved_until = None
+        await InventoryService(self.db).track_cards(
+            (card.commodity_id, card.race, CARD_RESERVED, 0) for card in cards
+        )
+        await invalidate_stock((card.commodity_id for card in cards), db=self.db)
+        metrics.card_reservations.inc(len(cards), event="released")
+
+    async def release_expired(self, limit: int, now: Optional[datetime] = None) -> Dict[int, int]:
+        """
+        释放一批已过期的预占（提交后失效相关商品的缓存）。
+
+        Returns:
+            各商品释放的卡密数
+        """
+        now = now or datetime.now()
+        result = await self.db.execute(
+            select(Card.id, Card.commodity_id, Card.race)
+            .where(Card.status == CARD_RESERVED)
+            .where(Card.reserved_until < now)
+            .order_by(Card.reserved_until)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        rows = result.all()
+        if not rows:
+            return {}
+
+        await self.db.execute(
+            update(Card)
+            .where(Card.id.in_([row.id for row in rows]))
+            .values(status=0, order_id=None, reserved_until=None)
+            .execution_options(synchronize_session=False)
+        )
+        await InventoryService(self.db).track_cards(
+            (row.commodity_id, row.race, CARD_RESERVED, 0) for row in rows
+        )
+        metrics.card_reservations.inc(len(rows), event="expired")
+        released: Dict[int, int] = {}
+        for row in rows:
+            released[row.commodity_id] = released.get(row.commodity_id, 0) + 1
+        await invalidate_stock(released, db=self.db)
+        return released
+
+
+class ReservationSweeper:
+    """过期预占清理（后台任务）"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    async def sweep(self) -> int:
+        """释放所有已过期的预占，每批一个事务；秒杀商品的名额同时归还"""
+        from .seckill import seckill
+        
+        total = 0
+        batch = settings.card_reservation_sweep_batch
+        while True:
+            async with async_session_maker() as db:
+                released = await ReservationService(db).release_expired(batch)
+                await db.commit()
+            await seckill.restore(released)
+            count = sum(released.values())
+            total += count
+            if count < batch:
+                break
+        if total:
+            logger.info(f"Released {total} expired card reservations")
+        return total
+
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(settings.card_reservation_sweep_interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning(f"Card reservation sweep failed: {e}")
+
+    async def start(self):
+        """启动定期清理（应用启动时调用）"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._sweep_loop())
+
+    async def stop(self):
+        """停止清理"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+# 全局单例
+sweeper = ReservationSweeper()
@@ -0,0 +1,353 @@
+"""
+秒杀
+
+开启秒杀（seckill_status=1）的商品在开始前 seckill_preload_ahead 秒把可售数量预载到 Redis，
+下单请求先在 Redis 上原子扣减（Lua 脚本内检查并扣减，名额不足时不扣），抢不到的直接返回售罄，
+不查询数据库、不争抢 cards 行锁；抢到的再经过有界的准入队列进入正常的 OrderService 流程。
+
+名额的归还：
+  - 下单失败（校验不通过、库存不足、支付创建失败等）：立即归还
+  - 预占过期未支付（卡密发货）：由预占清理任务（services.reservation）立即归还
+  - 未支付订单不预占卡密（手动发货或关闭卡密预占）：由同步任务校准，
+    名额 = 可售数量 - seckill_unpaid_hold 内创建的未支付订单 - 正在下单的请求，超时未支付的名额就此归还
+数据库（卡密预占、发货扣库存）仍是最终的库存依据，Redis 只负责挡住超出库存的请求。
+
+秒杀窗口由后台任务定期从数据库同步到进程内，Redis 不可用或名额未预载时退化为普通下单。
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Optional
+
+from sqlalchemy import func, or_, select
+
+from ..config import settings
+from ..core import cache, metrics
+from ..core.exceptions import ServiceBusyError, StockError, ValidationError
+from ..database import async_session_maker
+from ..models import Commodity, Order
+from . import reservation
+from .inventory import InventoryService
+
+logger = logging.getLogger("services.seckill")
+
+
+_POOL_KEY = f"{cache.KEY_PREFIX}:seckill:pool:{{}}"
+_INFLIGHT_KEY = f"{cache.KEY_PREFIX}:seckill:inflight:{{}}"
+
+## 名额键在秒杀结束后保留的时间（秒）；未设置结束时间时由同步任务不断续期
+POOL_GRACE = 3600
+
+## 正在下单计数的过期时间（秒）：进程中途退出未减掉的计数最多保留这么久
+INFLIGHT_TTL = 300
+
+## 名额的检查与修改都在脚本内原子完成，且从不创建名额键：
+## 键在两次往返之间过期后再 DECRBY / INCRBY 会生成一个没有 TTL 的键，商品就此一直售罄
+
+## 扣减并计入正在下单：返回 -1 未预载，0 名额不足，1 抢到
+_TAKE_SCRIPT = """
+local left = redis.call('GET', KEYS[1])
+if not left then return -1 end
+if tonumber(left) < tonumber(ARGV[1]) then return 0 end
+redis.call('DECRBY', KEYS[1], ARGV[1])
+redis.call('INCRBY', KEYS[2], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+return 1
+"""
+
+## 下单结束：扣除正在下单计数，ARGV[2] 为 1 时同时归还名额
+_FINISH_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 1 and redis.call('DECRBY', KEYS[2], ARGV[1]) <= 0 then
+    redis.call('DEL', KEYS[2])
+end
+if ARGV[2] == '1' and redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+## 归还：返回 1 已归还，0 名额键不存在
+_RESTORE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then return 0 end
+redis.call('INCRBY', KEYS[1], ARGV[1])
+return 1
+"""
+
+## 校准并续期：名额设为 ARGV[1] 减去正在下单的数量（不小于 0），TTL 设为 ARGV[2]；
+## 返回调整量，名额键不存在时返回 nil
+_RECONCILE_SCRIPT = """
+local left = redis.call('GET', KEYS[1])
+if not left then return nil end
+local target = tonumber(ARGV[1]) - tonumber(redis.call('GET', KEYS[2]) or '0')
+if target < 0 then target = 0 end
+redis.call('SET', KEYS[1], target, 'EX', ARGV[2])
+return target - tonumber(left)
+"""
+
+
+@dataclass
+class SeckillWindow:
+    """秒杀时间窗口"""
+    commodity_id: int
+    start: Optional[datetime]
+    end: Optional[datetime]
+
+
+class SeckillEngine:
+    """秒杀名额与准入控制"""
+
+    def __init__(self):
+        self._windows: Dict[int, SeckillWindow] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._waiting = 0
+        self._task: Optional[asyncio.Task] = None
+
+    # ============== 名额 ==============
+
+    @staticmethod
+    def _redis():
+        return cache.get_redis()
+
+    async def preload(self, commodity: Commodity, units: int, force: bool = False) -> bool:
+        """
+        预载可售名额。
+
+        默认仅在名额不存在时写入（多个 worker 同时预载只有一个生效），force 时覆盖。
+        """
+        redis = self._redis()
+        if redis is None:
+            return False
+        ttl = self._pool_ttl(commodity.seckill_end_time)
+        loaded = await redis.set(_POOL_KEY.format(commodity.id), units, ex=ttl, nx=not force)
+        if loaded:
+            logger.info(f"Seckill pool for commodity {commodity.id} loaded with {units} units")
+        return bool(loaded)
+
+    async def remaining(self, commodity_id: int) -> Optional[int]:
+        """剩余名额（未预载时为 None）"""
+        redis = self._redis()
+        if redis is None:
+            return None
+        value = await redis.get(_POOL_KEY.format(commodity_id))
+        return max(0, int(value)) if value is not None else None
+
+    async def _take(self, commodity_id: int, quantity: int) -> Optional[bool]:
+        """
+        原子扣减名额。
+
+        Returns:
+            True 抢到；False 名额不足；None 名额未预载或 Redis 不可用（不做限制）
+        """
+        redis = self._redis()
+        if redis is None:
+            return None
+        try:
+            taken = await redis.eval(
+                _TAKE_SCRIPT, 2, _POOL_KEY.format(commodity_id), _INFLIGHT_KEY.format(commodity_id),
+                quantity, INFLIGHT_TTL,
+            )
+            if int(taken) < 0:
+                return None
+            return bool(int(taken))
+        except Exception as e:
+            logger.warning(f"Seckill pool unavailable for commodity {commodity_id}: {e}")
+            return None
+
+    async def restore(self, released: Dict[int, int]):
+        """归还名额（只归还仍在秒杀中的商品）"""
+        redis = self._redis()
+        if redis is None:
+            return
+        for commodity_id, quantity in released.items():
+            if commodity_id not in self._windows or quantity <= 0:
+                continue
+            try:
+                if int(await redis.eval(_RESTORE_SCRIPT, 1, _POOL_KEY.format(commodity_id), quantity)):
+                    metrics.seckill_requests.inc(quantity, result="restored")
+            except Exception as e:
+                logger.warning(f"Failed to restore seckill units for commodity {commodity_id}: {e}")
+
+    async def _finish(self, commodity_id: int, quantity: int, restore: bool):
+        """抢到名额的下单请求结束（restore 为 True 表示下单失败，同时归还名额）"""
+        redis = self._redis()
+        if redis is None:
+            return
+        try:
+            await redis.eval(
+                _FINISH_SCRIPT, 2, _POOL_KEY.format(commodity_id), _INFLIGHT_KEY.format(commodity_id),
+                quantity, 1 if restore else 0,
+            )
+            if restore:
+                metrics.seckill_requests.inc(quantity, result="restored")
+        except Exception as e:
+            logger.warning(f"Failed to finish seckill admission for commodity {commodity_id}: {e}")
+
+    @staticmethod
+    def _pool_ttl(end: Optional[datetime]) -> int:
+        if end is None:
+            return POOL_GRACE * 24
+        return max(POOL_GRACE, int((end - datetime.now()).total_seconds()) + POOL_GRACE)
+
+    # ============== 准入 ==============
+
+    async def _enter(self):
+        """进入准入队列：同时执行的秒杀下单不超过 seckill_admission_concurrency"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(settings.seckill_admission_concurrency)
+        if self._waiting >= settings.seckill_admission_queue:
+            raise ServiceBusyError("抢购人数过多，请稍后重试")
+        self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), settings.seckill_admission_timeout)
+        except asyncio.TimeoutError:
+            raise ServiceBusyError("抢购人数过多，请稍后重试")
+        finally:
+            self._waiting -= 1
+
+    @asynccontextmanager
+    async def admit(self, commodity_id: int, quantity: int) -> AsyncIterator[None]:
+        """
+        秒杀准入（包住下单流程，OrderService.create_order() 在其中提交订单）。
+
+        非秒杀商品直接放行；秒杀商品先扣名额再排队，下单流程抛出异常时归还名额。
+        """
+        window = self._windows.get(commodity_id)
+        taken = None
+        if window is not None:
+            now = datetime.now()
+            if window.start and now < window.start:
+                metrics.seckill_requests.inc(result="not_started")
+                raise ValidationError("秒杀尚未开始")
+            if window.end and now > window.end:
+                metrics.seckill_requests.inc(result="ended")
+                raise ValidationError("秒杀已结束")
+            taken = await self._take(commodity_id, quantity)
+            if taken is False:
+                metrics.seckill_requests.inc(result="sold_out")
+                raise StockError("已售罄")
+
+        if not taken:
+            yield
+            return
+
+        try:
+            await self._enter()
+        except ServiceBusyError:
+            metrics.seckill_requests.inc(result="busy")
+            await self._finish(commodity_id, quantity, restore=True)
+            raise
+        try:
+            yield
+        except BaseException:
+            await self._finish(commodity_id, quantity, restore=True)
+            raise
+        else:
+            metrics.seckill_requests.inc(result="admitted")
+            await self._finish(commodity_id, quantity, restore=False)
+        finally:
+            self._slots.release()
+
+    # ============== 同步 ==============
+
+    async def sync(self) -> int:
+        """从数据库同步秒杀窗口，并预载即将开始的秒杀名额"""
+        now = datetime.now()
+        async with async_session_maker() as db:
+            result = await db.execute(
+                select(Commodity)
+                .where(Commodity.seckill_status == 1)
+                .where(Commodity.status == 1)
+                .where(or_(Commodity.seckill_end_time.is_(None), Commodity.seckill_end_time > now))
+            )
+            commodities = result.scalars().all()
+            self._windows = {
+                c.id: SeckillWindow(c.id, c.seckill_start_time, c.seckill_end_time)
+                for c in commodities
+            }
+
+            ahead = now + timedelta(seconds=settings.seckill_preload_ahead)
+            for commodity in commodities:
+                if commodity.seckill_start_time and commodity.seckill_start_time > ahead:
+                    continue
+                units = await self.sellable_units(db, commodity)
+                if units is None:
+                    continue
+                units = max(0, units - await self.unpaid_units(db, commodity))
+                if not await self.preload(commodity, units):
+                    await self._reconcile(commodity, units)
+        return len(self._windows)
+
+    async def _reconcile(self, commodity: Commodity, units: int):
+        """
+        已预载的名额：续期，并校准为 units 减去正在下单的数量。
+
+        名额偏多：例如 Redis 短暂不可用期间绕过限流的订单预占过期后被归还；
+        偏少：未预占卡密的未支付订单超过 seckill_unpaid_hold，或进程中途退出没有归还。
+        """
+        redis = self._redis()
+        if redis is None:
+            return
+        delta = await redis.eval(
+            _RECONCILE_SCRIPT, 2, _POOL_KEY.format(commodity.id), _INFLIGHT_KEY.format(commodity.id),
+            units, self._pool_ttl(commodity.seckill_end_time),
+        )
+        if delta is None or not int(delta):
+            return
+        if int(delta) > 0:
+            metrics.seckill_requests.inc(int(delta), result="restored")
+        await reservation.invalidate_stock([commodity.id])
+
+    @staticmethod
+    async def sellable_units(db, commodity: Commodity) -> Optional[int]:
+        """可售数量：卡密发货取待售卡密数，手动发货取商品库存（0 表示不限，不做秒杀限流）"""
+        if commodity.delivery_way == 0:
+            return await InventoryService(db).get_stock(commodity.id)
+        return commodity.stock if commodity.stock > 0 else None
+
+    @staticmethod
+    async def unpaid_units(db, commodity: Commodity) -> int:
+        """
+        未预占卡密的未支付订单占用的数量（seckill_unpaid_hold 内创建的）。
+
+        卡密发货且开启预占时为 0：未支付订单的卡密已预占，不计入可售数量。
+        """
+        if commodity.delivery_way == 0 and reservation.enabled():
+            return 0
+        since = datetime.utcnow() - timedelta(seconds=settings.seckill_unpaid_hold)
+        result = await db.execute(
+            select(func.coalesce(func.sum(Order.quantity), 0))
+            .where(Order.commodity_id == commodity.id)
+            .where(Order.status == 0)
+            .where(Order.created_at >= since)
+        )
+        return int(result.scalar_one())
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(settings.seckill_sync_interval)
+            try:
+                await self.sync()
+            except Exception as e:
+                logger.warning(f"Seckill sync failed: {e}")
+
+    async def start(self):
+        """同步秒杀窗口并启动后台同步（应用启动时调用）"""
+        try:
+            await self.sync()
+        except Exception as e:
+            logger.warning(f"Seckill sync failed: {e}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self):
+        """停止同步"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+# 全局单例
+seckill = SeckillEngine()
@@ -10,7 +10,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models import User, UserGroup, Bill
 from ..core.exceptions import ValidationError, NotFoundError, InsufficientBalanceError
-from ..core.security import get_password_hash, verify_password
+from ..core.security import get_password_hash_async, verify_password_async
 
 
 class UserService:
@@ -43,10 +43,10 @@ class UserService:
         new_password: str,
     ):
         """修改密码"""
-        if not verify_password(old_password, user.password_hash, user.salt):
+        if not await verify_password_async(old_password, user.password_hash, user.salt):
             raise ValidationError("旧密码错误")
         
-        password_hash, salt = get_password_hash(new_password)
+        password_hash, salt = await get_password_hash_async(new_password)
         user.password_hash = password_hash
         user.salt = salt
     
@@ -64,7 +64,7 @@ class UserService:
         if not user:
             raise NotFoundError("用户不存在")
         
-        password_hash, salt = get_password_hash(new_password)
+        password_hash, salt = await get_password_hash_async(new_password)
         user.password_hash = password_hash
         user.salt = salt
     
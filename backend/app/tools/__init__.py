@@ -0,0 +1,3 @@
+"""
+运维命令行工具（python -m app.tools.<name>）
+"""
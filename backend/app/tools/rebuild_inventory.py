@@ -0,0 +1,36 @@
+"""
+重建库存计数器
+
+从 cards / orders 重新统计 inventory_counters，用于计数偏差时的对账修复。
+
+用法：
+    python -m app.tools.rebuild_inventory                  # 全部商品
+    python -m app.tools.rebuild_inventory --commodity-id 3 # 指定商品
+"""
+
+import argparse
+import asyncio
+
+from ..database import async_session_maker, close_db
+from ..services.inventory import InventoryService
+
+
+async def _run(commodity_id):
+    try:
+        async with async_session_maker() as db:
+            rows = await InventoryService(db).rebuild(commodity_id)
+            await db.commit()
+        print(f"[OK] Rebuilt {rows} inventory counter rows")
+    finally:
+        await close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重建库存计数器")
+    parser.add_argument("--commodity-id", type=int, default=None, help="仅重建指定商品")
+    args = parser.parse_args()
+    asyncio.run(_run(args.commodity_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,658 @@
+"""
+生成大规模模拟数据
+
+用于性能测试和索引评估，按真实业务的比例批量写入：
+  - 用户：部分用户通过 parent_id 形成推广树，部分用户为商户（带店铺）
+  - 分类 / 商品：商户拥有自己的分类和商品（owner_id），商品带种类（config）和批发价（wholesale_config）
+  - 订单：按时间递增，商品热度服从 Zipf 分布，游客/会员、余额/在线支付混合
+  - 卡密：已支付订单对应的已售卡密 + 待售库存
+  - 账单：余额支付订单的扣款和余额不足时的充值，逐用户维护变动后余额
+  - 操作日志
+
+PostgreSQL 下使用 COPY 写入；其他数据库（如本地 SQLite）退化为批量 INSERT。
+主键在本地预先分配，外键始终指向已写入的行；写入完成后同步自增序列、
+回填用户余额并重建库存计数器。同一 --seed 生成的数据分布相同。
+
+用法：
+    python -m app.tools.seed --orders 10M
+    python -m app.tools.seed --users 200k --commodities 5k --orders 2M --cards 5M --logs 1M --seed 7
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import Table, func, select, text
+
+from ..core.security import get_password_hash
+from ..database import engine, init_db, close_db, async_session_maker
+from ..models import (
+    User, Shop, Category, Commodity, PaymentMethod,
+    Order, Card, Bill, OperationLog,
+)
+from ..models.card import SHUFFLE_KEY_MAX
+from ..services.inventory import InventoryService
+
+
+## 每批写入的行数
+BATCH_SIZE = 20000
+
+## 所有模拟用户的登录密码
+DEFAULT_PASSWORD = "seed123456"
+
+## 订单状态分布：待支付 / 已支付 / 已取消
+ORDER_STATUS_WEIGHTS = (0.08, 0.85, 0.07)
+
+## 会员下单比例（其余为游客）
+MEMBER_ORDER_RATE = 0.4
+
+## 会员订单中使用余额支付的比例
+BALANCE_PAY_RATE = 0.5
+
+## 商品热度的 Zipf 指数
+ZIPF_EXPONENT = 1.1
+
+_RACES = ["标准版", "豪华版", "终身版", "月卡", "季卡", "年卡"]
+
+_ACTIONS = [
+    ("登录成功", 0), ("修改密码", 0), ("修改个人资料", 0), ("余额充值", 0),
+    ("申请提现", 0), ("绑定邮箱", 0), ("登录失败：密码错误", 1), ("异地登录", 1),
+]
+
+_USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_2 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148",
+    "Mozilla/5.0 (Linux; Android 14) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Mobile Safari/537.36 MicroMessenger/8.0",
+]
+
+
+def parse_count(value: str) -> int:
+    """解析数量参数，支持 k / M 后缀（如 500k、10M）"""
+    value = value.strip()
+    multiplier = 1
+    if value[-1:] in ("k", "K"):
+        multiplier, value = 1000, value[:-1]
+    elif value[-1:] in ("m", "M"):
+        multiplier, value = 1000000, value[:-1]
+    try:
+        return int(float(value) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid count: {value}")
+
+
+# ============== 写入 ==============
+
+class Progress:
+    """单表写入进度（输出到 stderr）"""
+
+    def __init__(self, name: str, total: int):
+        self.name = name
+        self.total = total
+        self.done = 0
+        self.started = time.perf_counter()
+
+    def advance(self, rows: int):
+        self.done += rows
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed else 0
+        percent = f" {self.done / self.total:6.1%}" if self.total else ""
+        sys.stderr.write(
+            f"\r[{self.name:>15}] {self.done:>12,}/{self.total:,}{percent}  {rate:>10,.0f} rows/s"
+        )
+        sys.stderr.flush()
+
+    def finish(self):
+        elapsed = time.perf_counter() - self.started
+        sys.stderr.write(
+            f"\r[{self.name:>15}] {self.done:>12,} rows in {elapsed:.1f}s{' ' * 30}\n"
+        )
+
+
+class TableWriter:
+    """
+    按表批量写入
+
+    行以 dict 给出，未提供的列按模型定义补默认值（COPY 不会触发 ORM 默认值）。
+    """
+
+    def __init__(self, conn, table: Table):
+        self.conn = conn
+        self.table = table
+        self.columns = [c.name for c in table.columns]
+        self.defaults: Dict[str, Any] = {}
+        for column in table.columns:
+            default = column.default
+            if default is None:
+                self.defaults[column.name] = None
+            elif default.is_callable:
+                self.defaults[column.name] = default.arg(None)
+            else:
+                self.defaults[column.name] = default.arg
+        self.postgres = conn.dialect.name == "postgresql"
+
+    async def write(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        if self.postgres:
+            defaults = self.defaults
+            records = [tuple(row.get(c, defaults[c]) for c in self.columns) for row in rows]
+            raw = await self.conn.get_raw_connection()
+            await raw.driver_connection.copy_records_to_table(
+                self.table.name, records=records, columns=self.columns,
+            )
+        else:
+            filled = [{**self.defaults, **row} for row in rows]
+            await self.conn.execute(self.table.insert(), filled)
+
+    async def write_all(self, name: str, total: int, rows: Iterator[Dict[str, Any]]):
+        progress = Progress(name, total)
+        batch: List[Dict[str, Any]] = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                await self.write(batch)
+                progress.advance(len(batch))
+                batch = []
+        await self.write(batch)
+        progress.advance(len(batch))
+        progress.finish()
+
+
+async def _next_id(conn, table: Table) -> int:
+    """本次写入的起始主键"""
+    current = (await conn.execute(select(func.max(table.c.id)))).scalar()
+    return (current or 0) + 1
+
+
+async def _sync_sequences(conn, tables: Sequence[Table]):
+    """预分配主键写入后，把 PostgreSQL 自增序列推进到当前最大值"""
+    if conn.dialect.name != "postgresql":
+        return
+    for table in tables:
+        await conn.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 1) FROM {table.name}))"
+        ))
+
+
+# ============== 生成 ==============
+
+@dataclass
+class SeedOptions:
+    users: int
+    merchants: int
+    categories: int
+    commodities: int
+    orders: int
+    cards: int
+    logs: int
+    days: int
+    referral_rate: float
+    seed: int
+
+
+@dataclass
+class CommodityInfo:
+    id: int
+    price: Decimal
+    factory_price: Decimal
+    owner_id: Optional[int]
+    races: List[str] = field(default_factory=list)
+
+
+@dataclass
+class SeedContext:
+    """生成过程中共享的主键区间和维度数据"""
+    rng: random.Random
+    started_at: datetime
+    span_seconds: float
+    password_hash: str
+    first_user_id: int = 0
+    user_parents: Dict[int, int] = field(default_factory=dict)
+    merchant_ids: List[int] = field(default_factory=list)
+    categories_by_owner: Dict[Optional[int], List[int]] = field(default_factory=dict)
+    commodities: List[CommodityInfo] = field(default_factory=list)
+    commodity_weights: List[float] = field(default_factory=list)
+    balance_payment_id: int = 0
+    online_payment_id: int = 0
+    next_card_id: int = 0
+    sold_cards: int = 0
+
+
+def _zipf_cum_weights(n: int) -> List[float]:
+    return list(accumulate(1 / (rank ** ZIPF_EXPONENT) for rank in range(1, n + 1)))
+
+
+def _random_time(ctx: SeedContext) -> datetime:
+    return ctx.started_at + timedelta(seconds=ctx.rng.random() * ctx.span_seconds)
+
+
+def generate_users(ctx: SeedContext, opts: SeedOptions) -> Iterator[Dict[str, Any]]:
+    """用户：第 i 个用户按 referral_rate 挂在更早注册的用户下，越早注册的用户下线越多"""
+    rng = ctx.rng
+    merchants = set(rng.sample(range(opts.users), min(opts.merchants, opts.users)))
+    registered = sorted(_random_time(ctx) for _ in range(opts.users))
+    for i in range(opts.users):
+        user_id = ctx.first_user_id + i
+        parent_id = None
+        if i and rng.random() < opts.referral_rate:
+            parent_id = ctx.first_user_id + int(i * rng.random() ** 2)
+            ctx.user_parents[user_id] = parent_id
+        if i in merchants:
+            ctx.merchant_ids.append(user_id)
+        yield {
+            "id": user_id,
+            "username": f"seed_{opts.seed}_{user_id}",
+            "email": f"seed_{opts.seed}_{user_id}@seed.invalid",
+            "password_hash": ctx.password_hash,
+            "salt": "bcrypt",
+            "parent_id": parent_id,
+            "balance": Decimal("0"),
+            "status": 1,
+            "created_at": registered[i],
+        }
+
+
+def generate_shops(ctx: SeedContext, first_id: int) -> Iterator[Dict[str, Any]]:
+    for i, user_id in enumerate(ctx.merchant_ids):
+        yield {
+            "id": first_id + i,
+            "user_id": user_id,
+            "name": f"模拟店铺 {user_id}",
+            "subdomain": f"seed{user_id}",
+        }
+
+
+def generate_categories(ctx: SeedContext, opts: SeedOptions, first_id: int) -> Iterator[Dict[str, Any]]:
+    """分类：约 1/4 属于商户"""
+    rng = ctx.rng
+    for i in range(opts.categories):
+        owner_id = None
+        if ctx.merchant_ids and i and rng.random() < 0.25:
+            owner_id = rng.choice(ctx.merchant_ids)
+        category_id = first_id + i
+        ctx.categories_by_owner.setdefault(owner_id, []).append(category_id)
+        yield {
+            "id": category_id,
+            "name": f"模拟分类 {category_id}",
+            "sort": i,
+            "status": 1,
+            "owner_id": owner_id,
+        }
+
+
+def _commodity_config(rng: random.Random, price: Decimal, races: List[str]) -> Optional[str]:
+    if not races:
+        return None
+    lines = ["[category]"]
+    for index, race in enumerate(races):
+        lines.append(f"{race}={price * (index + 1):.2f}")
+    if rng.random() < 0.5:
+        lines += ["", "[wholesale]", "10=95%", "50=90%"]
+    return "\n".join(lines)
+
+
+def _wholesale_config(rng: random.Random, price: Decimal) -> Optional[str]:
+    if rng.random() >= 0.2:
+        return None
+    return json.dumps([
+        {"quantity": 5, "price": float((price * Decimal("0.95")).quantize(Decimal("0.01")))},
+        {"quantity": 20, "type": "percent", "discount_percent": 85},
+    ])
+
+
+def generate_commodities(ctx: SeedContext, opts: SeedOptions, first_id: int) -> Iterator[Dict[str, Any]]:
+    """商品：商户商品放在自己的分类下；30% 带种类，20% 带批发价"""
+    rng = ctx.rng
+    main_categories = ctx.categories_by_owner.get(None, [])
+    merchant_owners = [owner for owner in ctx.categories_by_owner if owner is not None]
+    for i in range(opts.commodities):
+        owner_id = None
+        if merchant_owners and rng.random() < 0.3:
+            owner_id = rng.choice(merchant_owners)
+        category_id = rng.choice(ctx.categories_by_owner[owner_id] if owner_id else main_categories)
+        price = Decimal(rng.choice([1, 5, 9.9, 19.9, 29, 49, 99, 199])).quantize(Decimal("0.01"))
+        factory_price = (price * Decimal("0.6")).quantize(Decimal("0.01"))
+        races = rng.sample(_RACES, rng.randint(2, 4)) if rng.random() < 0.3 else []
+        commodity_id = first_id + i
+        ctx.commodities.append(CommodityInfo(commodity_id, price, factory_price, owner_id, races))
+        yield {
+            "id": commodity_id,
+            "name": f"模拟商品 {commodity_id}",
+            "description": f"<p>模拟商品 {commodity_id} 的描述</p>",
+            "category_id": category_id,
+            "price": price,
+            "user_price": (price * Decimal("0.95")).quantize(Decimal("0.01")),
+            "factory_price": factory_price,
+            "delivery_auto_mode": rng.choice([0, 0, 0, 1, 2]),
+            "config": _commodity_config(rng, price, races),
+            "wholesale_config": _wholesale_config(rng, price),
+            "sort": i,
+            "status": 1 if rng.random() < 0.95 else 0,
+            "owner_id": owner_id,
+            "created_at": ctx.started_at,
+        }
+
+
+def _card(ctx: SeedContext, commodity: CommodityInfo, race: Optional[str], created_at: datetime,
+          order_id: Optional[int] = None, sold_at: Optional[datetime] = None) -> Dict[str, Any]:
+    card_id = ctx.next_card_id
+    ctx.next_card_id += 1
+    return {
+        "id": card_id,
+        "commodity_id": commodity.id,
+        "secret": f"SEED-{card_id:010d}-{ctx.rng.getrandbits(48):012X}",
+        "race": race,
+        "status": 1 if order_id else 0,
+        "shuffle": ctx.rng.randrange(SHUFFLE_KEY_MAX),
+        "order_id": order_id,
+        "owner_id": commodity.owner_id,
+        "created_at": created_at,
+        "sold_at": sold_at,
+    }
+
+
+@dataclass
+class OrderBatch:
+    orders: List[Dict[str, Any]] = field(default_factory=list)
+    cards: List[Dict[str, Any]] = field(default_factory=list)
+    bills: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class OrderGenerator:
+    """
+    按时间顺序生成订单、已售卡密和余额账单
+
+    余额支付前余额不足时先生成一笔充值账单，保证账单的变动后余额连续且不为负。
+    """
+
+    def __init__(self, ctx: SeedContext, opts: SeedOptions, first_order_id: int, first_bill_id: int):
+        self.ctx = ctx
+        self.opts = opts
+        self.first_order_id = first_order_id
+        self.next_bill_id = first_bill_id
+        self.balances: Dict[int, Decimal] = {}
+        self.user_ids = range(ctx.first_user_id, ctx.first_user_id + opts.users)
+
+    def _bill(self, user_id: int, amount: Decimal, bill_type: int, description: str,
+              created_at: datetime, trade_no: Optional[str] = None) -> Dict[str, Any]:
+        balance = self.balances.get(user_id, Decimal("0"))
+        balance = balance + amount if bill_type == 1 else balance - amount
+        self.balances[user_id] = balance
+        bill_id = self.next_bill_id
+        self.next_bill_id += 1
+        return {
+            "id": bill_id,
+            "user_id": user_id,
+            "amount": amount,
+            "balance": balance,
+            "type": bill_type,
+            "currency": 0,
+            "description": description,
+            "order_trade_no": trade_no,
+            "created_at": created_at,
+        }
+
+    def batches(self) -> Iterator[OrderBatch]:
+        ctx, rng = self.ctx, self.ctx.rng
+        commodities = ctx.commodities
+        cum_weights = ctx.commodity_weights
+        step = ctx.span_seconds / max(1, self.opts.orders)
+        batch = OrderBatch()
+
+        for i in range(self.opts.orders):
+            order_id = self.first_order_id + i
+            created_at = ctx.started_at + timedelta(seconds=step * (i + rng.random()))
+            commodity = commodities[bisect_left(cum_weights, rng.random() * cum_weights[-1])]
+            quantity = 1 if rng.random() < 0.85 else rng.randint(2, 5)
+            race = rng.choice(commodity.races) if commodity.races else None
+            status = rng.choices((0, 1, 2), weights=ORDER_STATUS_WEIGHTS)[0]
+            amount = commodity.price * quantity
+            trade_no = f"{int(created_at.timestamp() * 1000):013d}{order_id % 100000:05d}"
+
+            user_id = None
+            if self.user_ids and rng.random() < MEMBER_ORDER_RATE:
+                user_id = rng.choice(self.user_ids)
+            pay_with_balance = user_id is not None and rng.random() < BALANCE_PAY_RATE
+            from_user_id = ctx.user_parents.get(user_id) if user_id else None
+
+            order = {
+                "id": order_id,
+                "trade_no": trade_no,
+                "user_id": user_id,
+                "commodity_id": commodity.id,
+                "payment_id": ctx.balance_payment_id if pay_with_balance else ctx.online_payment_id,
+                "amount": amount,
+                "quantity": quantity,
+                "race": race,
+                "contact": f"u{user_id}@seed.invalid" if user_id else f"guest{rng.randrange(10 ** 8)}@seed.invalid",
+                "status": status,
+                "from_user_id": from_user_id,
+                "rebate": (amount * Decimal("0.05")).quantize(Decimal("0.01")) if from_user_id and status == 1 else Decimal("0"),
+                "owner_id": commodity.owner_id,
+                "rent": commodity.factory_price * quantity,
+                "create_ip": f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+                "create_device": rng.choice([1, 1, 2, 3]),
+                "created_at": created_at,
+            }
+
+            if status == 1:
+                paid_at = created_at + timedelta(seconds=rng.randint(5, 300))
+                cards = [
+                    _card(ctx, commodity, race, created_at - timedelta(days=1), order_id, paid_at)
+                    for _ in range(quantity)
+                ]
+                batch.cards.extend(cards)
+                order.update(
+                    delivery_status=1,
+                    paid_at=paid_at,
+                    secret="\n".join(card["secret"] for card in cards),
+                    external_trade_no=None if pay_with_balance else f"EP{trade_no}",
+                )
+                if pay_with_balance:
+                    balance = self.balances.get(user_id, Decimal("0"))
+                    if balance < amount:
+                        topup = Decimal((int(amount - balance) // 100 + 1) * 100)
+                        batch.bills.append(self._bill(
+                            user_id, topup, 1, "余额充值", created_at - timedelta(minutes=5),
+                        ))
+                    batch.bills.append(self._bill(
+                        user_id, amount, 0, f"购买商品：模拟商品 {commodity.id}", paid_at, trade_no,
+                    ))
+            batch.orders.append(order)
+
+            if len(batch.orders) >= BATCH_SIZE:
+                yield batch
+                batch = OrderBatch()
+        if batch.orders:
+            yield batch
+
+
+def generate_stock(ctx: SeedContext, count: int) -> Iterator[Dict[str, Any]]:
+    """待售卡密，按商品热度分配"""
+    rng = ctx.rng
+    cum_weights = ctx.commodity_weights
+    for _ in range(count):
+        commodity = ctx.commodities[bisect_left(cum_weights, rng.random() * cum_weights[-1])]
+        race = rng.choice(commodity.races) if commodity.races else None
+        yield _card(ctx, commodity, race, _random_time(ctx))
+
+
+def generate_logs(ctx: SeedContext, opts: SeedOptions, first_id: int) -> Iterator[Dict[str, Any]]:
+    rng = ctx.rng
+    step = ctx.span_seconds / max(1, opts.logs)
+    for i in range(opts.logs):
+        user_id = ctx.first_user_id + rng.randrange(opts.users) if opts.users and rng.random() < 0.9 else None
+        action, risk_level = rng.choice(_ACTIONS)
+        yield {
+            "id": first_id + i,
+            "user_id": user_id,
+            "email": f"seed_{opts.seed}_{user_id}@seed.invalid" if user_id else None,
+            "action": action,
+            "ip": f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+            "user_agent": rng.choice(_USER_AGENTS),
+            "risk_level": risk_level,
+            "created_at": ctx.started_at + timedelta(seconds=step * (i + rng.random())),
+        }
+
+
+# ============== 入口 ==============
+
+async def _payment_methods(conn, ctx: SeedContext):
+    """复用已有的余额支付和一个在线支付，没有时创建"""
+    table = PaymentMethod.__table__
+    for handler, name, attr in (("#balance", "余额支付", "balance_payment_id"),
+                                (None, "模拟在线支付", "online_payment_id")):
+        query = select(table.c.id).order_by(table.c.id).limit(1)
+        query = query.where(table.c.handler == handler) if handler else query.where(table.c.handler != "#balance")
+        payment_id = (await conn.execute(query)).scalar()
+        if payment_id is None:
+            payment_id = (await conn.execute(
+                table.insert().values(name=name, handler=handler or "epay", code="alipay", status=1)
+                .returning(table.c.id)
+            )).scalar()
+        setattr(ctx, attr, payment_id)
+
+
+async def _refresh_balances(conn, first_user_id: int):
+    """用户余额和累计充值取自最后一条账单（只处理本次生成的用户）"""
+    await conn.execute(text("""
+        UPDATE users SET
+            balance = COALESCE((
+                SELECT b.balance FROM bills b
+                WHERE b.user_id = users.id AND b.currency = 0
+                ORDER BY b.id DESC LIMIT 1
+            ), 0),
+            total_recharge = COALESCE((
+                SELECT SUM(b.amount) FROM bills b
+                WHERE b.user_id = users.id AND b.type = 1 AND b.currency = 0
+            ), 0)
+        WHERE users.id >= :first_id
+    """), {"first_id": first_user_id})
+
+
+async def seed(opts: SeedOptions):
+    rng = random.Random(opts.seed)
+    now = datetime.utcnow().replace(microsecond=0)
+    password_hash, _ = get_password_hash(DEFAULT_PASSWORD)
+    ctx = SeedContext(
+        rng=rng,
+        started_at=now - timedelta(days=opts.days),
+        span_seconds=opts.days * 86400,
+        password_hash=password_hash,
+    )
+
+    await init_db()
+    tables = [t.__table__ for t in (User, Shop, Category, Commodity, Order, Card, Bill, OperationLog)]
+    users, shops, categories, commodities, orders, cards, bills, logs = tables
+
+    async with engine.connect() as conn:
+        first = {table.name: await _next_id(conn, table) for table in tables}
+        ctx.first_user_id = first["users"]
+        ctx.next_card_id = first["cards"]
+        await _payment_methods(conn, ctx)
+        await conn.commit()
+
+        await TableWriter(conn, users).write_all("users", opts.users, generate_users(ctx, opts))
+        await TableWriter(conn, shops).write_all(
+            "shops", len(ctx.merchant_ids), generate_shops(ctx, first["shops"]),
+        )
+        await TableWriter(conn, categories).write_all(
+            "categories", opts.categories, generate_categories(ctx, opts, first["categories"]),
+        )
+        await TableWriter(conn, commodities).write_all(
+            "commodities", opts.commodities, generate_commodities(ctx, opts, first["commodities"]),
+        )
+        await conn.commit()
+        ctx.commodity_weights = _zipf_cum_weights(len(ctx.commodities))
+
+        # 订单、已售卡密、账单按批交替写入，卡密和账单引用的订单、用户都已存在
+        order_writer, card_writer, bill_writer = (
+            TableWriter(conn, orders), TableWriter(conn, cards), TableWriter(conn, bills),
+        )
+        generator = OrderGenerator(ctx, opts, first["orders"], first["bills"])
+        progress = Progress("orders", opts.orders)
+        sold = billed = 0
+        for batch in generator.batches():
+            await order_writer.write(batch.orders)
+            await card_writer.write(batch.cards)
+            await bill_writer.write(batch.bills)
+            await conn.commit()
+            sold += len(batch.cards)
+            billed += len(batch.bills)
+            progress.advance(len(batch.orders))
+        progress.finish()
+        print(f"[OK] {sold:,} sold cards, {billed:,} bills", file=sys.stderr)
+
+        stock = max(0, opts.cards - sold)
+        await card_writer.write_all("cards (stock)", stock, generate_stock(ctx, stock))
+        await TableWriter(conn, logs).write_all(
+            "operation_logs", opts.logs, generate_logs(ctx, opts, first["operation_logs"]),
+        )
+        await conn.commit()
+
+        print("[..] Syncing sequences and user balances", file=sys.stderr)
+        await _sync_sequences(conn, tables)
+        await _refresh_balances(conn, ctx.first_user_id)
+        await conn.commit()
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text("ANALYZE " + ", ".join(t.name for t in tables)))
+            await conn.commit()
+
+    print("[..] Rebuilding inventory counters", file=sys.stderr)
+    async with async_session_maker() as db:
+        rows = await InventoryService(db).rebuild()
+        await db.commit()
+    print(f"[OK] Seeded (seed={opts.seed}), {rows} inventory counter rows rebuilt")
+
+
+async def _run(opts: SeedOptions):
+    try:
+        await seed(opts)
+    finally:
+        await close_db()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成大规模模拟数据（PostgreSQL 使用 COPY）")
+    parser.add_argument("--users", type=parse_count, default=parse_count("100k"), help="用户数")
+    parser.add_argument("--merchants", type=parse_count, default=500, help="其中的商户数")
+    parser.add_argument("--categories", type=parse_count, default=200, help="分类数")
+    parser.add_argument("--commodities", type=parse_count, default=parse_count("5k"), help="商品数")
+    parser.add_argument("--orders", type=parse_count, default=parse_count("1M"), help="订单数")
+    parser.add_argument("--cards", type=parse_count, default=parse_count("2M"),
+                        help="卡密总数（已售卡密不足时补充待售库存）")
+    parser.add_argument("--logs", type=parse_count, default=parse_count("500k"), help="操作日志数")
+    parser.add_argument("--days", type=int, default=365, help="数据覆盖的天数（截止到现在）")
+    parser.add_argument("--referral-rate", type=float, default=0.3, help="有上级的用户比例")
+    parser.add_argument("--seed", type=int, default=42, help="随机种子（相同种子生成相同分布）")
+    args = parser.parse_args()
+
+    if args.categories < 1 or args.commodities < 1:
+        parser.error("--categories 和 --commodities 至少为 1")
+    opts = SeedOptions(
+        users=args.users,
+        merchants=args.merchants,
+        categories=args.categories,
+        commodities=args.commodities,
+        orders=args.orders,
+        cards=args.cards,
+        logs=args.logs,
+        days=args.days,
+        referral_rate=args.referral_rate,
+        seed=args.seed,
+    )
+    asyncio.run(_run(opts))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,8 @@
 工具函数
 """
 
+from ..core.trade_no import generate_trade_no
 from .helpers import (
-    generate_trade_no,
     generate_random_string,
     mask_string,
     parse_config,
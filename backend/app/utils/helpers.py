@@ -2,23 +2,12 @@
 辅助工具函数
 """
 
-import time
 import random
 import string
 import json
 from typing import Any, Dict, Optional
 
 
-def generate_trade_no() -> str:
-    """
-    生成18位订单号
-    格式：13位时间戳 + 5位随机数
-    """
-    timestamp = int(time.time() * 1000)
-    random_part = random.randint(10000, 99999)
-    return f"{timestamp}{random_part}"
-
-
 def generate_random_string(length: int = 16, chars: str = None) -> str:
     """
     生成随机字符串
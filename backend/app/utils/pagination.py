@@ -0,0 +1,176 @@
+"""
+列表分页
+
+在原有 page/limit（OFFSET）分页之外支持：
+  - 游标分页：按排序键 seek（如 (created_at, id)），深翻页不再扫描前面的行。
+    每次响应返回不透明的 next_cursor，下一页带上 cursor 参数即可。
+  - 总数模式：total=exact 精确 COUNT（默认）；total=estimate 使用 PostgreSQL
+    执行计划的估算行数（估算值较小时仍精确计数）；total=none 不统计总数。
+
+排序键必须是非空列，且最后一列唯一（通常是主键），保证顺序稳定。
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Literal, Optional, Sequence
+
+from sqlalchemy import Select, and_, func, literal, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql import operators
+from sqlalchemy.sql.elements import ClauseElement, UnaryExpression
+from sqlalchemy.sql.expression import Executable
+
+from ..core.exceptions import ValidationError
+
+
+TotalMode = Literal["exact", "estimate", "none"]
+
+## total=estimate 时，估算行数低于该值则改为精确计数（小结果集 COUNT 很便宜）
+EXACT_COUNT_BELOW = 10000
+
+
+@dataclass
+class Page:
+    """分页结果"""
+    rows: List[Any]
+    total: Optional[int]
+    page: int
+    limit: int
+    next_cursor: Optional[str] = None
+
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    order_by: Sequence[UnaryExpression],
+    *,
+    page: int = 1,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    total: TotalMode = "exact",
+) -> Page:
+    """
+    执行分页查询。
+
+    Args:
+        db: 数据库会话
+        query: 未排序、未分页的查询（select(Model).where(...)）
+        order_by: 排序键，如 (Order.created_at.desc(), Order.id.desc())
+        page: 页码（传入 cursor 时忽略）
+        limit: 每页数量
+        cursor: 上一页返回的 next_cursor
+        total: 总数模式 exact / estimate / none
+    """
+    keys = [(expr.element, expr.modifier is operators.desc_op) for expr in order_by]
+
+    total_count = await count_rows(db, query, total)
+
+    paged = query.order_by(*order_by)
+    if cursor:
+        paged = paged.where(_seek(keys, decode_cursor(cursor, keys)))
+    else:
+        paged = paged.offset((page - 1) * limit)
+
+    # 多取一行判断是否还有下一页
+    result = await db.execute(paged.limit(limit + 1))
+    rows = list(result.scalars().all())
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column, _ in keys])
+
+    return Page(rows=rows, total=total_count, page=page, limit=limit, next_cursor=next_cursor)
+
+
+async def count_rows(db: AsyncSession, query: Select, mode: TotalMode = "exact") -> Optional[int]:
+    """按模式统计查询的总行数"""
+    if mode == "none":
+        return None
+    if mode == "estimate" and db.bind.dialect.name == "postgresql":
+        estimate = await _estimate_rows(db, query)
+        if estimate >= EXACT_COUNT_BELOW:
+            return estimate
+    result = await db.execute(select_count(query))
+    return result.scalar() or 0
+
+
+def select_count(query: Select) -> Select:
+    """精确计数查询"""
+    return select(func.count()).select_from(query.order_by(None).subquery())
+
+
+# ============== 游标 ==============
+
+def encode_cursor(values: List[Any]) -> str:
+    """把最后一行的排序键值编码为不透明游标"""
+    raw = json.dumps(
+        [v.isoformat() if isinstance(v, datetime) else v for v in values],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, keys) -> List[Any]:
+    """解析游标，格式不符时抛出 ValidationError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError
+        decoded = []
+        for value, (column, _) in zip(values, keys):
+            if column.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif column.type.python_type is int:
+                value = int(value)
+            decoded.append(value)
+        return decoded
+    except Exception:
+        raise ValidationError("无效的分页游标")
+
+
+def _seek(keys, values) -> ClauseElement:
+    """构建 "排在游标之后" 的条件"""
+    directions = {desc for _, desc in keys}
+    if len(directions) == 1:
+        # 同向排序用行值比较，可直接利用复合索引
+        columns = tuple_(*[column for column, _ in keys])
+        bound = tuple_(*[literal(v, column.type) for v, (column, _) in zip(values, keys)])
+        return columns < bound if directions.pop() else columns > bound
+
+    # 混合方向：(a > x) OR (a = x AND b < y) ...
+    clauses = []
+    for i, (column, desc) in enumerate(keys):
+        prefix = [keys[j][0] == values[j] for j in range(i)]
+        step = column < values[i] if desc else column > values[i]
+        clauses.append(and_(*prefix, step))
+    return or_(*clauses)
+
+
+# ============== 估算总数 ==============
+
+class _Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) <query>"""
+    inherit_cache = False
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(_Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def _estimate_rows(db: AsyncSession, query: Select) -> int:
+    """读取 PostgreSQL 执行计划中的估算行数（基于表统计信息，不扫描数据）"""
+    result = await db.execute(_Explain(query.order_by(None)))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,57 @@
+"""
+后台列表搜索条件
+
+统一构建管理后台筛选条件，配合 alembic 迁移 0001_search_indexes 创建的索引：
+  - 模糊匹配 LIKE '%kw%' 由 pg_trgm GIN 索引加速（关键词至少 3 个字符时生效）
+  - 完整卡密、完整订单号走等值查询，分别命中 cards.secret 的 hash 索引
+    和 trade_no 的唯一索引
+
+关键词中的 % 和 _ 按普通字符处理。
+"""
+
+import re
+from typing import Pattern, Sequence
+
+from sqlalchemy import or_
+from sqlalchemy.sql.elements import ColumnElement
+
+
+## 完整订单号的格式：core.trade_no 生成的 24 位数字（充值 / 提现带前缀 R / W），
+## 以及旧版本生成的订单号（16 位微秒时间戳 + 10 位十六进制、R + 14 位时间 + 8 位十六进制）
+TRADE_NO_PATTERNS = (
+    re.compile(r"[A-Z]?\d{24}"),
+    re.compile(r"\d{16}[0-9a-f]{10}"),
+    re.compile(r"R\d{14}[0-9A-F]{8}"),
+)
+
+
+def fuzzy(column, keyword: str) -> ColumnElement:
+    """子串模糊匹配"""
+    return column.contains(keyword, autoescape=True)
+
+
+def fuzzy_any(columns: Sequence, keyword: str) -> ColumnElement:
+    """任一字段包含关键词"""
+    return or_(*[fuzzy(column, keyword) for column in columns])
+
+
+def exact(column, value: str) -> ColumnElement:
+    """等值匹配（走 hash / 唯一索引）"""
+    return column == value
+
+
+def identifier(
+    column, keyword: str, patterns: Sequence[Pattern[str]] = TRADE_NO_PATTERNS
+) -> ColumnElement:
+    """
+    编号类字段：输入完整编号时等值查询，否则按片段模糊匹配。
+
+    Args:
+        column: 编号列（如 Order.trade_no）
+        keyword: 输入的编号或编号片段
+        patterns: 完整编号的格式，整体匹配其一时才按完整编号查询
+    """
+    keyword = keyword.strip()
+    if any(pattern.fullmatch(keyword) for pattern in patterns):
+        return exact(column, keyword)
+    return fuzzy(column, keyword)
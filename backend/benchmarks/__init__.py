@@ -0,0 +1,3 @@
+"""
+性能基准（python -m benchmarks.<name>，在 backend/ 目录下运行）
+"""
@@ -0,0 +1,110 @@
+"""
+定价方案微基准
+
+对比两种报价方式的单次耗时：
+  - parse：每次报价都解析 config / wholesale_config（旧实现的行为）
+  - plan：从缓存取编译好的 PricingPlan，只做二分查找
+
+阶梯数从 1 增长到 10000 时，plan 的耗时应基本持平（O(log n)），
+parse 则随配置长度线性增长。同时校验报价过程中没有发生任何解析。
+
+用法：
+    python -m benchmarks.bench_pricing [--number 20000]
+"""
+
+import argparse
+import json
+import math
+import timeit
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.services import pricing
+from app.services.pricing import PricingPlan, get_pricing_plan
+
+
+TIER_COUNTS = [1, 10, 100, 1000, 10000]
+BASE_PRICE = Decimal("100.00")
+
+
+def make_commodity(commodity_id: int, tiers: int) -> SimpleNamespace:
+    """构造带 N 档批发规则的商品（JSON 全局阶梯 + 种类阶梯）"""
+    wholesale = [
+        {"quantity": (i + 1) * 10, "type": "percent", "discount_percent": 99 - i % 50}
+        for i in range(tiers)
+    ]
+    lines = ["[category]", "A=90.00", "[category_wholesale]"]
+    lines += [f"A.{(i + 1) * 10}={80 - i % 40}.00" for i in range(tiers)]
+    return SimpleNamespace(
+        id=commodity_id,
+        config="\n".join(lines),
+        wholesale_config=json.dumps(wholesale),
+        created_at=datetime(2024, 1, 1),
+        updated_at=datetime(2024, 1, 1),
+    )
+
+
+def bench(number: int):
+    pricing.clear_pricing_plans()
+    rows = []
+    for commodity_id, tiers in enumerate(TIER_COUNTS, start=1):
+        commodity = make_commodity(commodity_id, tiers)
+        quantity = tiers * 5 + 3  # 落在阶梯中间
+
+        def quote_parse():
+            plan = PricingPlan.compile(commodity.config, commodity.wholesale_config)
+            plan.unit_price(BASE_PRICE, quantity, "A")
+            plan.unit_price(BASE_PRICE, quantity)
+
+        def quote_plan():
+            plan = get_pricing_plan(commodity)
+            plan.unit_price(BASE_PRICE, quantity, "A")
+            plan.unit_price(BASE_PRICE, quantity)
+
+        get_pricing_plan(commodity)  # 预热缓存
+
+        # 报价期间禁止解析
+        compile_calls = 0
+        original_compile = PricingPlan.compile.__func__
+
+        def counting_compile(cls, *args, **kwargs):
+            nonlocal compile_calls
+            compile_calls += 1
+            return original_compile(cls, *args, **kwargs)
+
+        PricingPlan.compile = classmethod(counting_compile)
+        try:
+            plan_time = min(timeit.repeat(quote_plan, number=number, repeat=5)) / number
+        finally:
+            PricingPlan.compile = classmethod(original_compile)
+        assert compile_calls == 0, f"plan path parsed config {compile_calls} times"
+
+        parse_number = max(1, number // max(tiers, 1))
+        parse_time = min(timeit.repeat(quote_parse, number=parse_number, repeat=3)) / parse_number
+
+        rows.append((tiers, parse_time, plan_time))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="定价方案微基准")
+    parser.add_argument("--number", type=int, default=20000, help="每组报价次数")
+    args = parser.parse_args()
+
+    rows = bench(args.number)
+    print(f"{'tiers':>7} {'parse (us)':>12} {'plan (us)':>11} {'speedup':>9} {'plan/log2':>10}")
+    for tiers, parse_time, plan_time in rows:
+        log_n = max(math.log2(tiers), 1)
+        print(
+            f"{tiers:>7} {parse_time * 1e6:>12.2f} {plan_time * 1e6:>11.3f} "
+            f"{parse_time / plan_time:>8.0f}x {plan_time * 1e6 / log_n:>10.3f}"
+        )
+
+    # 10000 档相对 1 档的耗时增长应远小于线性（允许计时噪声）
+    growth = rows[-1][2] / rows[0][2]
+    print(f"plan cost growth 1 -> {TIER_COUNTS[-1]} tiers: {growth:.2f}x (no parsing per quote)")
+
+
+if __name__ == "__main__":
+    main()
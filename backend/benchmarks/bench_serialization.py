@@ -0,0 +1,114 @@
+"""
+JSON 序列化与响应压缩基准
+
+以管理后台卡密列表的一页（100 行，字段与 GET /admin/cards 一致）为样本：
+  - 序列化：before = jsonable_encoder + 标准库 json（FastAPI 默认路径）
+            after  = ORJSONRoute 直接交给 orjson
+  - 传输字节：原始 / gzip / brotli（与 CompressionMiddleware 使用相同的压缩参数）
+同时校验两种序列化结果解析后完全一致。
+
+用法：
+    python -m benchmarks.bench_serialization [--rows 100] [--number 2000]
+"""
+
+import argparse
+import json
+import random
+import string
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core import compression
+from app.core.responses import ORJSONResponse, dumps
+
+
+def make_card_page(rows: int) -> dict:
+    """构造一页卡密列表响应（与 admin/cards.get_cards 的返回结构相同）"""
+    rng = random.Random(42)
+    created = datetime(2024, 1, 1, 8, 0, 0)
+    items = []
+    for i in range(rows):
+        sold = i % 3 == 0
+        items.append({
+            "id": 100000 - i,
+            "commodity_id": 10 + i % 5,
+            "commodity_name": f"游戏月卡 {i % 5} 区",
+            "commodity_cover": f"/uploads/covers/{i % 5}.png",
+            "secret": "".join(rng.choices(string.ascii_uppercase + string.digits, k=32)),
+            "draft": None,
+            "draft_premium": float(Decimal("0.00")),
+            "race": "标准版" if i % 2 else None,
+            "sku": None,
+            "note": "批次 2024-01" if i % 4 == 0 else None,
+            "status": 1 if sold else 0,
+            "order_id": 5000 + i if sold else None,
+            "order_trade_no": f"20240101{800000000000 + i:016d}" if sold else None,
+            "owner_id": None,
+            "created_at": (created + timedelta(minutes=i)).isoformat(),
+            "sold_at": (created + timedelta(hours=i)).isoformat() if sold else None,
+        })
+    return {
+        "total": 123456,
+        "page": 1,
+        "limit": rows,
+        "next_cursor": "WzEwMDAwMF0",
+        "items": items,
+    }
+
+
+def serialize_before(page: dict) -> bytes:
+    return JSONResponse(jsonable_encoder(page)).body
+
+
+def serialize_after(page: dict) -> bytes:
+    return ORJSONResponse(page).body
+
+
+def bench(rows: int, number: int):
+    page = make_card_page(rows)
+    before = serialize_before(page)
+    after = serialize_after(page)
+    assert json.loads(before) == json.loads(after), "orjson output differs from jsonable_encoder"
+    assert after == dumps(page)
+
+    timings = {}
+    for name, func in (("before", serialize_before), ("after", serialize_after)):
+        timings[name] = min(timeit.repeat(lambda: func(page), number=number, repeat=5)) / number
+
+    sizes = {"raw": len(after)}
+    for encoding in ("gzip", "br"):
+        if encoding == "br" and compression.brotli is None:
+            continue
+        sizes[encoding] = len(compression.compress(after, encoding))
+        timings[f"{encoding} compress"] = min(timeit.repeat(
+            lambda: compression.compress(after, encoding), number=max(1, number // 10), repeat=3,
+        )) / max(1, number // 10)
+    return len(before), timings, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON 序列化与响应压缩基准")
+    parser.add_argument("--rows", type=int, default=100, help="每页行数")
+    parser.add_argument("--number", type=int, default=2000, help="每组序列化次数")
+    args = parser.parse_args()
+
+    before_bytes, timings, sizes = bench(args.rows, args.number)
+
+    print(f"admin card page, {args.rows} rows")
+    print(f"{'step':>16} {'time (us)':>11}")
+    for name, seconds in timings.items():
+        print(f"{name:>16} {seconds * 1e6:>11.1f}")
+    print(f"serialization speedup: {timings['before'] / timings['after']:.1f}x")
+
+    print(f"{'encoding':>16} {'bytes':>11} {'ratio':>7}")
+    print(f"{'before (json)':>16} {before_bytes:>11} {1:>7.2f}")
+    for encoding, size in sizes.items():
+        print(f"{encoding:>16} {size:>11} {size / before_bytes:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+"""
+纯 Python 热路径微基准
+
+覆盖每个请求或每笔订单都会执行的 CPU 密集代码：计价、配置解析、订单号生成、
+钩子分发、易支付签名、JWT 校验和商城接口的响应构建。每项使用固定的输入数据，
+输出 ops/sec，并与基线文件（benchmarks/baseline.json）比较：
+吞吐量低于基线超过 --threshold（默认 10%）的项标记为 REGRESSION，进程以 1 退出。
+
+基线与机器相关，更换机器或 Python 版本后请先在目标机器上重新生成。
+
+用法：
+    python -m benchmarks.micro                     # 运行全部并与基线比较
+    python -m benchmarks.micro -k hooks -k sign    # 只运行名称包含关键字的项
+    python -m benchmarks.micro --save              # 运行并写入基线
+    python -m benchmarks.micro --json result.json  # 同时输出机器可读结果
+"""
+
+import argparse
+import asyncio
+import inspect
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from app.api.v1.shop import CategoryResponse, PaymentMethodResponse
+from app.core import security, trade_no
+from app.core.responses import dumps
+from app.payments.epay import EpayPayment
+from app.plugins.sdk.hooks import HookManager, EventContext
+from app.services.order import OrderService
+from app.services import pricing
+from app.services.pricing import PricingPlan, get_pricing_plan
+from app.utils import helpers
+
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+## 每轮计时的最短时长（秒），据此校准每轮调用次数
+MIN_ROUND_TIME = 0.2
+
+## 计时轮数，取最快一轮（最少受调度干扰）
+ROUNDS = 5
+
+BENCHMARKS: Dict[str, Callable[[], Callable]] = {}
+
+
+def benchmark(name: str):
+    """
+    注册基准：被装饰函数负责准备数据，返回待测的无参函数（同步或 async）。
+    """
+
+    def decorator(setup: Callable[[], Callable]) -> Callable[[], Callable]:
+        BENCHMARKS[name] = setup
+        return setup
+
+    return decorator
+
+
+# ============== 测试数据 ==============
+
+CONFIG_TEXT = "\n".join([
+    "[category]",
+    "标准版=10.00",
+    "豪华版=20.00",
+    "终身版=99.00",
+    "",
+    "[wholesale]",
+    "10=9.00",
+    "50=80%",
+    "",
+    "[category_wholesale]",
+    "标准版.10=9.00",
+    "标准版.50=85%",
+    "豪华版.20=18.00",
+    "",
+    "[sku]",
+    "颜色.红色=2.00",
+    "颜色.蓝色=1.00",
+])
+
+WHOLESALE_JSON = json.dumps([
+    {"quantity": 5, "price": 9.5},
+    {"quantity": 20, "type": "percent", "discount_percent": 85},
+    {"quantity": 100, "type": "percent", "discount_percent": 75},
+])
+
+
+def make_commodity(commodity_id: int = 1) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=commodity_id,
+        name=f"游戏月卡 {commodity_id}",
+        description="<p>自动发货，24 小时在线</p>",
+        cover="/uploads/covers/1.png",
+        category_id=3,
+        price=Decimal("12.00"),
+        user_price=Decimal("11.00"),
+        stock=0,
+        shared_id=None,
+        delivery_way=0,
+        contact_type=0,
+        password_status=0,
+        draft_status=0,
+        draft_premium=Decimal("0.00"),
+        minimum=0,
+        maximum=0,
+        only_user=0,
+        widget=None,
+        leave_message=None,
+        recommend=0,
+        level_disable=0,
+        config=CONFIG_TEXT,
+        wholesale_config=WHOLESALE_JSON,
+        created_at=datetime(2024, 1, 1),
+        updated_at=datetime(2024, 1, 1),
+    )
+
+
+# ============== 基准 ==============
+
+@benchmark("order.calculate_amount")
+def bench_calculate_amount():
+    service = OrderService(db=None)
+    commodity = make_commodity()
+    user = SimpleNamespace(id=1)
+    group = SimpleNamespace(discount=Decimal("0.05"))
+    pricing.clear_pricing_plans()
+
+    async def run():
+        await service.calculate_amount(commodity, 12, user, group, race="标准版")
+
+    return run
+
+
+@benchmark("pricing.compile")
+def bench_pricing_compile():
+    return lambda: PricingPlan.compile(CONFIG_TEXT, WHOLESALE_JSON)
+
+
+@benchmark("pricing.to_display")
+def bench_pricing_display():
+    commodity = make_commodity()
+    pricing.clear_pricing_plans()
+    return lambda: get_pricing_plan(commodity).to_display()
+
+
+@benchmark("helpers.parse_config")
+def bench_parse_config():
+    return lambda: helpers.parse_config(CONFIG_TEXT)
+
+
+@benchmark("trade_no.generate")
+def bench_trade_no():
+    trade_no.generator.node_id  # 预先确定节点号
+    return trade_no.generate_trade_no
+
+
+@benchmark("hooks.emit_20_handlers")
+def bench_hooks_emit():
+    manager = HookManager()
+
+    async def handler(ctx: EventContext):
+        ctx.data["seen"] = ctx.data.get("seen", 0) + 1
+
+    for i in range(20):
+        manager.on("order.paid", handler, priority=i, owner=f"plugin_{i % 4}")
+    data = {"order_id": 1, "trade_no": "202401010000000001"}
+
+    async def run():
+        await manager.emit("order.paid", dict(data))
+
+    return run
+
+
+@benchmark("hooks.emit_no_handlers")
+def bench_hooks_emit_empty():
+    manager = HookManager()
+
+    async def run():
+        await manager.emit("order.paid", {"order_id": 1})
+
+    return run
+
+
+@benchmark("epay.generate_sign")
+def bench_epay_sign():
+    epay = EpayPayment({"url": "https://pay.invalid", "pid": "1001", "key": "k" * 32})
+    params = {
+        "pid": "1001",
+        "trade_no": "2024010112345678",
+        "out_trade_no": "202401010000000001",
+        "type": "alipay",
+        "name": "游戏月卡",
+        "money": "12.00",
+        "trade_status": "TRADE_SUCCESS",
+        "param": "",
+        "sign_type": "MD5",
+        "sign": "0" * 32,
+    }
+    return lambda: epay._generate_sign(params)
+
+
+@benchmark("security.verify_token")
+def bench_verify_token():
+    token = security.create_access_token({"sub": "12345"})
+    assert security.verify_token(token) is not None
+    return lambda: security.verify_token(token)
+
+
+@benchmark("shop.categories_response")
+def bench_categories_response():
+    categories = [
+        SimpleNamespace(id=i, name=f"分类 {i}", icon=f"/uploads/icons/{i}.png", sort=i)
+        for i in range(30)
+    ]
+
+    def run():
+        dumps([CategoryResponse.model_validate(c).model_dump() for c in categories])
+
+    return run
+
+
+@benchmark("shop.payments_response")
+def bench_payments_response():
+    payments = [
+        SimpleNamespace(id=i, name=f"支付 {i}", icon=None, handler="epay", code="alipay")
+        for i in range(6)
+    ]
+
+    def run():
+        dumps([PaymentMethodResponse.model_validate(p).model_dump() for p in payments])
+
+    return run
+
+
+@benchmark("shop.commodity_detail_response")
+def bench_commodity_detail_response():
+    commodity = make_commodity()
+    pricing.clear_pricing_plans()
+
+    def run():
+        c = commodity
+        dumps({
+            "id": c.id,
+            "name": c.name,
+            "description": c.description,
+            "cover": c.cover,
+            "price": float(c.price),
+            "user_price": float(c.user_price),
+            "category_id": c.category_id,
+            "stock": 100,
+            "sold_count": 10,
+            "delivery_way": c.delivery_way,
+            "contact_type": c.contact_type,
+            "password_status": c.password_status,
+            "draft_status": c.draft_status,
+            "draft_premium": float(c.draft_premium),
+            "minimum": c.minimum,
+            "maximum": c.maximum,
+            "only_user": c.only_user,
+            "widget": c.widget,
+            "leave_message": c.leave_message,
+            "wholesale_config": c.wholesale_config,
+            **get_pricing_plan(c).to_display(),
+        })
+
+    return run
+
+
+# ============== 运行 ==============
+
+def _timer(func: Callable, loop: asyncio.AbstractEventLoop) -> Callable[[int], float]:
+    """返回 timer(n)：执行 n 次并返回耗时（async 函数在同一个协程内循环 await）"""
+    if inspect.iscoroutinefunction(func):
+        async def many(n: int) -> float:
+            start = time.perf_counter()
+            for _ in range(n):
+                await func()
+            return time.perf_counter() - start
+
+        return lambda n: loop.run_until_complete(many(n))
+
+    def timer(n: int) -> float:
+        start = time.perf_counter()
+        for _ in range(n):
+            func()
+        return time.perf_counter() - start
+
+    return timer
+
+
+def measure(func: Callable, loop: asyncio.AbstractEventLoop) -> Dict[str, Any]:
+    timer = _timer(func, loop)
+    timer(10)  # 预热
+
+    number = 1
+    while True:
+        elapsed = timer(number)
+        if elapsed >= MIN_ROUND_TIME:
+            break
+        number = max(number * 2, int(number * MIN_ROUND_TIME / max(elapsed, 1e-9) * 1.2))
+
+    per_call = [timer(number) / number for _ in range(ROUNDS)]
+    best = min(per_call)
+    return {
+        "ops": round(1 / best, 1),
+        "mean_us": round(statistics.mean(per_call) * 1e6, 3),
+        "min_us": round(best * 1e6, 3),
+        "stddev_pct": round(statistics.pstdev(per_call) / statistics.mean(per_call) * 100, 2),
+        "number": number,
+    }
+
+
+def load_baseline(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("results", {})
+
+
+def environment() -> Dict[str, str]:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "processor": platform.processor() or platform.machine(),
+    }
+
+
+def run(names: List[str], baseline: Dict[str, Any], threshold: float) -> Dict[str, Any]:
+    loop = asyncio.new_event_loop()
+    results: Dict[str, Any] = {}
+    print(f"{'benchmark':<34} {'ops/sec':>14} {'us/op':>10} {'±%':>6} {'vs base':>9}")
+    try:
+        for name in names:
+            result = measure(BENCHMARKS[name](), loop)
+            base: Optional[Dict[str, Any]] = baseline.get(name)
+            change, status = "", ""
+            if base:
+                ratio = result["ops"] / base["ops"]
+                result["baseline_ops"] = base["ops"]
+                result["change_pct"] = round((ratio - 1) * 100, 1)
+                change = f"{result['change_pct']:+.1f}%"
+                if ratio < 1 - threshold:
+                    result["regression"] = True
+                    status = "  REGRESSION"
+            results[name] = result
+            print(
+                f"{name:<34} {result['ops']:>14,.1f} {result['min_us']:>10.3f} "
+                f"{result['stddev_pct']:>6.1f} {change:>9}{status}"
+            )
+    finally:
+        loop.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="纯 Python 热路径微基准")
+    parser.add_argument("-k", dest="keywords", action="append", default=[],
+                        help="只运行名称包含该关键字的项（可重复）")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="基线文件")
+    parser.add_argument("--save", action="store_true", help="把本次结果写入基线文件")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="吞吐量低于基线的比例超过该值时判定为回归（默认 0.10）")
+    parser.add_argument("--json", dest="json_output", help="结果 JSON 输出文件")
+    parser.add_argument("--list", action="store_true", help="列出所有基准")
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return
+
+    names = [n for n in BENCHMARKS if not args.keywords or any(k in n for k in args.keywords)]
+    if not names:
+        parser.error("no benchmark matches -k")
+
+    baseline = {} if args.save else load_baseline(args.baseline)
+    results = run(names, baseline, args.threshold)
+    report = {"environment": environment(), "results": results}
+
+    if args.json_output:
+        with open(args.json_output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.save:
+        # 只更新本次运行的项，保留基线中的其他项
+        existing = load_baseline(args.baseline)
+        existing.update({
+            name: {"ops": r["ops"], "min_us": r["min_us"]} for name, r in results.items()
+        })
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "results": existing}, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"baseline saved to {args.baseline}")
+        return
+
+    regressions = [name for name, r in results.items() if r.get("regression")]
+    if regressions:
+        print(f"{len(regressions)} regression(s) above {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    if not baseline:
+        print(f"no baseline at {args.baseline}, run with --save to create one")
+
+
+if __name__ == "__main__":
+    main()